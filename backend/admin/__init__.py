@@ -7,3 +7,4 @@ from . import routes            # dashboard + produkty
 from . import category_routes   # kategorie
 from . import payments_routes   # platby
 from . import sold_routes       # prodané
+from . import outbox_routes     # odchozí e-maily
@@ -0,0 +1,56 @@
+from flask import request, render_template, redirect, url_for, flash
+
+from backend.extensions import db
+from . import admin_bp
+from backend.models import EmailOutbox
+from backend.services import outbox
+
+OUTBOX_STATUSES = ("failed", "pending", "sending", "sent")
+
+
+@admin_bp.route("/outbox", methods=["GET"], endpoint="admin_outbox_index")
+# # # # @login_required  # dočasně vypnuto (dočasně vypnuto)
+def admin_outbox_index():
+    status = (request.args.get("status") or "failed").strip()
+    try:
+        limit = int(request.args.get("limit") or 100)
+    except Exception:
+        limit = 100
+    limit = max(1, min(limit, 1000))
+
+    q = EmailOutbox.query
+    if status in OUTBOX_STATUSES:
+        q = q.filter(EmailOutbox.status == status)
+    rows = q.order_by(EmailOutbox.id.desc()).limit(limit).all()
+
+    counts = dict(
+        db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id))
+        .group_by(EmailOutbox.status)
+        .all()
+    )
+
+    return render_template(
+        "admin/outbox/index.html",
+        rows=rows,
+        counts=counts,
+        filters={"status": status, "limit": limit},
+        statuses=OUTBOX_STATUSES,
+    )
+
+
+@admin_bp.post("/outbox/<int:message_id>/retry")
+# # # # @login_required  # dočasně vypnuto (dočasně vypnuto)
+def admin_outbox_retry(message_id: int):
+    if outbox.retry([message_id]):
+        flash(f"E-mail #{message_id} znovu zařazen k odeslání.", "success")
+    else:
+        flash(f"E-mail #{message_id} není ve stavu 'failed'.", "warning")
+    return redirect(url_for("admin.admin_outbox_index"))
+
+
+@admin_bp.post("/outbox/retry-all")
+# # # # @login_required  # dočasně vypnuto (dočasně vypnuto)
+def admin_outbox_retry_all():
+    count = outbox.retry()
+    flash(f"Znovu zařazeno k odeslání: {count}.", "success")
+    return redirect(url_for("admin.admin_outbox_index"))
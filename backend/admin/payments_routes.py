@@ -9,6 +9,7 @@ from backend.admin.sold_routes import send_invoice_for_order
 
 # ⬇️ DOPLNĚNO: hook, který vytvoří záznam(y) v Prodaných a (případně) pošle FA
 from backend.services.order_paid_hook import on_order_marked_paid
+from backend.services.payment_events import publish
 
 ALLOWED_STATUSES = ("pending", "received", "failed", "canceled", "refunded")
 
@@ -63,6 +64,16 @@ def admin_payment_update_status(payment_id: int):
         flash("Platba nebyla nalezena.", "danger")
         return redirect(url_for("admin.admin_payments_index"))
 
+    o = db.session.query(Order).filter_by(vs=p.vs).first()
+    if o and o.status == "canceled" and new_status == "received":
+        # rezervace propadla a kusy jsou zpět v prodeji → nepřepínat na zaplacenou
+        flash(
+            f"Objednávka #{o.id} je zrušená (propadla rezervace, zboží je zpět na skladě) – "
+            "platbu vyřešte ručně (vrácení peněz / nová objednávka).",
+            "danger",
+        )
+        return redirect(url_for("admin.admin_payments_index"))
+
     p.status = new_status
     if new_status == "received" and getattr(p, "received_at", None) is None:
         try:
@@ -70,13 +81,13 @@ def admin_payment_update_status(payment_id: int):
         except Exception:
             pass
 
-    o = db.session.query(Order).filter_by(vs=p.vs).first()
     if o:
         if new_status == "received":
             o.status = "paid"
-        elif o.status != "paid":
+        elif o.status not in ("paid", "canceled"):
             o.status = "awaiting_payment"
 
+    publish(p.vs, new_status, o.status if o else None, p.amount_czk)
     db.session.commit()
 
     # Automatické vytvoření záznamu v „Prodané“ a odeslání faktury (pokud to hook řeší)
@@ -2,6 +2,7 @@ import os
 from flask import render_template, request, redirect, url_for, flash, current_app
 from math import ceil
 from flask_login import login_required
+from sqlalchemy.orm import selectinload
 from . import admin_bp
 from backend.extensions import db
 from backend.models import Product, Category, ProductMedia, ProductVariant, ProductVariantMedia, SoldProduct, Payment
@@ -10,8 +11,8 @@ from backend.api.routes.product_routes import (
     _process_and_save_image,
     _detect_media_type,
     _save_raw,
+    _sync_variants,
 )
-from backend.api.routes.product_routes import _process_and_save_image
 
 
 @admin_bp.route("/")
@@ -168,6 +169,7 @@ def product_add():
             result = []
             for v in items:
                 key = (
+                    v.get("id"),
                     (v.get("variant_name") or "").strip().lower(),
                     (v.get("wrist_size") or "").strip().lower(),
                     (v.get("description") or "").strip().lower(),
@@ -220,7 +222,11 @@ def product_add():
 @admin_bp.route("/products/<int:product_id>/edit", methods=["GET", "POST"], endpoint="edit_product")
 # # # # @login_required  # docasne vypnuto
 def product_edit(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = (
+        Product.query.options(selectinload(Product.variants).selectinload(ProductVariant.media))
+        .filter(Product.id == product_id)
+        .first_or_404()
+    )
 
     if request.method == "POST":
         clear_variants_flag = request.form.get("clear_variants") == "1"
@@ -290,6 +296,7 @@ def product_edit(product_id):
             result = []
             for v in items:
                 key = (
+                    v.get("id"),
                     (v.get("variant_name") or "").strip().lower(),
                     (v.get("wrist_size") or "").strip().lower(),
                     (v.get("description") or "").strip().lower(),
@@ -306,57 +313,7 @@ def product_edit(product_id):
         variants_payload = _dedupe_variants([v for v in variants_payload if _has_variant_data(v)])
 
         if variants_explicit:
-            old_variants = list(product.variants or [])
-            existing_files: set[str] = set()
-            for ov in old_variants:
-                if ov.image:
-                    existing_files.add(ov.image)
-                for mv in list(ov.media or []):
-                    if mv.filename:
-                        existing_files.add(mv.filename)
-
-            product.variants.clear()
-            new_files: set[str] = set()
-
-            for variant in variants_payload:
-                img_name = variant.get("image") or variant.get("existing_image") or None
-                if variant.get("image_file"):
-                    img_name = _process_and_save_image(variant["image_file"])
-
-                if not (variant.get("variant_name") or variant.get("wrist_size") or img_name):
-                    continue
-
-                if img_name:
-                    new_files.add(img_name)
-
-                extra_existing = variant.get("existing_extra") or []
-                extra_saved: list[str] = []
-                for ef in variant.get("extra_files") or []:
-                    extra_saved.append(_process_and_save_image(ef))
-
-                new_files.update(extra_existing)
-                new_files.update(extra_saved)
-
-                v_obj = ProductVariant(
-                    product_id=product.id,
-                    variant_name=variant.get("variant_name"),
-                    wrist_size=variant.get("wrist_size"),
-                    description=variant.get("description"),
-                    price_czk=variant.get("price_czk"),
-                    stock=variant.get("stock") or 0,
-                    image=img_name,
-                )
-                db.session.add(v_obj)
-                for fn in extra_existing:
-                    db.session.add(ProductVariantMedia(variant=v_obj, filename=fn))
-                for fn in extra_saved:
-                    db.session.add(ProductVariantMedia(variant=v_obj, filename=fn))
-
-            for fname in existing_files - new_files:
-                try:
-                    os.remove(os.path.join(current_app.root_path, "static", "uploads", fname))
-                except Exception:
-                    pass
+            _sync_variants(product, variants_payload)
 
         db.session.commit()
 
@@ -12,6 +12,7 @@ from flask_mail import Message
 
 from . import admin_bp  # zachovĂˇno
 from backend.extensions import db, mail
+from backend.services.outbox import enqueue_email
 from backend.models import SoldProduct
 from backend.invoicing import build_invoice_pdf_bytes  # vyuĹľijeme existujĂ­cĂ­ generĂˇtor FA
 
@@ -563,31 +564,28 @@ def send_invoice_for_order(order_id: int) -> dict:
             "DÄ›kujeme za nĂˇkup.\n\n"
             "S pozdravem\nNĂˇramkovĂˇ MĂłda"
         )
-        msg = Message(subject=subject, recipients=[to_addr], body=body)
-        # pĹ™iloĹľĂ­me stejnĂ© PDF, kterĂ© jsme uloĹľili
-        msg.attach(
-            filename=os.path.basename(saved_rel) if saved_rel else f"invoice_{sp.id}.pdf",
-            content_type="application/pdf",
-            data=pdf_bytes,
+        # do outboxu – uloží se commitem níže spolu s příznakem invoice_sent_at,
+        # odešle `flask mail outbox-worker`
+        enqueue_email(
+            subject=subject,
+            recipients=[to_addr],
+            body=body,
+            attachments=[{
+                "filename": os.path.basename(saved_rel) if saved_rel else f"invoice_{sp.id}.pdf",
+                "content": pdf_bytes,
+                "mimetype": "application/pdf",
+            }],
         )
-        from backend.extensions import mail  # lokĂˇlnĂ­ import, aby se nerozbilo jinde
-        mail.send(msg)
         result["emailed"] = True
 
         # 6) zapĂ­Ĺˇeme do DB flag (pokud model mĂˇ sloupce)
-        dirty = False
         if hasattr(sp, "invoice_sent_at") and not getattr(sp, "invoice_sent_at", None):
             sp.invoice_sent_at = datetime.utcnow()
-            dirty = True
         if saved_rel and hasattr(sp, "invoice_filename") and not getattr(sp, "invoice_filename", None):
             sp.invoice_filename = saved_rel
-            dirty = True
-        if dirty:
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         current_app.logger.exception(f"[invoice] send failed for order_id={order_id}: {e}")
         return {"ok": False, "error": str(e), **result}
 
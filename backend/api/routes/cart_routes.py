@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from flask import Blueprint, request, jsonify
+
+from backend.services.pricing import PricingError, quote_cart, quote_to_json
+from backend.services.stock import parse_cart_lines
+
+api_cart = Blueprint("api_cart", __name__, url_prefix="/api/cart")
+
+# Horní limit položek košíku (ochrana proti obřím payloadům)
+MAX_ITEMS = 500
+
+
+@api_cart.post("/quote")
+def cart_quote():
+    """
+    POST /api/cart/quote
+    {"items": [{"id": 1, "variantId": 5, "quantity": 2}, ...], "shippingMode": "post"|"pickup"}
+    Vrací serverové ceny položek, mezisoučet, poštovné a celkovou částku.
+    Ceny z požadavku se ignorují; při zahřáté cenové mapě bez dotazu do DB.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"ok": False, "error": "Očekávám neprázdný seznam 'items'"}), 400
+    if len(items) > MAX_ITEMS:
+        return jsonify({"ok": False, "error": f"Maximálně {MAX_ITEMS} položek na požadavek"}), 413
+
+    try:
+        lines = parse_cart_lines(items)
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "Neplatné id nebo quantity položky"}), 400
+
+    try:
+        quote = quote_cart(lines, payload.get("shippingMode"))
+    except PricingError as exc:
+        return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
+
+    return jsonify({"ok": True, **quote_to_json(quote)}), 200
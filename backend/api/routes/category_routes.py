@@ -6,7 +6,7 @@ import unicodedata
 from flask import Blueprint, request, jsonify
 from sqlalchemy.orm import selectinload
 
-from backend.api.routes.product_routes import _product_dict
+from backend.api.routes.product_routes import _load_image_meta, _product_dict
 from backend.extensions import db
 from backend.models import Category, Product, ProductVariant
 
@@ -97,9 +97,10 @@ def get_category_by_slug(slug: str):
         )
 
     products = products_q.order_by(Product.id.desc()).all()
+    metas = _load_image_meta(products)
     return jsonify({
         "category": _cat_to_dict(c),
-        "products": [_product_dict(p) for p in products],
+        "products": [_product_dict(p, metas) for p in products],
     }), 200
 
 
@@ -1,254 +1,297 @@
-﻿from flask import Blueprint, request, jsonify, current_app
-from decimal import Decimal, InvalidOperation
-from backend.extensions import db
-from backend.models import Order, OrderItem, Payment, Product
-from backend.api.utils.email import send_email
-import os
-
-order_bp = Blueprint("order_bp", __name__, url_prefix="/api/orders")
-
-
-def _to_decimal(val, field: str = "") -> Decimal:
-    try:
-        return Decimal(str(val))
-    except Exception:
-        raise InvalidOperation(f"Neplatná hodnota {field or 'čísla'}")
-
-
-@order_bp.post("")
-def create_order():
-    try:
-        data = request.get_json(force=True) or {}
-
-        vs = str(data.get("vs", "")).strip()
-        name = str(data.get("name", "")).strip()
-        email = str(data.get("email", "")).strip()
-        address = str(data.get("address", "")).strip()
-        note = str(data.get("note", "") or "")
-
-        if not (vs and name and email and address):
-            return jsonify({"ok": False, "error": "Chybí povinná pole (vs, name, email, address)."}), 400
-
-        if Order.query.filter_by(vs=vs).first():
-            return jsonify({"ok": False, "error": "Objednávka s tímto VS už existuje."}), 409
-
-        items_in = data.get("items") or []
-        if not isinstance(items_in, list) or not items_in:
-            return jsonify({"ok": False, "error": "Chybí položky objednávky (items)."}), 400
-
-        subtotal = Decimal("0.00")
-        for it in items_in:
-            qty = int(it.get("quantity", 1))
-            price = _to_decimal(it.get("price", "0"), "price")
-            if qty <= 0 or price <= 0:
-                return jsonify({"ok": False, "error": "Položka musí mít quantity>0 a price>0."}), 400
-            subtotal += price * qty
-
-        fee_raw = os.getenv("SHIPPING_FEE_CZK") or current_app.config.get("SHIPPING_FEE_CZK", "89.00")
-        try:
-            shipping_fee = _to_decimal(fee_raw, "shipping_fee")
-        except InvalidOperation:
-            shipping_fee = Decimal("89.00")
-
-        total_czk = (subtotal + shipping_fee).quantize(Decimal("0.01"))
-        if total_czk <= 0:
-            return jsonify({"ok": False, "error": "Částka musí být > 0."}), 400
-
-        # --- ATOMICKÝ ODEČET SKLADU ---
-        decremented = []
-        for it in items_in:
-            pid = int(it.get("id"))
-            qty = int(it.get("quantity", 1))
-
-            product = Product.query.get(pid)
-            if not product:
-                return jsonify({"ok": False, "error": f"Produkt {pid} neexistuje"}), 404
-
-            current_stock = int(product.stock or 0)
-            if current_stock < qty:
-                return jsonify({"ok": False, "error": f"Na skladě zbývá jen {current_stock} ks pro {product.name}"}), 400
-
-            updated = db.session.execute(
-                db.text("UPDATE product SET stock = stock - :qty WHERE id = :pid AND stock >= :qty"),
-                {"qty": qty, "pid": pid},
-            )
-            if updated.rowcount == 0:
-                latest = Product.query.get(pid)
-                left = int(latest.stock or 0) if latest else 0
-                return jsonify({"ok": False, "error": f"Na skladě zbývá jen {left} ks pro {product.name}"}), 400
-
-            latest = Product.query.get(pid)
-            decremented.append({
-                "id": pid,
-                "taken_qty": qty,
-                "remaining_stock": int(latest.stock or 0) if latest else 0,
-            })
-
-        order = Order(
-            vs=vs,
-            customer_name=name,
-            customer_email=email,
-            customer_address=address,
-            note=note,
-            total_czk=total_czk,
-            status="awaiting_payment",
-        )
-        db.session.add(order)
-        db.session.flush()
-
-        for it in items_in:
-            db.session.add(OrderItem(
-                order_id=order.id,
-                product_name=str(it.get("name") or "").strip(),
-                quantity=int(it.get("quantity", 1)),
-                price=_to_decimal(it.get("price"), "price"),
-            ))
-
-        if not Payment.query.filter_by(vs=vs).first():
-            db.session.add(Payment(
-                vs=vs,
-                amount_czk=total_czk,
-                status="pending",
-                reference=f"Objednávka #{order.id}"
-            ))
-
-        db.session.commit()
-
-        # =========================
-        # POTVRZOVACÍ E-MAIL ZÁKAZNÍK
-        # =========================
-        try:
-            lines = [
-                f"Dobrý den {name},",
-                "",
-                "děkujeme za Vaši objednávku. Níže je její rekapitulace:",
-                f"VS: {vs}",
-                f"Dodací adresa: {address}",
-            ]
-            if note:
-                lines.append(f"Poznámka: {note}")
-
-            lines.append("")
-            lines.append("Položky:")
-            for it in items_in:
-                nm = str(it.get("name") or "").strip()
-                qty = int(it.get("quantity", 1))
-                price = _to_decimal(it.get("price", "0"), "price")
-                lines.append(f"• {nm} × {qty} – {price:.2f} Kč/ks")
-
-            lines += [
-                "",
-                f"Poštovné: {shipping_fee:.2f} Kč",
-                f"Celkem k úhradě: {total_czk:.2f} Kč",
-                "",
-                "Pokyny k platbě:",
-                "— Bankovní převod v CZK",
-                f"— Variabilní symbol: {vs}",
-                "",
-                "Po připsání platby Vám automaticky zašleme fakturu v PDF.",
-                "",
-                "Děkujeme za nákup.",
-                "Náramková Móda",
-            ]
-
-            send_email(
-                subject="Potvrzení objednávky – Náramková Móda",
-                recipients=[email],
-                body="\n".join(lines),
-            )
-        except Exception:
-            current_app.logger.exception("Potvrzovací e-mail selhal")
-
-        # =========================
-        # NOTIFIKACE MAJITELI
-        # =========================
-        try:
-            owner = (
-                current_app.config.get("ORDER_NOTIFY_EMAIL")
-                or os.getenv("ORDER_NOTIFY_EMAIL")
-            )
-            if owner:
-                send_email(
-                    subject=f"Nová objednávka #{order.id} (VS {vs})",
-                    recipients=[owner],
-                    body=(
-                        f"Objednávka #{order.id}\n"
-                        f"VS: {vs}\n"
-                        f"Zákazník: {name} <{email}>\n"
-                        f"Adresa: {address}\n"
-                        f"Celkem: {total_czk:.2f} Kč"
-                    ),
-                )
-        except Exception:
-            current_app.logger.exception("Owner e-mail selhal")
-
-        return jsonify({
-            "ok": True,
-            "orderId": order.id,
-            "vs": vs,
-            "status": order.status,
-            "decremented_items": decremented,
-        }), 201
-
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.exception("create_order failed")
-        return jsonify({"ok": False, "error": str(e)}), 500
-
-
-@order_bp.get("/<int:order_id>")
-def get_order(order_id: int):
-    o = Order.query.get_or_404(order_id)
-    return jsonify({
-        "ok": True,
-        "order": {
-            "id": o.id,
-            "vs": o.vs,
-            "name": o.customer_name,
-            "email": o.customer_email,
-            "address": o.customer_address,
-            "note": o.note,
-            "totalCzk": float(o.total_czk) if o.total_czk is not None else None,
-            "status": o.status,
-            "created_at": o.created_at.isoformat() if o.created_at else None,
-            "items": [
-                {
-                    "id": it.id,
-                    "name": it.product_name,
-                    "quantity": it.quantity,
-                    "price": float(it.price),
-                    "subtotal": float(it.price) * it.quantity,
-                } for it in o.items
-            ]
-        }
-    }), 200
-
-
-@order_bp.get("/by-vs/<vs>")
-def get_order_by_vs(vs: str):
-    o = Order.query.filter_by(vs=str(vs).strip()).first()
-    if not o:
-        return jsonify({"ok": False, "error": "Objednávka s tímto VS neexistuje."}), 404
-    return jsonify({
-        "ok": True,
-        "order": {
-            "id": o.id,
-            "vs": o.vs,
-            "name": o.customer_name,
-            "email": o.customer_email,
-            "address": o.customer_address,
-            "note": o.note,
-            "totalCzk": float(o.total_czk) if o.total_czk is not None else None,
-            "status": o.status,
-            "created_at": o.created_at.isoformat() if o.created_at else None,
-            "items": [
-                {
-                    "id": it.id,
-                    "name": it.product_name,
-                    "quantity": it.quantity,
-                    "price": float(it.price),
-                    "subtotal": float(it.price) * it.quantity,
-                } for it in o.items
-            ]
-        }
-    }), 200
+﻿from flask import Blueprint, request, jsonify, current_app, url_for
+from sqlalchemy.orm import joinedload
+from decimal import Decimal, InvalidOperation
+from backend.extensions import db
+from backend.models import Order, OrderItem, Payment
+from backend.services.stock import StockError, parse_cart_lines, reserve_cart
+from backend.services.pricing import PricingError, quote_cart
+from backend.services.qr import build_spd_payload, get_iban, order_message, png_data_uri
+from backend.services.status_cache import cached
+from backend.services.outbox import enqueue_email
+from backend.services import order_qr
+from backend.services.idempotency import idempotent
+from backend.services.stock_holds import create_holds
+import os
+
+order_bp = Blueprint("order_bp", __name__, url_prefix="/api/orders")
+
+
+def _to_decimal(val, field: str = "") -> Decimal:
+    try:
+        return Decimal(str(val))
+    except Exception:
+        raise InvalidOperation(f"Neplatná hodnota {field or 'čísla'}")
+
+
+@order_bp.post("")
+@idempotent("orders.create")
+def create_order():
+    try:
+        data = request.get_json(force=True) or {}
+
+        vs = str(data.get("vs", "")).strip()
+        name = str(data.get("name", "")).strip()
+        email = str(data.get("email", "")).strip()
+        address = str(data.get("address", "")).strip()
+        note = str(data.get("note", "") or "")
+
+        if not (vs and name and email and address):
+            return jsonify({"ok": False, "error": "Chybí povinná pole (vs, name, email, address)."}), 400
+
+        if Order.query.filter_by(vs=vs).first():
+            return jsonify({"ok": False, "error": "Objednávka s tímto VS už existuje."}), 409
+
+        items_in = data.get("items") or []
+        if not isinstance(items_in, list) or not items_in:
+            return jsonify({"ok": False, "error": "Chybí položky objednávky (items)."}), 400
+
+        # --- Ceny ze serveru (cenová mapa); ceny posílané z FE se ignorují ---
+        lines = parse_cart_lines(items_in)
+        try:
+            quote = quote_cart(lines, data.get("shippingMode"))
+        except PricingError as exc:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
+        shipping_fee = quote["shipping_fee"]
+        total_czk = quote["total"]
+
+        # --- ATOMICKÝ ODEČET SKLADU ---
+        try:
+            decremented = reserve_cart(lines)
+        except StockError as exc:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
+
+        order = Order(
+            vs=vs,
+            customer_name=name,
+            customer_email=email,
+            customer_address=address,
+            note=note,
+            total_czk=total_czk,
+            status="awaiting_payment",
+        )
+        db.session.add(order)
+        db.session.flush()
+        create_holds(order.id, decremented)
+        # QR se vykreslí po commitu na pozadí (static/qr/<vs>.png)
+        has_qr = order_qr.schedule(order)
+
+        for it, line, priced in zip(items_in, lines, quote["items"]):
+            db.session.add(OrderItem(
+                order_id=order.id,
+                product_id=line["product_id"],
+                variant_id=line["variant_id"],
+                product_name=str(it.get("name") or "").strip(),
+                quantity=int(it.get("quantity", 1)),
+                price=priced["unit_price"],
+            ))
+
+        if not Payment.query.filter_by(vs=vs).first():
+            db.session.add(Payment(
+                vs=vs,
+                amount_czk=total_czk,
+                status="pending",
+                reference=f"Objednávka #{order.id}"
+            ))
+
+        # E-maily jdou přes outbox: uloží se ve stejné transakci jako objednávka
+        # a odešle je `flask mail outbox-worker` (pomalé SMTP nezdržuje checkout).
+
+        # =========================
+        # POTVRZOVACÍ E-MAIL ZÁKAZNÍK
+        # =========================
+        try:
+            lines = [
+                f"Dobrý den {name},",
+                "",
+                "děkujeme za Vaši objednávku. Níže je její rekapitulace:",
+                f"VS: {vs}",
+                f"Dodací adresa: {address}",
+            ]
+            if note:
+                lines.append(f"Poznámka: {note}")
+
+            lines.append("")
+            lines.append("Položky:")
+            for it, priced in zip(items_in, quote["items"]):
+                nm = str(it.get("name") or "").strip()
+                lines.append(f"• {nm} × {priced['quantity']} – {priced['unit_price']:.2f} Kč/ks")
+
+            lines += [
+                "",
+                f"Poštovné: {shipping_fee:.2f} Kč",
+                f"Celkem k úhradě: {total_czk:.2f} Kč",
+                "",
+                "Pokyny k platbě:",
+                "— Bankovní převod v CZK",
+                f"— Variabilní symbol: {vs}",
+            ]
+            if has_qr:
+                lines.append("— QR platba je v příloze (naskenujte v bankovní aplikaci)")
+            lines += [
+                "",
+                "Po připsání platby Vám automaticky zašleme fakturu v PDF.",
+                "",
+                "Děkujeme za nákup.",
+                "Náramková Móda",
+            ]
+
+            enqueue_email(
+                subject="Potvrzení objednávky – Náramková Móda",
+                recipients=[email],
+                body="\n".join(lines),
+                # odkaz na předem vykreslené PNG (+ payload, kdyby ještě nebylo)
+                attachments=[order_qr.email_attachment(order)] if has_qr else None,
+            )
+        except Exception:
+            current_app.logger.exception("Zařazení potvrzovacího e-mailu selhalo")
+
+        # =========================
+        # NOTIFIKACE MAJITELI
+        # =========================
+        try:
+            owner = (
+                current_app.config.get("ORDER_NOTIFY_EMAIL")
+                or os.getenv("ORDER_NOTIFY_EMAIL")
+            )
+            if owner:
+                enqueue_email(
+                    subject=f"Nová objednávka #{order.id} (VS {vs})",
+                    recipients=[owner],
+                    body=(
+                        f"Objednávka #{order.id}\n"
+                        f"VS: {vs}\n"
+                        f"Zákazník: {name} <{email}>\n"
+                        f"Adresa: {address}\n"
+                        f"Celkem: {total_czk:.2f} Kč"
+                    ),
+                )
+        except Exception:
+            current_app.logger.exception("Zařazení e-mailu majiteli selhalo")
+
+        db.session.commit()
+
+        return jsonify({
+            "ok": True,
+            "orderId": order.id,
+            "vs": vs,
+            "status": order.status,
+            "totalCzk": float(total_czk),
+            "decremented_items": decremented,
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("create_order failed")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+def _order_json(o: Order) -> dict:
+    return {
+        "id": o.id,
+        "vs": o.vs,
+        "name": o.customer_name,
+        "email": o.customer_email,
+        "address": o.customer_address,
+        "note": o.note,
+        "totalCzk": float(o.total_czk) if o.total_czk is not None else None,
+        "status": o.status,
+        "created_at": o.created_at.isoformat() if o.created_at else None,
+        "items": [
+            {
+                "id": it.id,
+                "name": it.product_name,
+                "quantity": it.quantity,
+                "price": float(it.price),
+                "subtotal": float(it.price) * it.quantity,
+            } for it in o.items
+        ]
+    }
+
+
+def _payment_json(pay: Payment | None) -> dict | None:
+    if not pay:
+        return None
+    return {
+        "id": pay.id,
+        "vs": pay.vs,
+        "amountCzk": float(pay.amount_czk) if pay.amount_czk is not None else None,
+        "status": pay.status,
+        "reference": pay.reference,
+        "received_at": pay.received_at.isoformat() if pay.received_at else None,
+    }
+
+
+def _order_with_items():
+    # položky se načtou v jednom JOINu s objednávkou (žádný lazy load při serializaci)
+    return Order.query.options(joinedload(Order.items))
+
+
+def _load_order(*criteria):
+    """Loader pro status_cache: (JSON objednávky, VS) nebo (None, None)."""
+    o = _order_with_items().filter(*criteria).first()
+    return (_order_json(o), o.vs) if o else (None, None)
+
+
+@order_bp.get("/<int:order_id>")
+def get_order(order_id: int):
+    order = cached(("order_id", order_id), lambda: _load_order(Order.id == order_id))
+    if order is None:
+        return jsonify({"ok": False, "error": "Objednávka neexistuje."}), 404
+    return jsonify({"ok": True, "order": order}), 200
+
+
+@order_bp.get("/by-vs/<vs>")
+def get_order_by_vs(vs: str):
+    vs = str(vs).strip()
+    order = cached(("order", vs), lambda: _load_order(Order.vs == vs))
+    if order is None:
+        return jsonify({"ok": False, "error": "Objednávka s tímto VS neexistuje."}), 404
+    return jsonify({"ok": True, "order": order}), 200
+
+
+@order_bp.get("/by-vs/<vs>/confirmation")
+def get_order_confirmation(vs: str):
+    """
+    GET /api/orders/by-vs/<vs>/confirmation[?inline=1]
+    Vše pro děkovací stránku v jedné odpovědi: objednávka s položkami, poslední
+    platba, SPD payload a QR – jako URL na /api/payments/qr (cachovatelné),
+    s `inline=1` navíc jako data URI. Dva SQL dotazy (objednávka+položky, platba),
+    při opakování z status_cache žádný.
+    """
+    vs = str(vs).strip()
+    data = cached(("confirmation", vs), lambda: _load_confirmation(vs))
+    if data is None:
+        return jsonify({"ok": False, "error": "Objednávka s tímto VS neexistuje."}), 404
+
+    qr = data["qr"]
+    if qr and request.args.get("inline", "").lower() in ("1", "true", "yes"):
+        qr = {**qr, "dataUri": png_data_uri(qr["payload"])}
+    return jsonify({"ok": True, **data, "qr": qr}), 200
+
+
+def _load_confirmation(vs: str):
+    o = _order_with_items().filter(Order.vs == vs).first()
+    if not o:
+        return None, None
+
+    pay = Payment.query.filter_by(vs=vs).order_by(Payment.id.desc()).first()
+
+    qr = None
+    if o.total_czk is not None and o.total_czk > 0:
+        amount = Decimal(o.total_czk).quantize(Decimal("0.01"))
+        msg = order_message(vs)
+        try:
+            iban = get_iban()
+        except RuntimeError as exc:
+            current_app.logger.warning("Potvrzení objednávky bez QR: %s", exc)
+        else:
+            qr = {
+                "iban": iban,
+                "amount": float(amount),
+                "payload": build_spd_payload(iban, amount, vs, msg),
+                "url": url_for("payment_bp.payment_qr_png", amount=f"{amount:.2f}", vs=vs, msg=msg),
+            }
+
+    return {"order": _order_json(o), "payment": _payment_json(pay), "qr": qr}, vs
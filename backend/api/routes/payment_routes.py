@@ -1,50 +1,38 @@
 ﻿# backend/api/routes/payment_routes.py
-import io
+import base64
+import json
 import os
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from flask import Blueprint, request, jsonify, current_app, send_file
-import qrcode
+from flask import Blueprint, Response, request, jsonify, current_app, send_from_directory
+from sqlalchemy import column, func, inspect as sa_inspect, select, table, tuple_
 from backend.extensions import db
 from backend.models import Order, Payment
-from backend.api.utils.csob_mail_sync import fetch_csob_incoming, fetch_from_imap
+from backend.services import bank_statements, order_counts, order_qr
+from backend.services.qr import FORMATS as QR_FORMATS, build_spd_payload, get_iban, image_etag, render as render_qr
+from backend.services.payment_events import (
+    StreamLimitReached, broadcaster, event_json, publish, stream_events,
+)
+from backend.services.payment_matching import match_confirmations
+from backend.services.status_cache import cached, invalidate_on_commit
+from backend.api.utils.csob_mail_sync import fetch_and_apply, fetch_from_imap, imap_settings
 from backend.api.utils.telegram import send_telegram_message
 
 
 
 payment_bp = Blueprint("payment_bp", __name__, url_prefix="/api/payments")
 
+# QR pro daný payload se nemění → prohlížeč ho smí cachovat rok
+QR_MAX_AGE_SECONDS = 365 * 24 * 3600
 
-# --- Helpers ---------------------------------------------------------------
-
-def _get_iban() -> str:
-    """IBAN obchodnĂ­ka (ENV MERCHANT_IBAN > Flask config MERCHANT_IBAN)."""
-    iban = os.getenv("MERCHANT_IBAN") or current_app.config.get("MERCHANT_IBAN")
-    if not iban:
-        raise RuntimeError("MERCHANT_IBAN nenĂ­ nastaven (ENV nebo Config).")
-    return iban.replace(" ", "").upper()
 
+# --- Helpers ---------------------------------------------------------------
 
 def _to_decimal(val) -> Decimal:
     """BezpeÄŤnĂ˝ pĹ™evod na Decimal; vyhazuje InvalidOperation na neplatnou hodnotu."""
     return Decimal(str(val))
 
 
-def _build_spd_payload(iban: str, amount: Decimal, vs: str | None, msg: str | None) -> str:
-    """
-    SPD 1.0 payload pro ÄŤeskĂ© QR platby (CZK):
-    SPD*1.0*ACC:...*AM:...*CC:CZK*X-VS:...*MSG:...
-    """
-    parts = ["SPD*1.0", f"ACC:{iban}", f"AM:{amount:.2f}", "CC:CZK"]
-    if vs:
-        parts.append(f"X-VS:{vs}")
-    if msg:
-        # SPD povoluje ASCII; vynechĂˇme diakritiku/emoji a zkrĂˇtĂ­me.
-        safe_msg = "".join(ch for ch in (msg or "") if 32 <= ord(ch) <= 126)
-        parts.append(f"MSG:{safe_msg[:60]}")
-    return "*".join(parts)
-
-
 def _safe_int(value, default):
     """BezpeÄŤnĂ˝ pĹ™evod na int s dolnĂ­ hranicĂ­ 0."""
     try:
@@ -54,37 +42,43 @@ def _safe_int(value, default):
         return default
 
 
-def _detect_order_item_schema():
-    """
-    ProhlĂ©dne schĂ©ma tabulky 'order_item' a vrĂˇtĂ­ slovnĂ­k s tĂ­m,
-    jakĂ© sloupce jsou k dispozici pro vĂ˝poÄŤet souÄŤtu.
-    """
-    cols = db.session.execute(db.text("PRAGMA table_info('order_item');")).fetchall()
-    colnames = {c[1] for c in cols}
+# Sloupce order_item se zjišťují jednou za proces (pro každou DB) přes inspector –
+# funguje na SQLite i PostgreSQL, žádné PRAGMA při každém požadavku.
+_order_item_schema_cache: dict[str, dict] = {}
 
-    # kandidĂˇti pro jednotkovou cenu
-    price_cols = [c for c in ("price_czk", "unit_price_czk", "unit_price") if c in colnames]
-    # kandidĂˇti pro mnoĹľstvĂ­
-    qty_cols = [c for c in ("quantity", "qty", "count") if c in colnames]
-    # pĹ™Ă­mĂ˝ sloupec s ÄŤĂˇstkou poloĹľky (fallback)
-    amount_cols = [c for c in ("amount_czk",) if c in colnames]
 
-    # nĂˇzev FK na order (typicky order_id)
-    fk_col = "order_id" if "order_id" in colnames else None
-
-    return {
-        "has_table": len(cols) > 0,
-        "price_cols": price_cols,
-        "qty_cols": qty_cols,
-        "amount_cols": amount_cols,
-        "fk_col": fk_col,
+def _detect_order_item_schema() -> dict:
+    """
+    Které sloupce 'order_item' jsou k dispozici pro výpočet součtu
+    (cache podle URL engine, tj. jednou za proces).
+    """
+    key = str(db.engine.url)
+    schema = _order_item_schema_cache.get(key)
+    if schema is not None:
+        return schema
+
+    insp = sa_inspect(db.engine)
+    colnames = {c["name"] for c in insp.get_columns("order_item")} if insp.has_table("order_item") else set()
+
+    def first(*candidates):
+        return next((c for c in candidates if c in colnames), None)
+
+    schema = {
+        "has_table": bool(colnames),
+        # přímý sloupec s částkou položky, jinak jednotková cena × množství
+        "amount_col": first("amount_czk"),
+        "price_col": first("price_czk", "unit_price_czk", "unit_price", "price"),
+        "qty_col": first("quantity", "qty", "count"),
+        "fk_col": first("order_id"),
     }
+    _order_item_schema_cache[key] = schema
+    return schema
 
 
 def _compute_amounts_for_orders(order_ids):
     """
-    VrĂˇtĂ­ dict {order_id: sum_amount} seÄŤtenĂ˝ z 'order_item'.
-    Pokud nelze spoÄŤĂ­tat (chybÄ›jĂ­cĂ­ tabulka/sloupce), vrĂˇtĂ­ prĂˇzdnĂ˝ dict.
+    Vrátí dict {order_id: sum_amount} sečtený z 'order_item' jedním GROUP BY dotazem.
+    Pokud nelze spočítat (chybějící tabulka/sloupce), vrátí prázdný dict.
     """
     if not order_ids:
         return {}
@@ -93,39 +87,22 @@ def _compute_amounts_for_orders(order_ids):
     if not schema["has_table"] or not schema["fk_col"]:
         return {}
 
-    fk = schema["fk_col"]
-    # Pokus 1: amount_czk pĹ™Ă­mo
-    if schema["amount_cols"]:
-        amount_col = schema["amount_cols"][0]
-        sql = f"""
-            SELECT {fk} as oid, COALESCE(SUM({amount_col}), 0) AS total
-            FROM order_item
-            WHERE {fk} IN :ids
-            GROUP BY {fk}
-        """
-        rows = db.session.execute(
-            db.text(sql.replace(":ids", "(:ids)")),
-            {"ids": tuple(order_ids)},
-        ).fetchall()
-        return {r.oid: float(r.total) for r in rows}
-
-    # Pokus 2: price * qty
-    if schema["price_cols"] and schema["qty_cols"]:
-        price = schema["price_cols"][0]
-        qty = schema["qty_cols"][0]
-        sql = f"""
-            SELECT {fk} as oid, COALESCE(SUM({price} * {qty}), 0) AS total
-            FROM order_item
-            WHERE {fk} IN :ids
-            GROUP BY {fk}
-        """
-        rows = db.session.execute(
-            db.text(sql.replace(":ids", "(:ids)")),
-            {"ids": tuple(order_ids)},
-        ).fetchall()
-        return {r.oid: float(r.total) for r in rows}
-
-    return {}
+    if schema["amount_col"]:
+        cols = [schema["fk_col"], schema["amount_col"]]
+    elif schema["price_col"] and schema["qty_col"]:
+        cols = [schema["fk_col"], schema["price_col"], schema["qty_col"]]
+    else:
+        return {}
+
+    t = table("order_item", *(column(c) for c in cols))
+    fk = t.c[schema["fk_col"]]
+    line = t.c[cols[1]] if len(cols) == 2 else t.c[cols[1]] * t.c[cols[2]]
+    rows = db.session.execute(
+        select(fk.label("oid"), func.coalesce(func.sum(line), 0).label("total"))
+        .where(fk.in_(list(order_ids)))
+        .group_by(fk)
+    ).all()
+    return {r.oid: float(r.total) for r in rows}
 
 
 def _vs_display(vs, order_id):
@@ -155,40 +132,14 @@ def _shipping_fee() -> Decimal:
         return Decimal("89.00")
 
 
-def _amounts_equal(a: Decimal, b: Decimal, tol: Decimal = Decimal("0.50")) -> bool:
-    """PorovnĂˇnĂ­ s tolerancĂ­ (napĹ™. odchylky/zaokrouhlenĂ­)."""
-    return abs(_to_decimal(a) - _to_decimal(b)) <= _to_decimal(tol)
-
-
-def _order_base_amount_czk(order: Order) -> Decimal | None:
-    """
-    ZĂˇkladnĂ­ ÄŤĂˇstka objednĂˇvky (bez poĹˇtovnĂ©ho):
-    - pĹ™ednostnÄ› Order.total_czk (pokud je)
-    - jinak dopoÄŤĂ­tat z order_item pomocĂ­ _compute_amounts_for_orders
-    """
-    total = getattr(order, "total_czk", None)
-    if total is not None:
-        try:
-            return _to_decimal(total)
-        except InvalidOperation:
-            return None
-
-    comp = _compute_amounts_for_orders([order.id])
-    if comp.get(order.id) is not None:
-        try:
-            return _to_decimal(comp[order.id])
-        except InvalidOperation:
-            return None
-    return None
-
-
 # --- QR endpoints ----------------------------------------------------------
 
 @payment_bp.get("/qr")
 def payment_qr_png():
     """
-    GET /api/payments/qr?amount=1234.00&vs=20250814&msg=Objednavka%20123
-    VracĂ­ PNG s QR kĂłdem (MIME image/png).
+    GET /api/payments/qr?amount=1234.00&vs=20250814&msg=Objednavka%20123[&format=svg]
+    Vrací QR kód jako PNG (default) nebo SVG. Obrázek je pro daný payload neměnný:
+    silný ETag + dlouhé max_age; If-None-Match → 304 bez vykreslování.
     """
     try:
         amount_raw = (request.args.get("amount") or "").strip()
@@ -202,31 +153,63 @@ def payment_qr_png():
         if amount <= 0:
             return jsonify({"ok": False, "error": "ÄŚĂˇstka musĂ­ bĂ˝t > 0."}), 400
 
+        fmt = (request.args.get("format") or "png").strip().lower()
+        if fmt not in QR_FORMATS:
+            return jsonify({"ok": False, "error": "Neplatný formát (png | svg)."}), 400
+
         vs = (request.args.get("vs") or "").strip() or None
         msg = (request.args.get("msg") or "").strip() or None
 
-        iban = _get_iban()
-        payload = _build_spd_payload(iban, amount, vs, msg)
-
-        img = qrcode.make(payload)
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        buf.seek(0)
-
-        return send_file(
-            buf,
-            mimetype="image/png",
-            as_attachment=False,
-            download_name="qr-platba.png",
-            max_age=60,
-            etag=False,
-            last_modified=None,
-        )
+        iban = get_iban()
+        payload = build_spd_payload(iban, amount, vs, msg)
+        return _qr_response(payload, fmt)
     except Exception as e:
         current_app.logger.exception("QR platba selhala")
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+def _qr_response(payload: str, fmt: str) -> Response:
+    """Odpověď s obrázkem QR (cache v procesu, ETag, Cache-Control immutable)."""
+    etag = image_etag(payload, fmt)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(render_qr(payload, fmt), mimetype=QR_FORMATS[fmt])
+        resp.headers["Content-Disposition"] = f"inline; filename=qr-platba.{fmt}"
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = QR_MAX_AGE_SECONDS
+    resp.cache_control.immutable = True
+    return resp
+
+
+@payment_bp.get("/qr/order/<vs>")
+def payment_qr_order(vs: str):
+    """
+    GET /api/payments/qr/order/<vs>
+    Předem vykreslený QR objednávky (static/qr/<vs>.png) jako statický soubor.
+    Chybí-li (vykreslení ještě neproběhlo / starší objednávka), vykreslí se teď.
+    """
+    try:
+        filename = order_qr.qr_filename(vs)
+    except ValueError:
+        return jsonify({"ok": False, "error": "Neplatný VS."}), 400
+
+    folder = order_qr.qr_folder()
+    if not os.path.exists(os.path.join(folder, filename)):
+        order = Order.query.filter_by(vs=vs).first()
+        if order is None:
+            return jsonify({"ok": False, "error": "Objednávka s tímto VS neexistuje."}), 404
+        try:
+            if order_qr.ensure_order_qr(order) is None:
+                return jsonify({"ok": False, "error": "Objednávka nemá částku k úhradě."}), 404
+        except Exception as e:
+            current_app.logger.exception("QR objednávky %s selhal", vs)
+            return jsonify({"ok": False, "error": str(e)}), 500
+
+    return send_from_directory(folder, filename, mimetype="image/png", max_age=QR_MAX_AGE_SECONDS)
+
+
 @payment_bp.get("/qr/payload")
 def payment_qr_payload():
     """GET /api/payments/qr/payload?amount=...&vs=...&msg=... â†’ JSON s SPD payloadem."""
@@ -244,8 +227,8 @@ def payment_qr_payload():
         vs = (request.args.get("vs") or "").strip() or None
         msg = (request.args.get("msg") or "").strip() or None
 
-        iban = _get_iban()
-        payload = _build_spd_payload(iban, amount, vs, msg)
+        iban = get_iban()
+        payload = build_spd_payload(iban, amount, vs, msg)
         return jsonify({"ok": True, "iban": iban, "amount": float(amount), "payload": payload})
     except Exception as e:
         current_app.logger.exception("QR payload selhal")
@@ -309,45 +292,158 @@ def payments_summary():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+# --- Keyset stránkování seznamu plateb ---------------------------------------
+
+# sort parametr → sloupec Order (amount = total_czk, received_at = created_at)
+_SORT_COLUMNS = {
+    "id": Order.id,
+    "vs": Order.vs,
+    "status": Order.status,
+    "amount": Order.total_czk,
+    "total_czk": Order.total_czk,
+    "received_at": Order.created_at,
+    "created_at": Order.created_at,
+}
+
+
+def _cursor_value(value):
+    """Hodnota řadicího sloupce → JSON (datetime/Decimal jako řetězec)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _encode_cursor(sort: str, direction: str, value, last_id: int) -> str:
+    raw = json.dumps([sort, direction, _cursor_value(value), last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token: str, sort: str, direction: str):
+    """Vrátí (hodnota, id) posledního řádku; cursor musí patřit ke stejnému řazení."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        c_sort, c_dir, value, last_id = json.loads(raw)
+        last_id = int(last_id)
+    except Exception:
+        raise ValueError("Neplatný cursor.")
+    if c_sort != sort or c_dir != direction:
+        raise ValueError("Cursor patří k jinému řazení (sort/direction).")
+
+    col = _SORT_COLUMNS[sort]
+    if value is not None:
+        try:
+            if col is Order.created_at:
+                value = datetime.fromisoformat(value)
+            elif col is Order.total_czk:
+                value = Decimal(value)
+        except (TypeError, ValueError, InvalidOperation):
+            raise ValueError("Neplatný cursor.")
+    return value, last_id
+
+
+def _keyset_page(q, col, direction: str, after, limit: int) -> list:
+    """
+    Stránka pro ORDER BY col <direction> NULLS LAST, id <direction> za řádkem
+    `after` = (hodnota, id), případně od začátku (after=None).
+    Ne-NULL část se čte přes row-value (col, id) > (…) – index seek na SQLite
+    i PostgreSQL; NULL část (vždy na konci) druhým dotazem jen podle id.
+    """
+    asc = direction == "asc"
+
+    def by(c):
+        return c.asc() if asc else c.desc()
+
+    def beyond(a, b):
+        return a > b if asc else a < b
+
+    if col is Order.id:
+        if after is not None:
+            q = q.filter(beyond(Order.id, after[1]))
+        return q.order_by(by(Order.id)).limit(limit).all()
+
+    rows = []
+    last_id = None
+    if after is None or after[0] is not None:
+        head = q.filter(col.isnot(None))
+        if after is not None:
+            head = q.filter(beyond(tuple_(col, Order.id), tuple_(*after)))
+        rows = head.order_by(by(col), by(Order.id)).limit(limit).all()
+        if len(rows) >= limit or not col.nullable:
+            return rows
+    else:
+        last_id = after[1]  # už jsme v NULL části
+
+    tail = q.filter(col.is_(None))
+    if last_id is not None:
+        tail = tail.filter(beyond(Order.id, last_id))
+    return rows + tail.order_by(by(Order.id)).limit(limit - len(rows)).all()
+
+
 @payment_bp.get("")
 def payments_list():
     """
-    StrĂˇnkovanĂ˝ seznam â€žplatebâ€ś z Order.
+    Stránkovaný seznam „plateb“ z Order.
     Query:
-      - page (default 1)
       - per_page (default 20, max 200)
+      - cursor (optional) – `next_cursor` z předchozí odpovědi; keyset stránkování
+        (WHERE (sloupec, id) za posledním řádkem), rychlost nezávisí na hloubce stránky
+      - page (default 1) – starší OFFSET stránkování, použije se jen bez `cursor`
       - status (optional, Order.status)
       - sort (optional: 'id','vs','status','amount','received_at','created_at','total_czk'; default 'id')
-      - direction ('asc' | 'desc', default 'desc')
+      - direction ('asc' | 'desc', default 'desc'); NULL hodnoty jsou vždy na konci
+      - count ('counter' | 'exact' | 'none', default 'counter') – `total` z čítače
+        order_status_count, přesným COUNT(*), nebo vůbec
     """
     try:
-        page = _safe_int(request.args.get("page", 1), 1)
+        page = _safe_int(request.args.get("page", 1), 1) or 1
         per_page = min(max(_safe_int(request.args.get("per_page", 20), 20), 1), 200)
         status = (request.args.get("status") or "").strip() or None
         sort = (request.args.get("sort") or "id").strip()
         direction = (request.args.get("direction") or "desc").strip().lower()
         if direction not in ("asc", "desc"):
             direction = "desc"
+        count_mode = (request.args.get("count") or "counter").strip().lower()
+        if count_mode not in ("counter", "exact", "none"):
+            count_mode = "counter"
+        if sort not in _SORT_COLUMNS:
+            sort = "id"
+        sort_col = _SORT_COLUMNS[sort]
 
         q = db.session.query(Order)
-        if status and hasattr(Order, "status"):
+        if status:
             q = q.filter(Order.status == status)
 
-        # Sort map (amount -> total_czk, received_at -> created_at)
-        sort_map = {
-            "id": getattr(Order, "id", None),
-            "vs": getattr(Order, "vs", None),
-            "status": getattr(Order, "status", None),
-            "amount": getattr(Order, "total_czk", None),
-            "total_czk": getattr(Order, "total_czk", None),
-            "received_at": getattr(Order, "created_at", None),
-            "created_at": getattr(Order, "created_at", None),
-        }
-        sort_col = sort_map.get(sort) or sort_map["id"]
-        q = q.order_by(sort_col.asc() if direction == "asc" else sort_col.desc())
+        raw_cursor = (request.args.get("cursor") or "").strip()
+        after = None
+        if raw_cursor:
+            try:
+                after = _decode_cursor(raw_cursor, sort, direction)
+            except ValueError as e:
+                return jsonify({"ok": False, "error": str(e)}), 400
+
+        if raw_cursor or page == 1:
+            rows = _keyset_page(q, sort_col, direction, after, per_page + 1)
+        else:
+            primary = sort_col.asc() if direction == "asc" else sort_col.desc()
+            tie = Order.id.asc() if direction == "asc" else Order.id.desc()
+            rows = (
+                q.order_by(primary.nulls_last(), tie)
+                .limit(per_page + 1)
+                .offset((page - 1) * per_page)
+                .all()
+            )
+        items = rows[:per_page]
+        has_more = len(rows) > per_page
+
+        if count_mode == "exact":
+            total = q.count()
+        elif count_mode == "counter":
+            total = order_counts.status_total(status)
+        else:
+            total = None
 
-        total = q.count()
-        items = q.limit(per_page).offset((page - 1) * per_page).all()
         ids = [o.id for o in items]
         computed = _compute_amounts_for_orders(ids) if ids else {}
 
@@ -365,14 +461,20 @@ def payments_list():
             }
 
         items_out = [map_order(o) for o in items]
+        next_cursor = (
+            _encode_cursor(sort, direction, getattr(items[-1], sort_col.key), items[-1].id)
+            if has_more else None
+        )
 
         return jsonify({
             "ok": True,
             "source_table": "Order",
-            "page": page,
+            "page": None if raw_cursor else page,
             "per_page": per_page,
             "total": total,
+            "total_source": None if total is None else count_mode,
             "items": items_out,
+            "next_cursor": next_cursor,
             "sort": {"column": sort, "direction": direction},
         })
     except Exception as e:
@@ -412,6 +514,18 @@ def mark_paid_by_vs():
         if len(ref) > 255:
             ref = ref[:255]
 
+        order = Order.query.filter_by(vs=vs).first()
+        if order is not None and order.status == "canceled":
+            # rezervace propadla a kusy jsou zpět v prodeji → zaplacení neobnovit, vyřešit ručně
+            current_app.logger.warning("mark-paid: VS %s patří zrušené objednávce #%s", vs, order.id)
+            return jsonify({
+                "ok": False,
+                "reason": "order_canceled",
+                "orderId": order.id,
+                "error": "Objednávka je zrušená (propadla rezervace) – platbu vyřešte ručně "
+                         "(vrácení peněz / nová objednávka).",
+            }), 409
+
         pay = Payment.query.filter_by(vs=vs).order_by(Payment.id.desc()).first()
 
         if pay:
@@ -434,10 +548,10 @@ def mark_paid_by_vs():
             db.session.add(pay)
             created = True
 
-        order = Order.query.filter_by(vs=vs).first()
         if order:
             order.status = "paid"
 
+        publish(vs, "received", order.status if order else None, pay.amount_czk)
         db.session.commit()
 
         return jsonify({
@@ -483,6 +597,7 @@ def sync_from_orders():
                     reference=f"auto-sync order #{o.id}",
                 )
             )
+            invalidate_on_commit(o.vs)
             created += 1
 
         if created:
@@ -506,31 +621,95 @@ def get_status_by_vs(vs: str):
         if not vs:
             return jsonify({"ok": False, "error": "ChybĂ­ VS."}), 400
 
-        pay = Payment.query.filter_by(vs=vs).order_by(Payment.id.desc()).first()
-        order = Order.query.filter_by(vs=vs).first()
+        def load():
+            pay = Payment.query.filter_by(vs=vs).order_by(Payment.id.desc()).first()
+            order = Order.query.filter_by(vs=vs).first()
+            if not pay and not order:
+                return None, None
+            return _status_json(pay, order), vs
 
-        return jsonify({
-            "ok": True,
-            "payment": None if not pay else {
-                "id": pay.id,
-                "vs": pay.vs,
-                "amountCzk": (float(getattr(pay, "amount_czk")) if getattr(pay, "amount_czk", None) is not None else None),
-                "status": pay.status,
-                "reference": getattr(pay, "reference", None),
-                "received_at": (pay.received_at.isoformat() if getattr(pay, "received_at", None) else None),
-            },
-            "order": None if not order else {
-                "id": order.id,
-                "status": getattr(order, "status", None),
-                "totalCzk": (float(getattr(order, "total_czk")) if getattr(order, "total_czk", None) is not None else None),
-                "created_at": (order.created_at.isoformat() if getattr(order, "created_at", None) else None),
-            }
-        }), 200
+        # polling z FE: krátká cache, maže se při změně stavu (status_cache)
+        data = cached(("status", vs), load) or {"payment": None, "order": None}
+        return jsonify({"ok": True, **data}), 200
 
     except Exception as e:
         current_app.logger.exception("get_status_by_vs failed")
         return jsonify({"ok": False, "error": str(e)}), 500
 
+
+def _status_json(pay: Payment | None, order: Order | None) -> dict:
+    return {
+        "payment": None if not pay else {
+            "id": pay.id,
+            "vs": pay.vs,
+            "amountCzk": (float(getattr(pay, "amount_czk")) if getattr(pay, "amount_czk", None) is not None else None),
+            "status": pay.status,
+            "reference": getattr(pay, "reference", None),
+            "received_at": (pay.received_at.isoformat() if getattr(pay, "received_at", None) else None),
+        },
+        "order": None if not order else {
+            "id": order.id,
+            "status": getattr(order, "status", None),
+            "totalCzk": (float(getattr(order, "total_czk")) if getattr(order, "total_czk", None) is not None else None),
+            "created_at": (order.created_at.isoformat() if getattr(order, "created_at", None) else None),
+        }
+    }
+
+
+@payment_bp.get("/events/<vs>")
+def payment_events_stream(vs: str):
+    """
+    GET /api/payments/events/<vs> – Server-Sent Events se stavem platby.
+    Hned po připojení pošle aktuální stav (`event: status`), pak každou změnu;
+    mezitím komentář `: heartbeat` po PAYMENT_EVENTS_HEARTBEAT_SECONDS.
+    Po stavu `received`/`canceled` stream skončí (FE má zavřít EventSource).
+    Nad PAYMENT_EVENTS_MAX_STREAMS otevřených streamů v procesu vrací 503
+    s Retry-After – klient zatím polluje /status/by-vs.
+    """
+    vs = (vs or "").strip()
+    if not vs:
+        return jsonify({"ok": False, "error": "Chybí VS."}), 400
+
+    cfg = current_app.config
+    # nejdřív odběr, pak počáteční stav → změna mezi nimi se neztratí
+    try:
+        q = broadcaster.subscribe(
+            current_app._get_current_object(), vs,
+            limit=int(cfg.get("PAYMENT_EVENTS_MAX_STREAMS", 8)),
+        )
+    except StreamLimitReached:
+        retry_after = int(cfg.get("PAYMENT_EVENTS_RETRY_AFTER_SECONDS", 30))
+        resp = jsonify({"ok": False, "error": "Příliš mnoho otevřených streamů, použijte /status/by-vs."})
+        resp.headers["Retry-After"] = str(retry_after)
+        return resp, 503
+    try:
+        pay = Payment.query.filter_by(vs=vs).order_by(Payment.id.desc()).first()
+        order = Order.query.filter_by(vs=vs).first()
+    except Exception:
+        broadcaster.unsubscribe(vs, q)
+        raise
+    if not pay and not order:
+        broadcaster.unsubscribe(vs, q)
+        return jsonify({"ok": False, "error": "Platba ani objednávka s tímto VS neexistuje."}), 404
+
+    initial = event_json(
+        None, vs,
+        pay.status if pay else None,
+        order.status if order else None,
+        pay.amount_czk if pay else None,
+    )
+    stream = stream_events(
+        vs, q, initial,
+        heartbeat=float(cfg.get("PAYMENT_EVENTS_HEARTBEAT_SECONDS", 15)),
+        max_seconds=float(cfg.get("PAYMENT_EVENTS_MAX_SECONDS", 120)),
+    )
+    # bez stream_with_context: DB spojení se vrátí do poolu ještě před streamováním
+    return Response(stream, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
 @payment_bp.post("/sync-csob-mail")
 def sync_csob_mail():
     """
@@ -557,79 +736,23 @@ def sync_csob_mail():
         ]
 
         # 1) BANKA â€“ tohle jedinĂ˝ pouĹľĂ­vĂˇme k pĂˇrovĂˇnĂ­
-        bank_pairs = fetch_csob_incoming(
-            host=host, port=port, ssl=ssl, user=user, password=password, folder=folder,
-            max_items=max_, bank_senders=bank_senders, mark_seen=True,
-        )
-
-        processed = []
-        unmatched = []
+        # párování celé dávky: 2 IN dotazy, jeden commit (services/payment_matching);
+        # \Seen se nastaví až po commitu
         fee = _shipping_fee()
-
-        for vs, amount in bank_pairs:
-            order = Order.query.filter_by(vs=str(vs)).first()
-            if not order:
-                unmatched.append({
-                    "vs": str(vs),
-                    "reason": "order_not_found",
-                    "paid": float(amount),
-                })
-                continue
-
-            # === NOVÄš: oÄŤekĂˇvanĂˇ ÄŤĂˇstka = primĂˇrnÄ› order.total_czk; fallback base+fee ===
-            expected_dec = None
-            total_czk_val = getattr(order, "total_czk", None)
-            if total_czk_val is not None:
-                try:
-                    expected_dec = _to_decimal(total_czk_val)
-                except InvalidOperation:
-                    expected_dec = None
-
-            if expected_dec is None:
-                base = _order_base_amount_czk(order)
-                if base is None:
-                    unmatched.append({
-                        "vs": str(vs),
-                        "reason": "order_amount_missing",
-                        "paid": float(amount),
-                    })
-                    continue
-                expected_dec = _to_decimal(base) + fee
-
-            paid_dec = _to_decimal(amount)
-
-            if _amounts_equal(paid_dec, expected_dec):
-                # idempotence
-                if order.status != "paid":
-                    order.status = "paid"
-
-                pay = Payment.query.filter_by(vs=str(vs)).order_by(Payment.id.desc()).first()
-                if pay:
-                    pay.status = "received"
-                    pay.amount_czk = paid_dec
-                    if getattr(pay, "received_at", None) is None:
-                        pay.received_at = datetime.utcnow()
-                else:
-                    pay = Payment(vs=str(vs), amount_czk=paid_dec, status="received", received_at=datetime.utcnow())
-                    db.session.add(pay)
-
-                processed.append({
-                    "vs": str(vs),
-                    "amount": float(paid_dec),
-                    "expected": float(expected_dec),
-                    "orderId": order.id
-                })
-            else:
-                unmatched.append({
-                    "vs": str(vs),
-                    "reason": "amount_mismatch",
-                    "paid": float(paid_dec),
-                    "expected": float(expected_dec),
-                    "orderId": order.id,
-                })
+        report = fetch_and_apply(
+            lambda bank_pairs: match_confirmations(
+                bank_pairs,
+                require_amount_match=True,
+                shipping_fee=fee,
+                item_totals=_compute_amounts_for_orders,
+            ),
+            imap_settings(host, port, ssl, user, password, folder),
+            max_items=max_, allow_senders=bank_senders, mark_seen=True,
+        )
+        processed = report["processed"]
+        unmatched = report["unmatched"]
 
         if processed:
-            db.session.commit()
             # Telegram shrnutĂ­
             lines = [f"âś… PĹ™ijata platba VS {p['vs']} â€˘ {p['amount']:.2f} CZK (oÄŤek. {p['expected']:.2f}) â€˘ objednĂˇvka #{p['orderId']}" for p in processed]
             try:
@@ -670,3 +793,35 @@ def sync_csob_mail():
         db.session.rollback()
         return jsonify({"ok": False, "error": str(e)}), 500
 
+
+@payment_bp.post("/import-statement")
+def import_statement():
+    """
+    POST /api/payments/import-statement (multipart: file=<.gpc|.abo|.csv>,
+    volitelně format=gpc|csv, dry_run=1, vs_only=1)
+    Výpis se čte po řádcích a příjmy s VS se párují po dávkách (viz
+    services.bank_statements); už importované transakce se přeskočí.
+    vs_only=1 = párovat jen podle VS, bez kontroly částky.
+    """
+    f = request.files.get("file")
+    if not f or not f.filename:
+        return jsonify({"ok": False, "error": "Missing file"}), 400
+    dry_run = (request.form.get("dry_run") or request.args.get("dry_run")) == "1"
+    vs_only = (request.form.get("vs_only") or request.args.get("vs_only")) == "1"
+    try:
+        fmt = bank_statements.detect_format(f.filename, default=request.form.get("format"))
+        result = bank_statements.import_statement(
+            f.stream,
+            fmt,
+            dry_run=dry_run,
+            require_amount_match=not vs_only,
+            shipping_fee=_shipping_fee(),
+            item_totals=_compute_amounts_for_orders,
+        )
+    except bank_statements.StatementImportError as exc:
+        return jsonify({"ok": False, "error": str(exc)}), 400
+    except Exception as e:
+        current_app.logger.exception("import_statement failed")
+        db.session.rollback()
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify({"ok": True, **result}), 200
@@ -1,30 +1,18 @@
+import io
 import json
 import os
-import uuid
-from flask import Blueprint, jsonify, request, url_for, current_app
+from decimal import Decimal
+from flask import Blueprint, Response, jsonify, request, url_for, current_app, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 
 from backend.extensions import db
-from backend.models import Product, ProductMedia, ProductVariant, ProductVariantMedia, Category
+from backend.models import Product, ProductMedia, ProductVariant, ProductVariantMedia, Category, ImageMeta
+from backend.services import catalog_io
+from backend.services.images import PIL_OK, normalize_image, safe_uuid_name
 from sqlalchemy.orm import selectinload
 
 api_products = Blueprint("api_products", __name__, url_prefix="/api/products")
 
-# --- Volitelné závislosti pro robustní práci s obrázky ---
-try:
-    from PIL import Image, ImageOps
-    PIL_OK = True
-except Exception:
-    PIL_OK = False
-
-# HEIC (iPhone) podpora je volitelná – pokud je nainstalováno pillow-heif, zaregistrujeme dekodér
-if PIL_OK:
-    try:
-        import pillow_heif  # type: ignore
-        pillow_heif.register_heif_opener()
-    except Exception:
-        pass
-
 
 # ========================= Pomocné funkce =========================
 
@@ -49,7 +37,7 @@ def _uploads_dir() -> str:
 
 def _safe_uuid_name(ext: str = ".webp") -> str:
     """Vytvoří bezpečný název souboru `uuid.ext`."""
-    return f"{uuid.uuid4().hex}{ext.lower()}"
+    return safe_uuid_name(ext)
 
 
 def _save_raw(fs) -> str:
@@ -66,11 +54,8 @@ def _save_raw(fs) -> str:
 
 def _process_and_save_image(fs) -> str:
     """
-    Normalizace obrázku:
-    - EXIF orientace
-    - RGB
-    - max 1600x1600
-    - WebP (quality 85)
+    Normalizace obrázku (EXIF, RGB, max 1600x1600, WebP) – viz services.images.normalize_image.
+    Zároveň zaznamená metadata (rozměry, velikost, barva, LQIP) do ImageMeta v aktuální session.
     Vrací relativní název .webp (bez 'uploads/').
     Pokud PIL není dostupné → uloží se surový soubor (_save_raw).
     """
@@ -78,30 +63,41 @@ def _process_and_save_image(fs) -> str:
         return _save_raw(fs)
 
     try:
-        # Načtení přes PIL (pillow-heif umožní HEIC/HEIF)
-        img = Image.open(fs.stream if hasattr(fs, "stream") else fs)
-        # EXIF auto-rotate
-        img = ImageOps.exif_transpose(img)
-        # Konverze do RGB (odstranění profilů/CMYK apod.)
-        if img.mode not in ("RGB", "RGBA"):
-            img = img.convert("RGB")
-        # Zmenšit dlouhou stranu na max 1600
-        img.thumbnail((1600, 1600), Image.Resampling.LANCZOS)
-
-        # Pokud je RGBA, převedeme na RGB s bílým pozadím (aby WebP nemělo nečekanou průhlednost)
-        if img.mode == "RGBA":
-            bg = Image.new("RGB", img.size, (255, 255, 255))
-            bg.paste(img, mask=img.split()[-1])
-            img = bg
-
-        out_name = _safe_uuid_name(".webp")
-        out_path = os.path.join(_uploads_dir(), out_name)
-        img.save(out_path, format="WEBP", quality=85, method=6)
-        return out_name
+        out_name, meta = normalize_image(fs.stream if hasattr(fs, "stream") else fs, _uploads_dir())
     except Exception:
         # Když se cokoliv pokazí, alespoň uložíme originál
         return _save_raw(fs)
 
+    _record_image_meta(out_name, meta)
+    return out_name
+
+
+def _record_image_meta(filename: str, meta: dict | None) -> None:
+    """Přidá ImageMeta do session (commit řeší volající spolu s médiem)."""
+    if not filename or not meta:
+        return
+    db.session.add(ImageMeta(filename=filename, **meta))
+
+
+def _load_image_meta(products) -> dict[str, dict]:
+    """
+    Načte metadata všech obrázků daných produktů jedním dotazem.
+    Vrací {filename: {width, height, byte_size, dominant_color, lqip}}.
+    """
+    names: set[str] = set()
+    for p in products:
+        if p.image:
+            names.add(p.image)
+        names.update(m.filename for m in (p.media or []) if m.filename)
+        for v in p.variants or []:
+            if v.image:
+                names.add(v.image)
+            names.update(m.filename for m in (v.media or []) if m.filename)
+    if not names:
+        return {}
+    rows = ImageMeta.query.filter(ImageMeta.filename.in_(names)).all()
+    return {r.filename: r.to_dict() for r in rows}
+
 
 def _parse_variants_from_request():
     """
@@ -109,7 +105,7 @@ def _parse_variants_from_request():
     Podporuje:
       - JSON payload: {"variants": [{variant_name, wrist_size, image}]}
       - form-data pole 'variants' s JSON stringem
-      - form-data pole variant_name[] / variant_wrist_size[] / variant_image[]
+      - form-data pole variant_name[] / variant_wrist_size[] / variant_image[] (+ variant_id[] u editace)
     Vrací (variants_list, explicit_flag).
     explicit_flag říká, zda byl klientem variantový payload poskytnut (i prázdný),
     abychom mohli u PUT rozhodnout, zda varianty přepsat.
@@ -145,6 +141,7 @@ def _parse_variants_from_request():
                         continue
                     variants.append(
                         {
+                            "id": _to_int(v.get("id"), default=None),
                             "variant_name": (v.get("variant_name") or v.get("name") or "").strip() or None,
                             "wrist_size": (v.get("wrist_size") or "").strip() or None,
                             "description": (v.get("description") or "").strip() or None,
@@ -165,6 +162,7 @@ def _parse_variants_from_request():
                         continue
                     variants.append(
                         {
+                            "id": _to_int(v.get("id"), default=None),
                             "variant_name": (v.get("variant_name") or v.get("name") or "").strip() or None,
                             "wrist_size": (v.get("wrist_size") or "").strip() or None,
                             "description": (v.get("description") or "").strip() or None,
@@ -178,6 +176,7 @@ def _parse_variants_from_request():
             pass
 
     names = request.form.getlist("variant_name[]")
+    ids = [] if is_add_request else request.form.getlist("variant_id[]")
     wrists = request.form.getlist("variant_wrist_size[]")
     stocks = request.form.getlist("variant_stock[]")
     files = request.files.getlist("variant_image[]")
@@ -216,6 +215,7 @@ def _parse_variants_from_request():
             continue
         variants.append(
             {
+                "id": _to_int(ids[i], default=None) if i < len(ids) else None,
                 "variant_name": (n or None),
                 "wrist_size": (w or None),
                 "description": (desc or None),
@@ -231,15 +231,127 @@ def _parse_variants_from_request():
     return variants, explicit
 
 
-def _variant_media_dict(m: ProductVariantMedia):
+def _same_value(current, new) -> bool:
+    """Porovnání hodnot sloupců; čísla (Decimal vs float z formuláře) na 2 desetinná místa."""
+    if isinstance(current, (Decimal, float)) or isinstance(new, (Decimal, float)):
+        if current is None or new is None:
+            return current is None and new is None
+        q = Decimal("0.01")
+        return Decimal(str(current)).quantize(q) == Decimal(str(new)).quantize(q)
+    return current == new
+
+
+def _set_if_changed(obj, field: str, value) -> bool:
+    """Nastaví atribut jen při skutečné změně (SQLAlchemy pak nevygeneruje zbytečný UPDATE)."""
+    if _same_value(getattr(obj, field), value):
+        return False
+    setattr(obj, field, value)
+    return True
+
+
+def _sync_variants(product: Product, variants_payload: list[dict]) -> None:
+    """
+    Sesynchronizuje varianty produktu s payloadem bez mazání a znovuvkládání:
+    - párování podle id, jinak podle stabilního klíče (název + velikost),
+    - změněné řádky se upraví na místě, nové se vloží, chybějící se smažou,
+    - média varianty se mění jen tam, kde se skutečně liší sada souborů.
+    Nepoužívané soubory se po úpravě smažou z uploads.
+    """
+    existing = list(product.variants or [])
+    by_id = {v.id: v for v in existing}
+    unmatched = {v.id: v for v in existing}
+
+    def _key(name, wrist) -> tuple[str, str]:
+        return ((name or "").strip().lower(), (wrist or "").strip().lower())
+
+    old_files: set[str] = set()
+    for ov in existing:
+        if ov.image:
+            old_files.add(ov.image)
+        old_files.update(mv.filename for mv in (ov.media or []) if mv.filename)
+
+    new_files: set[str] = set()
+
+    for variant in variants_payload:
+        img_name = variant.get("image") or variant.get("existing_image") or None
+        if variant.get("image_file"):
+            img_name = _process_and_save_image(variant["image_file"])
+
+        if not (variant.get("variant_name") or variant.get("wrist_size") or img_name):
+            continue
+
+        # 1) párování na existující variantu
+        v_obj = None
+        vid = variant.get("id")
+        if vid is not None and vid in unmatched:
+            v_obj = unmatched.pop(vid)
+        elif vid is None or vid not in by_id:
+            key = _key(variant.get("variant_name"), variant.get("wrist_size"))
+            for cand in unmatched.values():
+                if _key(cand.variant_name, cand.wrist_size) == key:
+                    v_obj = unmatched.pop(cand.id)
+                    break
+
+        fields = {
+            "variant_name": variant.get("variant_name"),
+            "wrist_size": variant.get("wrist_size"),
+            "description": variant.get("description"),
+            "price_czk": variant.get("price_czk"),
+            "stock": variant.get("stock") or 0,
+            "image": img_name,
+        }
+        if v_obj is None:
+            v_obj = ProductVariant(product_id=product.id, **fields)
+            product.variants.append(v_obj)
+        else:
+            for field, value in fields.items():
+                _set_if_changed(v_obj, field, value)
+
+        if img_name:
+            new_files.add(img_name)
+
+        # 2) média varianty – jen rozdíl (JSON payload média nenese → necháme je beze změny)
+        if "existing_extra" not in variant and "extra_files" not in variant:
+            new_files.update(m.filename for m in (v_obj.media or []) if m.filename)
+            continue
+        wanted: list[str] = [fn for fn in (variant.get("existing_extra") or []) if fn]
+        for ef in variant.get("extra_files") or []:
+            wanted.append(_process_and_save_image(ef))
+        new_files.update(wanted)
+
+        wanted_set = set(wanted)
+        current = {m.filename: m for m in (v_obj.media or [])} if v_obj.id else {}
+        for fn, m in current.items():
+            if fn not in wanted_set:
+                v_obj.media.remove(m)
+        for fn in wanted:
+            if fn not in current:
+                v_obj.media.append(ProductVariantMedia(filename=fn))
+                current[fn] = None
+
+    # 3) varianty, které v payloadu nejsou → smazat (media jdou přes cascade)
+    for leftover in unmatched.values():
+        product.variants.remove(leftover)
+
+    # 4) uklidit soubory, na které už nic neodkazuje
+    for fname in old_files - new_files:
+        try:
+            os.remove(os.path.join(current_app.root_path, "static", "uploads", fname))
+        except Exception:
+            pass
+
+
+def _variant_media_dict(m: ProductVariantMedia, metas: dict | None = None):
     return {
         "id": m.id,
         "image": m.filename,
         "image_url": f"/static/uploads/{m.filename}" if m.filename else None,
+        "meta": (metas or {}).get(m.filename),
     }
 
 
-def _variant_dict(variant: ProductVariant):
+def _variant_dict(variant: ProductVariant, metas: dict | None = None):
+    metas = metas or {}
     return {
         "id": variant.id,
         "variant_name": variant.variant_name,
@@ -249,11 +361,19 @@ def _variant_dict(variant: ProductVariant):
         "stock": variant.stock,
         "image": variant.image,
         "image_url": f"/static/uploads/{variant.image}" if variant.image else None,
-        "media": [_variant_media_dict(m) for m in (variant.media or [])],
+        "image_meta": metas.get(variant.image) if variant.image else None,
+        "media": [_variant_media_dict(m, metas) for m in (variant.media or [])],
     }
 
 
-def _product_dict(product: Product):
+def _product_dict(product: Product, metas: dict | None = None):
+    """
+    Serializace produktu pro API.
+    `metas` = předem načtená metadata obrázků (_load_image_meta) – u seznamů je předávej,
+    ať se nedotazujeme zvlášť pro každý produkt.
+    """
+    if metas is None:
+        metas = _load_image_meta([product])
     category_name = product.category.name if product.category else None
     category_group = product.category.group if product.category else None
 
@@ -269,10 +389,13 @@ def _product_dict(product: Product):
         "wrist_size": product.wrist_size,
         # Use relative URLs so frontend can prefix with its own origin/port
         "image_url": f"/static/uploads/{product.image}" if product.image else None,
+        "image_meta": metas.get(product.image) if product.image else None,
         "media": [f"/static/uploads/{m.filename}" for m in (product.media or [])],
+        # metadata ve stejném pořadí jako "media" (None pro videa / neznámé soubory)
+        "media_meta": [metas.get(m.filename) for m in (product.media or [])],
         "categories": ([category_name] if category_name else []),
         "category_group": category_group,
-        "variants": [_variant_dict(v) for v in (product.variants or [])],
+        "variants": [_variant_dict(v, metas) for v in (product.variants or [])],
     }
 
 
@@ -291,7 +414,8 @@ def get_products():
         .order_by(Product.id.desc())
         .all()
     )
-    return jsonify([_product_dict(p) for p in items]), 200
+    metas = _load_image_meta(items)
+    return jsonify([_product_dict(p, metas) for p in items]), 200
 
 
 @api_products.get("/<int:product_id>")
@@ -308,6 +432,53 @@ def get_product(product_id: int):
     return jsonify(_product_dict(p)), 200
 
 
+@api_products.get("/export")
+def export_catalog():
+    """
+    GET /api/products/export?format=csv|xlsx
+    Export produktů + variant + skladu (formát viz services.catalog_io).
+    """
+    fmt = (request.args.get("format") or "csv").strip().lower()
+    if fmt == "xlsx":
+        buf = io.BytesIO()
+        catalog_io.export_xlsx(buf)
+        buf.seek(0)
+        return send_file(
+            buf,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            as_attachment=True,
+            download_name="katalog.xlsx",
+        )
+    if fmt != "csv":
+        return jsonify({"error": "Unsupported format"}), 400
+    return Response(
+        stream_with_context(catalog_io.iter_export_csv()),
+        mimetype="text/csv; charset=utf-8",
+        headers={"Content-Disposition": "attachment; filename=katalog.csv"},
+    )
+
+
+@api_products.post("/import")
+def import_catalog():
+    """
+    POST /api/products/import (multipart: file=<csv|xlsx>, volitelně dry_run=1)
+    Nejdřív se zvaliduje celý soubor; při chybách se nic nezapíše a vrací 400 se seznamem řádků.
+    """
+    f = request.files.get("file")
+    if not f or not f.filename:
+        return jsonify({"error": "Missing file"}), 400
+    fmt = catalog_io.detect_format(f.filename, default=(request.form.get("format") or "csv"))
+    dry_run = (request.form.get("dry_run") or request.args.get("dry_run")) == "1"
+
+    try:
+        result = catalog_io.import_catalog(f.stream, fmt, dry_run=dry_run)
+    except catalog_io.CatalogImportError as exc:
+        return jsonify({"error": str(exc), "errors": exc.errors[:200]}), 400
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result), 200
+
+
 @api_products.post("/")
 def add_product():
     data = request.form if request.form else (request.get_json(silent=True) or {})
@@ -381,6 +552,7 @@ def add_product():
         result = []
         for v in items:
             key = (
+                v.get("id"),
                 (v.get("variant_name") or "").strip().lower(),
                 (v.get("wrist_size") or "").strip().lower(),
                 (v.get("description") or "").strip().lower(),
@@ -435,7 +607,11 @@ def add_product():
 
 @api_products.put("/<int:product_id>")
 def update_product(product_id: int):
-    p = Product.query.get_or_404(product_id)
+    p = (
+        Product.query.options(selectinload(Product.variants).selectinload(ProductVariant.media))
+        .filter(Product.id == product_id)
+        .first_or_404()
+    )
 
     data = request.form if request.form else (request.get_json(silent=True) or {})
     clear_variants_flag = request.form.get("clear_variants") == "1"
@@ -471,6 +647,7 @@ def update_product(product_id: int):
         result = []
         for v in items:
             key = (
+                v.get("id"),
                 (v.get("variant_name") or "").strip().lower(),
                 (v.get("wrist_size") or "").strip().lower(),
                 (v.get("description") or "").strip().lower(),
@@ -524,60 +701,7 @@ def update_product(product_id: int):
             return jsonify({"error": "Invalid category_id"}), 400
 
     if variants_explicit:
-        old_variants = list(p.variants or [])
-        existing_files: set[str] = set()
-        for ov in old_variants:
-            if ov.image:
-                existing_files.add(ov.image)
-            for mv in list(ov.media or []):
-                if mv.filename:
-                    existing_files.add(mv.filename)
-
-        p.variants.clear()
-        new_files: set[str] = set()
-
-        for variant in variants_payload:
-            img_name = variant.get("image") or variant.get("existing_image") or None
-            if variant.get("image_file"):
-                img_name = _process_and_save_image(variant["image_file"])
-
-            if not (variant.get("variant_name") or variant.get("wrist_size") or img_name):
-                continue
-
-            if img_name:
-                new_files.add(img_name)
-
-            extra_existing = variant.get("existing_extra") or []
-            extra_saved: list[str] = []
-            for ef in variant.get("extra_files") or []:
-                saved = _process_and_save_image(ef)
-                extra_saved.append(saved)
-
-            new_files.update(extra_existing)
-            new_files.update(extra_saved)
-
-            v_obj = ProductVariant(
-                product_id=p.id,
-                variant_name=variant.get("variant_name"),
-                wrist_size=variant.get("wrist_size"),
-                description=variant.get("description"),
-                price_czk=variant.get("price_czk"),
-                stock=variant.get("stock") or 0,
-                image=img_name,
-            )
-            db.session.add(v_obj)
-
-            for fn in extra_existing:
-                db.session.add(ProductVariantMedia(variant=v_obj, filename=fn))
-            for fn in extra_saved:
-                db.session.add(ProductVariantMedia(variant=v_obj, filename=fn))
-
-        # remove unused old files
-        for fname in existing_files - new_files:
-            try:
-                os.remove(os.path.join(current_app.root_path, "static", "uploads", fname))
-            except Exception:
-                pass
+        _sync_variants(p, variants_payload)
 
     # --- Hlavní obrázek: při změně normalizovat do WebP ---
     image_file = request.files.get("image")
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from flask import Blueprint, request, jsonify
+
+from backend.services.stock import StockError, apply_adjustments
+
+api_stock = Blueprint("api_stock", __name__, url_prefix="/api/stock")
+
+# Horní limit položek v jednom požadavku (ochrana proti obřím payloadům)
+MAX_ITEMS = 20000
+
+
+@api_stock.post("/bulk")
+def bulk_adjust():
+    """
+    POST /api/stock/bulk
+    {"items": [{"product_id": 1, "stock": 10}, {"variant_id": 5, "delta": -2}, ...]}
+    Každá položka má buď product_id, nebo variant_id, a buď absolutní `stock`, nebo `delta`.
+    Vše proběhne v jedné transakci; vrací výsledné stavy a neexistující id.
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({"ok": False, "error": "Očekávám neprázdný seznam 'items'"}), 400
+    if len(items) > MAX_ITEMS:
+        return jsonify({"ok": False, "error": f"Maximálně {MAX_ITEMS} položek na požadavek"}), 413
+
+    try:
+        result = apply_adjustments(items)
+    except StockError as exc:
+        return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
+
+    return jsonify({"ok": True, **result}), 200
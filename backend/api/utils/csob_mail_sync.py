@@ -5,7 +5,7 @@ import email
 import re
 import html as _html
 from decimal import Decimal
-from typing import List, Tuple, Iterable, Optional
+from typing import Callable, List, Tuple, Iterable, Optional
 
 # ---- Regexy ---------------------------------------------------------------
 
@@ -132,6 +132,274 @@ def _extract_from_csob_html(html: str) -> Tuple[Optional[str], Optional[Decimal]
 
 # ---- IMAP fetchery --------------------------------------------------------
 
+# Hlavičky pro filtr odesílatele – BODY.PEEK nenastavuje \Seen
+HEADER_FETCH = "(UID BODY.PEEK[HEADER.FIELDS (FROM SENDER SUBJECT MESSAGE-ID)])"
+BODY_FETCH = "(UID BODY.PEEK[])"
+# UID na jeden FETCH těl (bankovní zprávy)
+BODY_BATCH = 50
+
+_UID_RE = re.compile(rb"UID (\d+)")
+
+
+def _uid_set(uids: Iterable[int]) -> str:
+    """[1, 2, 3, 7, 9, 10] → "1:3,7,9:10" (kompaktní sekvence pro UID příkazy)."""
+    parts = []
+    run_start = prev = None
+    for uid in sorted(set(uids)):
+        if prev is not None and uid == prev + 1:
+            prev = uid
+            continue
+        if run_start is not None:
+            parts.append(f"{run_start}:{prev}" if prev != run_start else str(run_start))
+        run_start = prev = uid
+    if run_start is not None:
+        parts.append(f"{run_start}:{prev}" if prev != run_start else str(run_start))
+    return ",".join(parts)
+
+
+def _parse_fetch(data) -> List[Tuple[int, bytes]]:
+    """
+    Odpověď imaplib na UID FETCH → [(uid, literal)].
+    UID bývá před literálem (v tuple), některé servery ho posílají až za ním.
+    """
+    out: List[Tuple[int, bytes]] = []
+    items = list(data or [])
+    for i, item in enumerate(items):
+        if not isinstance(item, tuple) or len(item) < 2:
+            continue
+        m = _UID_RE.search(item[0] or b"")
+        if not m and i + 1 < len(items) and isinstance(items[i + 1], bytes):
+            m = _UID_RE.search(items[i + 1])
+        if m:
+            out.append((int(m.group(1)), item[1] or b""))
+    return out
+
+
+def _uidvalidity(imap) -> Optional[int]:
+    typ, data = imap.response("UIDVALIDITY")
+    try:
+        return int(data[0]) if data and data[0] else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _highest_uid(imap) -> int:
+    """Nejvyšší UID ve složce (`UID FETCH *` vrátí poslední zprávu), 0 = prázdná."""
+    typ, data = imap.uid("FETCH", "*", "(UID)")
+    if typ != "OK":
+        return 0
+    uids = [int(m) for item in (data or []) if isinstance(item, bytes) for m in _UID_RE.findall(item)]
+    return max(uids, default=0)
+
+
+def _load_checkpoint(account: str, folder: str, scope: str):
+    from backend.extensions import db
+    from backend.models import ImapCheckpoint
+
+    return (
+        db.session.query(ImapCheckpoint)
+        .filter_by(account=account, folder=folder, scope=scope)
+        .one_or_none()
+    )
+
+
+def _stage_checkpoint(cp, account: str, folder: str, scope: str, uidvalidity: int, last_uid: int) -> None:
+    """Posune checkpoint v session – uloží se commitem volajícího (spolu se spárovanými platbami)."""
+    from datetime import datetime
+
+    from backend.extensions import db
+    from backend.models import ImapCheckpoint
+
+    if cp is None:
+        cp = ImapCheckpoint(account=account, folder=folder, scope=scope)
+        db.session.add(cp)
+    cp.uidvalidity = uidvalidity
+    cp.last_uid = max(int(last_uid), int(cp.last_uid or 0) if cp.uidvalidity == uidvalidity else 0)
+    cp.updated_at = datetime.utcnow()
+
+
+def fetch_from_connection(
+    imap,
+    *,
+    account: str,
+    folder: str = "INBOX",
+    max_items: int = 50,
+    allow_senders: Optional[Iterable[str]] = None,
+    mark_seen: bool = True,
+    checkpoint_scope: Optional[str] = None,
+) -> Tuple[List[Tuple[str, Decimal, str]], bool, List[int]]:
+    """
+    Jeden průchod nad už přihlášeným spojením (IMAP worker ho drží otevřené):
+    vybere složku, stáhne nové zprávy a zkusí z nich vytěžit (vs, amount).
+    Filtruje podle allow_senders (substring match v hlavičce From/Sender).
+    Vrací (řádky, další, k_označení) – řádky jsou trojice (vs, amount,
+    sender_header), `další` = zbyli kandidáti nad `max_items`, vezme je další
+    průchod, `k_označení` = UID pro `mark_seen_uids` až po commitu volajícího.
+    Složku nezavírá, spojení neodhlašuje.
+
+    Postup (vše přes UID):
+    1) výběr zpráv – s `checkpoint_scope` UID za posledním checkpointem
+       (`last_uid+1:*`, bez ohledu na \\Seen), jinak / při prvním běhu či změně
+       UIDVALIDITY jen UNSEEN;
+    2) jedním FETCH hlavičky From/Sender/Subject/Message-ID pro celou sadu;
+       s `checkpoint_scope` se zprávy známé z bank_message (Message-ID) dál
+       nestahují – jen dostanou \\Seen;
+    3) těla jen zpráv od povolených odesílatelů, po BODY_BATCH UID na FETCH
+       (nejvýš `max_items` zpráv; zbytek počká na další běh); stejné tělo pod
+       jiným Message-ID se zapíše jako `duplicate` a nepáruje;
+    4) \\Seen pro zprávy, ze kterých se vytěžila platba: s `checkpoint_scope`
+       je vrátí volajícímu – označí je až po commitu (první běh / změna
+       UIDVALIDITY bere jen UNSEEN, takže dřívější \\Seen by zprávy po
+       rollbacku ztratil); bez checkpointu jedním STORE hned.
+    Checkpoint i záznamy bank_message se přidají do db.session, commit je na
+    volajícím (match_confirmations) – když párování selže a rollbackne se,
+    zprávy se přečtou znovu.
+    """
+    typ, _ = imap.select(folder)
+    if typ != "OK":
+        raise RuntimeError(f"IMAP složku {folder!r} nelze otevřít.")
+    uidvalidity = _uidvalidity(imap)
+
+    cp = None
+    use_checkpoint = bool(checkpoint_scope and uidvalidity is not None)
+    if use_checkpoint:
+        cp = _load_checkpoint(account, folder, checkpoint_scope)
+        if cp is not None and cp.uidvalidity != uidvalidity:
+            cp_last = None  # složka přečíslována → starý checkpoint neplatí
+        else:
+            cp_last = cp.last_uid if cp is not None else None
+    else:
+        cp_last = None
+
+    # 1) výběr UID
+    highest = _highest_uid(imap) if use_checkpoint else 0
+    if cp_last is not None:
+        uid_range = f"{cp_last + 1}:*"
+    else:
+        typ, data = imap.uid("SEARCH", None, "UNSEEN")
+        unseen = [int(x) for x in (data[0] or b"").split()] if typ == "OK" and data else []
+        uid_range = _uid_set(unseen)
+
+    headers: List[Tuple[int, bytes]] = []
+    if uid_range:
+        # 2) hlavičky celé sady jedním příkazem
+        typ, data = imap.uid("FETCH", uid_range, HEADER_FETCH)
+        if typ == "OK":
+            headers = _parse_fetch(data)
+    if cp_last is not None:
+        # "n:*" vrátí i poslední zprávu, když je n > nejvyšší UID
+        headers = [(uid, raw) for uid, raw in headers if uid > cp_last]
+    headers.sort()
+
+    dedup = bool(checkpoint_scope)
+    if dedup:
+        from backend.services import bank_messages
+
+    candidates: List[Tuple[int, str, str, str]] = []
+    for uid, raw in headers:
+        hdr = email.message_from_bytes(raw)
+        sender_hdr = ((hdr.get("From") or "") + " " + (hdr.get("Sender") or "")).strip()
+        if allow_senders and not _sender_matches(sender_hdr, allow_senders):
+            continue
+        candidates.append((uid, sender_hdr, hdr.get("Subject") or "", (hdr.get("Message-ID") or "").strip()))
+
+    # už zpracované (např. pád před STORE, ruční přečtení, přeskenování složky)
+    done_uids: List[int] = []
+    if dedup and candidates:
+        done = bank_messages.known(bank_messages.message_key(c[3]) for c in candidates)
+        fresh = []
+        for c in candidates:
+            outcome = done.get(bank_messages.message_key(c[3]))
+            if outcome is None:
+                fresh.append(c)
+            elif outcome != bank_messages.UNPARSED:
+                done_uids.append(c[0])  # nevytěžitelné necháváme nepřečtené pro člověka
+        candidates = fresh
+
+    truncated = len(candidates) > max_items
+    candidates = candidates[:max_items]
+
+    # 3) těla jen kandidátů, po dávkách
+    out: List[Tuple[str, Decimal, str]] = []
+    parsed_uids: List[int] = []
+    run_keys: set = set()
+    for i in range(0, len(candidates), BODY_BATCH):
+        batch = candidates[i:i + BODY_BATCH]
+        meta = {uid: (sender_hdr, subject, mid) for uid, sender_hdr, subject, mid in batch}
+        typ, data = imap.uid("FETCH", _uid_set(meta), BODY_FETCH)
+        if typ != "OK":
+            continue
+        bodies = sorted(_parse_fetch(data))
+        if dedup:
+            digests = {uid: bank_messages.body_hash(raw) for uid, raw in bodies}
+            seen_digests = bank_messages.known_hashes(digests.values())
+        for uid, raw in bodies:
+            if uid not in meta:
+                continue
+            sender_hdr, subject, mid = meta.pop(uid)
+
+            if dedup:
+                digest = digests[uid]
+                key = bank_messages.message_key(mid, digest)
+                if key in run_keys or (digest in seen_digests and not mid):
+                    done_uids.append(uid)  # totéž v této dávce / známé tělo bez Message-ID
+                    continue
+                run_keys.add(key)
+                if digest in seen_digests:
+                    bank_messages.stage(key, digest, imap_uid=uid, outcome=bank_messages.DUPLICATE)
+                    done_uids.append(uid)
+                    continue
+                seen_digests.add(digest)
+
+            msg = email.message_from_bytes(raw)
+
+            # Parsování – nejdřív HTML tabulka, pak fallback na text
+            html_text = _msg_to_html(msg)
+            body_text = _msg_to_text(msg)
+
+            vs, amt = (None, None)
+            if html_text:
+                vs, amt = _extract_from_csob_html(html_text)
+            if not vs:
+                vs = _parse_vs(body_text) or _parse_vs(subject)
+            if amt is None:
+                amt = _parse_amount(body_text)
+
+            if vs and amt is not None:
+                out.append((vs, amt, sender_hdr))
+                parsed_uids.append(uid)
+                if dedup:
+                    bank_messages.stage(key, digest, imap_uid=uid, vs=vs, amount=amt)
+            elif dedup:
+                bank_messages.stage(key, digest, imap_uid=uid, outcome=bank_messages.UNPARSED)
+
+    # 4) \Seen pro vytěžené (a dříve zpracované) zprávy jedním příkazem
+    to_flag = parsed_uids + done_uids if mark_seen else []
+    if to_flag and not checkpoint_scope:
+        mark_seen_uids(imap, to_flag)
+        to_flag = []
+
+    if use_checkpoint:
+        if not truncated:
+            _stage_checkpoint(cp, account, folder, checkpoint_scope, uidvalidity,
+                              max([highest] + [uid for uid, _ in headers]))
+        else:
+            # zbylé kandidáty (UID nad posledním zpracovaným) vezme další průchod
+            _stage_checkpoint(cp, account, folder, checkpoint_scope, uidvalidity, candidates[-1][0])
+
+    return out, truncated, to_flag
+
+
+def mark_seen_uids(imap, uids: List[int]) -> None:
+    """\\Seen jedním STORE (best effort – nepřečtená zpráva se jen znovu přeskočí)."""
+    if not uids:
+        return
+    try:
+        imap.uid("STORE", _uid_set(uids), "+FLAGS", r"(\Seen)")
+    except Exception:
+        pass
+
+
 def fetch_from_imap(
     *,
     host: str,
@@ -143,66 +411,63 @@ def fetch_from_imap(
     max_items: int = 50,
     allow_senders: Optional[Iterable[str]] = None,
     mark_seen: bool = True,
+    checkpoint_scope: Optional[str] = None,
 ) -> List[Tuple[str, Decimal, str]]:
     """
-    Nízká vrstva: stáhne poslední zprávy z IMAP a zkusí z nich vytěžit (vs, amount).
-    Filtruje podle allow_senders (substring match v hlavičce From/Sender).
-    Vrací list trojic: (vs, amount, sender_header).
+    Nízká vrstva: připojí se, provede jeden průchod `fetch_from_connection`
+    a odhlásí se. Vrací list trojic: (vs, amount, sender_header).
+    S `checkpoint_scope` zprávy \\Seen nedostanou (commit přijde až po
+    odhlášení) – stažení + párování + označení viz `fetch_and_apply`.
     """
     imap = imaplib.IMAP4_SSL(host, port) if ssl else imaplib.IMAP4(host, port)
-    imap.login(user, password)
-    imap.select(folder)
-
-    # 🔒 Bereme pouze UNSEEN (jen nové bankovní e-maily). Bez fallbacku na ALL!
-    typ, data = imap.search(None, "(UNSEEN)")
-    ids = data[0].split()
-    if not ids:
-        imap.close()
-        imap.logout()
-        return []
-
-    out: List[Tuple[str, Decimal, str]] = []
-
-    for msg_id in reversed(ids):
-        if len(out) >= max_items:
-            break
+    try:
+        imap.login(user, password)
+        out, _more, _seen = fetch_from_connection(
+            imap, account=f"{user}@{host}", folder=folder, max_items=max_items,
+            allow_senders=allow_senders, mark_seen=mark_seen, checkpoint_scope=checkpoint_scope,
+        )
+        try:
+            imap.close()
+        except Exception:
+            pass
+        return out
+    finally:
+        try:
+            imap.logout()
+        except Exception:
+            pass
 
-        typ, data = imap.fetch(msg_id, "(RFC822)")
-        if typ != "OK":
-            continue
 
-        raw = data[0][1]
-        msg = email.message_from_bytes(raw)
-        sender_hdr = ((msg.get("From") or "") + " " + (msg.get("Sender") or "")).strip()
-        subject = (msg.get("Subject") or "")
+# Odesílatelé bankovních notifikací ČSOB
+BANK_SENDERS = (
+    "csob.cz", "noreply@csob.cz", "no-reply@csob.cz", "notification@csob.cz", "info@csob.cz",
+)
 
-        # Sender filtr
-        if allow_senders and not _sender_matches(sender_hdr, allow_senders):
-            continue
 
-        # Parsování – nejdřív HTML tabulka, pak fallback na text
-        html_text = _msg_to_html(msg)
-        body_text = _msg_to_text(msg)
-
-        vs, amt = (None, None)
-        if html_text:
-            vs, amt = _extract_from_csob_html(html_text)
-        if not vs:
-            vs = _parse_vs(body_text) or _parse_vs(subject)
-        if amt is None:
-            amt = _parse_amount(body_text)
-
-        if vs and amt is not None:
-            out.append((vs, amt, sender_hdr))
-            if mark_seen:
-                try:
-                    imap.store(msg_id, "+FLAGS", r"\Seen")
-                except Exception:
-                    pass
+def imap_settings(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    ssl: Optional[bool] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+    folder: Optional[str] = None,
+) -> dict:
+    """
+    Parametry připojení – prioritně z argumentů, pak z .env:
+      IMAP_HOST, IMAP_PORT, IMAP_SSL, IMAP_USER, IMAP_PASSWORD, IMAP_FOLDER
+    """
+    settings = {
+        "host": host or os.getenv("IMAP_HOST", "imap.seznam.cz"),
+        "port": int(port or os.getenv("IMAP_PORT", "993")),
+        "ssl": (ssl if ssl is not None else os.getenv("IMAP_SSL", "true").lower() == "true"),
+        "user": user or os.getenv("IMAP_USER"),
+        "password": password or os.getenv("IMAP_PASSWORD"),
+        "folder": folder or os.getenv("IMAP_FOLDER", "INBOX"),
+    }
+    if not (settings["user"] and settings["password"]):
+        raise RuntimeError("Chybí IMAP_USER/IMAP_PASSWORD v .env nebo parametrech.")
+    return settings
 
-    imap.close()
-    imap.logout()
-    return out
 
 def fetch_csob_incoming(
     host: Optional[str] = None,
@@ -215,44 +480,74 @@ def fetch_csob_incoming(
     bank_senders: Optional[Iterable[str]] = None,
     self_senders: Optional[Iterable[str]] = None,
     mark_seen: bool = True,
+    checkpoint_scope: Optional[str] = "bank",
 ) -> List[Tuple[str, Decimal]]:
     """
     Vyšší vrstva – stáhne a vrátí pouze bankovní shody [(vs, amount)].
     Odesílatele:
       - bank_senders: whitelist ČSOB variant
       - self_senders: vlastní maily (NEpoužíváme pro párování, jen diagnostika jinde)
-    Parametry se berou prioritně z argumentů, pak z .env:
-      IMAP_HOST, IMAP_PORT, IMAP_SSL, IMAP_USER, IMAP_PASSWORD, IMAP_FOLDER
+    Parametry připojení viz `imap_settings` (argumenty, pak .env).
+    Pokrok se drží v imap_checkpoint (scope `checkpoint_scope`); uloží se
+    commitem volajícího, typicky spolu se spárovanými platbami; \\Seen
+    s checkpointem nenastaví – párování s označením viz `fetch_and_apply`.
     """
-    host = host or os.getenv("IMAP_HOST", "imap.seznam.cz")
-    port = int(port or os.getenv("IMAP_PORT", "993"))
-    ssl = (ssl if ssl is not None else os.getenv("IMAP_SSL", "true").lower() == "true")
-    user = user or os.getenv("IMAP_USER")
-    password = password or os.getenv("IMAP_PASSWORD")
-    folder = folder or os.getenv("IMAP_FOLDER", "INBOX")
-
-    if not (user and password):
-        raise RuntimeError("Chybí IMAP_USER/IMAP_PASSWORD v .env nebo parametrech.")
-
-    bank_senders = list(bank_senders) if bank_senders else [
-        "csob.cz", "noreply@csob.cz", "no-reply@csob.cz", "notification@csob.cz", "info@csob.cz"
-    ]
+    settings = imap_settings(host, port, ssl, user, password, folder)
+    bank_senders = list(bank_senders) if bank_senders else list(BANK_SENDERS)
     # self_senders tady neřešíme (nepárujeme podle nich)
 
     rows = fetch_from_imap(
-        host=host, port=port, ssl=ssl, user=user, password=password, folder=folder,
+        **settings,
         max_items=max_items, allow_senders=bank_senders, mark_seen=mark_seen,
+        checkpoint_scope=checkpoint_scope,
     )
     return [(vs, amt) for (vs, amt, _sender) in rows]
 
+
+def fetch_and_apply(
+    apply: Callable[[List[Tuple[str, Decimal]]], dict],
+    settings: Optional[dict] = None,
+    *,
+    max_items: int = 50,
+    allow_senders: Optional[Iterable[str]] = None,
+    mark_seen: bool = True,
+    checkpoint_scope: Optional[str] = "bank",
+) -> dict:
+    """
+    Jeden průchod s párováním: stáhne bankovní potvrzení [(vs, amount)], předá
+    je `apply` (match_confirmations / apply_bank_confirmations – commitne
+    párování i checkpoint) a teprve potom na stejném spojení označí zprávy
+    \\Seen. Výjimka z `apply` = nic se neoznačí, zprávy se přečtou znovu.
+    """
+    s = settings or imap_settings()
+    imap = imaplib.IMAP4_SSL(s["host"], s["port"]) if s["ssl"] else imaplib.IMAP4(s["host"], s["port"])
+    try:
+        imap.login(s["user"], s["password"])
+        rows, _more, to_flag = fetch_from_connection(
+            imap, account=f"{s['user']}@{s['host']}", folder=s["folder"], max_items=max_items,
+            allow_senders=list(allow_senders) if allow_senders else list(BANK_SENDERS),
+            mark_seen=mark_seen, checkpoint_scope=checkpoint_scope,
+        )
+        result = apply([(vs, amt) for (vs, amt, _sender) in rows])
+        mark_seen_uids(imap, to_flag)
+        try:
+            imap.close()
+        except Exception:
+            pass
+        return result
+    finally:
+        try:
+            imap.logout()
+        except Exception:
+            pass
+
 # ============================================================================
 # Napojení na DB + odeslání FA + Telegram
 # ============================================================================
 
-from backend.extensions import db
-from backend.models import Payment, Order
 from backend.admin.sold_routes import send_invoice_for_order
 from backend.api.utils.telegram import send_telegram_message  # tvůj helper „přes skript“
+from backend.services.payment_matching import match_confirmations
 
 def _fmt_amount(a: Optional[Decimal]) -> str:
     if a is None:
@@ -264,14 +559,31 @@ def _fmt_amount(a: Optional[Decimal]) -> str:
 
 def apply_bank_confirmations_to_db(mark_seen: bool = True) -> dict:
     """
-    1) Stáhne potvrzení z banky (VS, částka) – pouze UNSEEN e-maily.
+    1) Stáhne potvrzení z banky (VS, částka) – nové e-maily od checkpointu.
+    2)–4) viz `apply_bank_confirmations`; \\Seen až po jeho commitu.
+    """
+    return fetch_and_apply(apply_bank_confirmations, mark_seen=mark_seen)
+
+def apply_bank_confirmations(pairs: List[Tuple[str, Decimal]]) -> dict:
+    """
     2) U Payment (VS) nastaví status=received (+ received_at pokud chybí).
     3) U Order (VS) nastaví status=paid.
-    4) Po COMMITU: pošle FA a Telegram **jen když došlo ke změně**.
+       Kroky 2–3 pro celou dávku naráz (payment_matching, bez kontroly částky);
+       commit uloží i checkpoint IMAP staženy do session.
+    4) Po COMMITU: pošle FA a Telegram **jen když došlo ke změně** (`notify_matched`).
+    """
+    # 1)–3) Payment/Order podle VS pro celou dávku: 2 IN dotazy, jeden commit
+    report = match_confirmations(pairs, require_amount_match=False)
+    return {"checked": len(pairs), **notify_matched(report["items"])}
+
+
+def notify_matched(items: List[dict]) -> dict:
+    """
+    Krok po COMMITU párování (položky z match_confirmations) – sdílí ho IMAP
+    i import výpisu: při změně FA (send_invoice_for_order) a Telegram, u platby
+    ke zrušené objednávce Telegram upozornění. Vrací souhrn a položky.
     """
-    pairs = fetch_csob_incoming(mark_seen=mark_seen)  # [(vs, amount)]
     results = {
-        "checked": len(pairs),
         "updated_payments": 0,
         "updated_orders": 0,
         "emailed_invoices": 0,
@@ -279,54 +591,23 @@ def apply_bank_confirmations_to_db(mark_seen: bool = True) -> dict:
         "items": [],
     }
 
-    for vs, amount in pairs:
+    for match in items:
+        vs, amount = match["vs"], match["amount"]
         item = {
-            "vs": vs, "amount": str(amount),
-            "payment_id": None, "order_id": None,
-            "payment_updated": False, "order_updated": False,
-            "invoice_sent": False, "telegram_sent": False
+            **{k: match[k] for k in ("vs", "amount", "payment_id", "order_id", "payment_updated", "order_updated")},
+            "invoice_sent": False, "telegram_sent": False, "reason": match["reason"],
         }
-
-        # 1) Payment podle VS
-        p = db.session.query(Payment).filter_by(vs=vs).order_by(Payment.id.desc()).first()
-        if p:
-            item["payment_id"] = p.id
-            changed_p = False
-            if p.status != "received":
-                p.status = "received"
-                changed_p = True
-            if getattr(p, "received_at", None) is None:
-                try:
-                    from datetime import datetime as _dt
-                    p.received_at = _dt.utcnow()
-                    changed_p = True
-                except Exception:
-                    pass
-            if changed_p:
-                item["payment_updated"] = True
-                results["updated_payments"] += 1
-
-        # 2) Order podle VS
-        o = db.session.query(Order).filter_by(vs=vs).first()
-        if o:
-            item["order_id"] = o.id
-            if o.status != "paid":
-                o.status = "paid"
-                item["order_updated"] = True
-                results["updated_orders"] += 1
-
-        # 3) Commit změn (pokud byly)
+        if item["payment_updated"]:
+            results["updated_payments"] += 1
+        if item["order_updated"]:
+            results["updated_orders"] += 1
         changed = bool(item["payment_updated"] or item["order_updated"])
-        if changed:
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+        order_id = item["order_id"]
 
         # 4) Odeslat FA jen při změně a pokud existuje order
-        if changed and o:
+        if changed and order_id:
             try:
-                send_res = send_invoice_for_order(o.id)
+                send_res = send_invoice_for_order(order_id)
                 if send_res.get("ok") and send_res.get("emailed"):
                     item["invoice_sent"] = True
                     results["emailed_invoices"] += 1
@@ -338,7 +619,7 @@ def apply_bank_confirmations_to_db(mark_seen: bool = True) -> dict:
             try:
                 ok = send_telegram_message(
                     f"✅ Potvrzena příchozí platba\nVS: {vs}\nČástka: {_fmt_amount(amount)}"
-                    + (f"\nObjednávka: #{o.id}" if o else "\nObjednávka: nenalezena")
+                    + (f"\nObjednávka: #{order_id}" if order_id else "\nObjednávka: nenalezena")
                 )
                 if ok:
                     item["telegram_sent"] = True
@@ -346,6 +627,16 @@ def apply_bank_confirmations_to_db(mark_seen: bool = True) -> dict:
             except Exception:
                 pass
 
+        # 6) Platba ke zrušené objednávce (propadlá rezervace) → ruční vyřízení
+        if match["reason"] == "order_canceled":
+            try:
+                item["telegram_sent"] = bool(send_telegram_message(
+                    f"⚠️ Platba ke zrušené objednávce #{order_id}\nVS: {vs}\nČástka: {_fmt_amount(amount)}"
+                    "\nRezervace propadla, zboží je zpět v prodeji – vyřešit ručně (vrácení / nová objednávka)."
+                ))
+            except Exception:
+                pass
+
         results["items"].append(item)
 
     return results
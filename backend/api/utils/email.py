@@ -2,9 +2,9 @@ from flask_mail import Message
 from backend.extensions import mail
 
 
-def send_email(subject, recipients, body, attachments=None, sender=None):
+def build_message(subject, recipients, body, attachments=None, sender=None) -> Message:
     """
-    Odeslání textového e-mailu v UTF-8 s volitelnými přílohami.
+    Sestaví textový e-mail v UTF-8 s volitelnými přílohami (bez odeslání).
     Flask-Mail si MIME + charset sestaví správně sám.
     """
     if isinstance(recipients, str):
@@ -34,5 +34,14 @@ def send_email(subject, recipients, body, attachments=None, sender=None):
             data=data,
         )
 
+    return msg
+
+
+def send_email(subject, recipients, body, attachments=None, sender=None):
+    """
+    Okamžité (synchronní) odeslání e-mailu. Pro e-maily k objednávkám používej
+    services.outbox.enqueue_email – nezdržuje request pomalým SMTP.
+    """
+    msg = build_message(subject, recipients, body, attachments=attachments, sender=sender)
     mail.send(msg)
     return msg
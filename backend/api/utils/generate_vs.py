@@ -1,5 +1,9 @@
-from datetime import datetime
-
-def generate_vs():
-    """Vygeneruje variabilní symbol ve formátu YYDDMMHHMM."""
-    return datetime.now().strftime("%Y%d%m%H%M")
+def generate_vs():
+    """
+    Vygeneruje variabilní symbol ve formátu RR + 8místné pořadí (10 číslic).
+    Deleguje na services.vs_allocator (bez kolizí, potřebuje app kontext);
+    pro rezervaci v jednom kroku použij allocate_and_reserve_vs.
+    """
+    from backend.services.vs_allocator import allocate_vs  # lokální import, ať necyklíme
+
+    return allocate_vs()
@@ -0,0 +1,116 @@
+# backend/api/utils/mail_transport.py
+"""
+Znovupoužitelné SMTP spojení pro hromadné odesílání.
+
+`mail.send(msg)` otevře pro každou zprávu nové spojení (TLS handshake + login).
+MailTransport drží jedno přihlášené spojení přes Flask-Mail `mail.connect()`,
+po nečinnosti delší než `idle_timeout` ho zavře a při výpadku spojení se
+jednou znovu připojí a zprávu zopakuje.
+
+    with MailTransport() as transport:
+        for msg in messages:
+            transport.send(msg)
+"""
+from __future__ import annotations
+
+import smtplib
+import ssl
+import time
+
+from flask import current_app
+
+from backend.extensions import mail
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    """Chyby, po kterých má smysl se znovu připojit (ne odmítnutý příjemce apod.)."""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code == 421  # server ukončuje spojení
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    return isinstance(exc, (ConnectionError, TimeoutError, ssl.SSLError, EOFError))
+
+
+class MailTransport:
+    def __init__(self, idle_timeout: float | None = None, max_reconnects: int = 1):
+        if idle_timeout is None:
+            idle_timeout = float(current_app.config.get("MAIL_IDLE_TIMEOUT", 30))
+        self.idle_timeout = idle_timeout
+        self.max_reconnects = max_reconnects
+        self._conn = None
+        self._last_used = 0.0
+        # statistiky (bench / logy workeru)
+        self.connects = 0
+        self.sent = 0
+
+    # --- životní cyklus spojení ---
+
+    def _open(self) -> None:
+        conn = mail.connect()
+        conn.__enter__()
+        self._conn = conn
+        self._last_used = time.monotonic()
+        self.connects += 1
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.__exit__(None, None, None)
+        except Exception:
+            # spojení už mohl zavřít server – QUIT selže, nevadí
+            host = getattr(conn, "host", None)
+            if host is not None:
+                try:
+                    host.close()
+                except Exception:
+                    pass
+
+    def _ensure(self) -> None:
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._conn is None:
+            self._open()
+
+    # --- odesílání ---
+
+    def send(self, message) -> None:
+        """Odešle zprávu přes sdílené spojení; při výpadku spojení se znovu připojí."""
+        attempt = 0
+        while True:
+            self._ensure()
+            try:
+                self._conn.send(message)
+            except Exception as exc:
+                if not _is_connection_error(exc) or attempt >= self.max_reconnects:
+                    if _is_connection_error(exc):
+                        self.close()
+                    raise
+                current_app.logger.info("SMTP spojení spadlo (%s), připojuji znovu", exc)
+                self.close()
+                attempt += 1
+                continue
+            self._last_used = time.monotonic()
+            self.sent += 1
+            return
+
+    def send_many(self, messages) -> list[tuple[object, Exception | None]]:
+        """Odešle dávku jedním spojením; vrací [(zpráva, výjimka nebo None)]."""
+        results = []
+        for msg in messages:
+            try:
+                self.send(msg)
+            except Exception as exc:
+                results.append((msg, exc))
+            else:
+                results.append((msg, None))
+        return results
+
+    def __enter__(self) -> "MailTransport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
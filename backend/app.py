@@ -14,6 +14,8 @@ from backend.config import Config
 
 # Extensions
 from backend.extensions import db, login_manager, bcrypt, migrate, cors, init_mail
+from backend.cli import init_cli
+from backend.services.vs_allocator import init_vs_allocator
 
 # Blueprints
 from backend.admin import admin_bp
@@ -21,6 +23,8 @@ from backend.auth.login_routes import auth_bp
 from backend.api.routes.product_routes import api_products
 from backend.api.routes.category_routes import api_categories
 from backend.api.routes.media_routes import api_media
+from backend.api.routes.stock_routes import api_stock
+from backend.api.routes.cart_routes import api_cart
 from backend.api.routes.order_routes import order_bp
 from backend.client import client_bp
 from backend.api.routes.payment_routes import payment_bp
@@ -40,6 +44,8 @@ def create_app() -> Flask:
     login_manager.init_app(app)
     bcrypt.init_app(app)
     init_mail(app)
+    init_cli(app)
+    init_vs_allocator(app)
 
     cors.init_app(
         app,
@@ -64,6 +70,8 @@ def create_app() -> Flask:
     app.register_blueprint(api_products)
     app.register_blueprint(api_categories)
     app.register_blueprint(api_media)
+    app.register_blueprint(api_stock)
+    app.register_blueprint(api_cart)
     app.register_blueprint(order_bp)
     app.register_blueprint(client_bp)
     app.register_blueprint(payment_bp)
@@ -0,0 +1,16 @@
+# backend/cli/__init__.py
+"""Flask CLI příkazy (`flask <skupina> <příkaz>`), registrované v create_app."""
+
+
+def init_cli(app):
+    from .catalog import catalog_cli
+    from .mail import mail_cli
+    from .media import media_cli
+    from .orders import orders_cli
+    from .payments import payments_cli
+
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(mail_cli)
+    app.cli.add_command(media_cli)
+    app.cli.add_command(orders_cli)
+    app.cli.add_command(payments_cli)
@@ -0,0 +1,51 @@
+# backend/cli/catalog.py
+import click
+from flask.cli import AppGroup
+
+from backend.services import catalog_io
+
+catalog_cli = AppGroup("catalog", help="Hromadný import/export katalogu (CSV/XLSX).")
+
+
+@catalog_cli.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "xlsx"]), default=None,
+              help="Formát (default podle přípony)")
+def export_catalog(path: str, fmt: str | None):
+    """Export produktů, variant a skladu do souboru."""
+    fmt = fmt or catalog_io.detect_format(path)
+    if fmt == "xlsx":
+        with open(path, "wb") as fh:
+            catalog_io.export_xlsx(fh)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            for chunk in catalog_io.iter_export_csv():
+                fh.write(chunk)
+    click.echo(f"✅ Export uložen: {path}")
+
+
+@catalog_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "xlsx"]), default=None,
+              help="Formát (default podle přípony)")
+@click.option("--dry-run", is_flag=True, default=False, help="Jen validace, nic nezapisovat")
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Řádků na jeden executemany")
+def import_catalog(path: str, fmt: str | None, dry_run: bool, chunk_size: int):
+    """Import/přecenění katalogu ze souboru (validace celého souboru, pak dávkový zápis)."""
+    fmt = fmt or catalog_io.detect_format(path)
+    try:
+        with open(path, "rb") as fh:
+            result = catalog_io.import_catalog(fh, fmt, dry_run=dry_run, chunk_size=chunk_size)
+    except catalog_io.CatalogImportError as exc:
+        for err in exc.errors[:50]:
+            click.echo(f"  ! řádek {err['row']}: {err['error']}", err=True)
+        if len(exc.errors) > 50:
+            click.echo(f"  ! … a dalších {len(exc.errors) - 50}", err=True)
+        raise click.ClickException(f"Import zamítnut: {exc}")
+
+    click.echo(
+        f"✅ {result['rows']} řádků za {result['seconds']}s ({result['rows_per_sec']} řádků/s)"
+        + (" – dry run, nic nezapsáno" if dry_run else
+           f": produkty {result['products_updated']} upraveno / {result['products_created']} nových, "
+           f"varianty {result['variants_updated']} upraveno / {result['variants_created']} nových")
+    )
@@ -0,0 +1,28 @@
+# backend/cli/mail.py
+import click
+from flask.cli import AppGroup
+
+from backend.services import outbox
+
+mail_cli = AppGroup("mail", help="Odchozí e-maily (outbox).")
+
+
+@mail_cli.command("outbox-worker")
+@click.option("--batch-size", type=int, default=50, show_default=True, help="Zpráv na jednu dávku")
+@click.option("--interval", type=float, default=5.0, show_default=True, help="Pauza (s), když je fronta prázdná")
+@click.option("--once", is_flag=True, default=False, help="Vyprázdnit frontu a skončit (cron)")
+def outbox_worker(batch_size: int, interval: float, once: bool):
+    """Odesílá frontu e-mailů s opakováním a exponenciálním odkladem."""
+    click.echo(f"📮 outbox worker (dávka {batch_size}, interval {interval}s)")
+    try:
+        outbox.run_worker(batch_size=batch_size, interval=interval, once=once, log=click.echo)
+    except KeyboardInterrupt:
+        click.echo("⏹  ukončeno")
+
+
+@mail_cli.command("outbox-retry")
+@click.argument("ids", nargs=-1, type=int)
+def outbox_retry(ids: tuple[int, ...]):
+    """Vrátí selhané zprávy (všechny, nebo zadaná ID) zpět do fronty."""
+    count = outbox.retry(list(ids) if ids else None)
+    click.echo(f"✅ Znovu zařazeno: {count}")
@@ -0,0 +1,307 @@
+# backend/cli/media.py
+import csv
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from backend.extensions import db
+from backend.models import ImageMeta, Product, ProductMedia, ProductVariant, ProductVariantMedia
+from backend.services.images import normalize_image, probe_image, safe_uuid_name
+
+media_cli = AppGroup("media", help="Práce s nahranými médii (uploads).")
+
+
+def _uploads_dir() -> str:
+    return os.path.join(current_app.root_path, "static", "uploads")
+
+
+def _referenced_images() -> set[str]:
+    """Všechny názvy obrázků, na které odkazuje DB (produkty, varianty, média)."""
+    names: set[str] = set()
+    names.update(n for (n,) in db.session.query(Product.image).filter(Product.image.isnot(None)))
+    names.update(n for (n,) in db.session.query(ProductVariant.image).filter(ProductVariant.image.isnot(None)))
+    names.update(
+        n for (n,) in db.session.query(ProductMedia.filename).filter(ProductMedia.media_type == "image")
+    )
+    names.update(n for (n,) in db.session.query(ProductVariantMedia.filename))
+    return {n for n in names if n}
+
+
+def _probe(args: tuple[str, str]) -> tuple[str, dict | None]:
+    filename, path = args
+    return filename, probe_image(path)
+
+
+@media_cli.command("backfill-meta")
+@click.option("--workers", type=int, default=os.cpu_count() or 2, show_default=True,
+              help="Počet procesů pro čtení obrázků")
+@click.option("--batch-size", type=int, default=200, show_default=True,
+              help="Po kolika záznamech commitovat")
+@click.option("--prune", is_flag=True, default=False,
+              help="Smazat metadata souborů, na které už nic neodkazuje")
+def backfill_meta(workers: int, batch_size: int, prune: bool):
+    """Dopočítá ImageMeta (rozměry, velikost, barva, LQIP) pro existující uploads."""
+    upload_dir = _uploads_dir()
+    referenced = _referenced_images()
+    known = {n for (n,) in db.session.query(ImageMeta.filename)}
+    todo = sorted(referenced - known)
+
+    click.echo(f"Obrázků v DB: {len(referenced)}, s metadaty: {len(known & referenced)}, ke zpracování: {len(todo)}")
+
+    started = time.perf_counter()
+    done = skipped = 0
+    pending = 0
+    jobs = [(name, os.path.join(upload_dir, name)) for name in todo]
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for filename, meta in pool.map(_probe, jobs, chunksize=16):
+            if meta is None:
+                skipped += 1
+                continue
+            db.session.add(ImageMeta(filename=filename, **meta))
+            done += 1
+            pending += 1
+            if pending >= batch_size:
+                db.session.commit()
+                pending = 0
+                elapsed = time.perf_counter() - started
+                click.echo(f"  {done + skipped}/{len(todo)} ({done / elapsed:.1f} obr/s)")
+    db.session.commit()
+
+    pruned = 0
+    if prune:
+        orphans = known - referenced
+        if orphans:
+            pruned = ImageMeta.query.filter(ImageMeta.filename.in_(orphans)).delete(synchronize_session=False)
+            db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Hotovo: {done} doplněno, {skipped} přeskočeno (chybí/nečitelné), {pruned} smazáno za {elapsed:.1f}s"
+    )
+
+
+# ========================= Hromadný import =========================
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif", ".gif", ".bmp", ".tif", ".tiff"}
+VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v"}
+
+
+def _job_key(job: dict) -> str:
+    """Stabilní klíč úlohy pro resume soubor (soubor + cíl)."""
+    return f"{job['path']}|{job['product_id']}|{job.get('variant_id') or ''}|{job['role']}"
+
+
+def _jobs_from_dir(source: str) -> list[dict]:
+    """
+    Adresářová struktura:
+      <source>/<product_id>/*.jpg               → média produktu
+      <source>/<product_id>/<variant_id>/*.jpg  → média varianty
+    """
+    jobs = []
+    for pid_dir in sorted(os.listdir(source)):
+        pid_path = os.path.join(source, pid_dir)
+        if not (os.path.isdir(pid_path) and pid_dir.isdigit()):
+            continue
+        for entry in sorted(os.listdir(pid_path)):
+            full = os.path.join(pid_path, entry)
+            if os.path.isdir(full) and entry.isdigit():
+                for fn in sorted(os.listdir(full)):
+                    if os.path.splitext(fn)[1].lower() in IMAGE_EXTS:
+                        jobs.append({"path": os.path.join(full, fn), "product_id": int(pid_dir),
+                                     "variant_id": int(entry), "role": "media"})
+            elif os.path.splitext(entry)[1].lower() in IMAGE_EXTS | VIDEO_EXTS:
+                jobs.append({"path": full, "product_id": int(pid_dir), "variant_id": None, "role": "media"})
+    return jobs
+
+
+def _jobs_from_manifest(source: str, manifest: str) -> list[dict]:
+    """
+    CSV manifest se sloupci: file, product_id, variant_id (volitelně), role (media | main).
+    Relativní cesty v `file` se berou vůči SOURCE.
+    """
+    jobs = []
+    with open(manifest, newline="", encoding="utf-8-sig") as fh:
+        for lineno, row in enumerate(csv.DictReader(fh), start=2):
+            path = (row.get("file") or "").strip()
+            pid = (row.get("product_id") or "").strip()
+            vid = (row.get("variant_id") or "").strip()
+            role = (row.get("role") or "media").strip().lower()
+            if not path or not pid.isdigit() or (vid and not vid.isdigit()) or role not in ("media", "main"):
+                click.echo(f"  ! řádek {lineno}: neplatný záznam, přeskakuji", err=True)
+                continue
+            if not os.path.isabs(path):
+                path = os.path.join(source, path)
+            jobs.append({"path": path, "product_id": int(pid), "variant_id": int(vid) if vid else None,
+                         "role": role})
+    return jobs
+
+
+def _convert(job: dict, out_dir: str) -> dict:
+    """Běží ve worker procesu: normalizuje obrázek (stejně jako upload), videa jen kopíruje."""
+    ext = os.path.splitext(job["path"])[1].lower()
+    try:
+        if ext in VIDEO_EXTS:
+            out_name = safe_uuid_name(ext)
+            shutil.copyfile(job["path"], os.path.join(out_dir, out_name))
+            return {**job, "filename": out_name, "media_type": "video", "meta": None}
+        out_name, meta = normalize_image(job["path"], out_dir)
+        return {**job, "filename": out_name, "media_type": "image", "meta": meta}
+    except Exception as exc:
+        return {**job, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _apply_result(res: dict, products: dict, variants: dict) -> None:
+    """Zapíše jeden zkonvertovaný soubor do session."""
+    if res["meta"]:
+        db.session.add(ImageMeta(filename=res["filename"], **res["meta"]))
+    if res.get("variant_id"):
+        variant = variants[res["variant_id"]]
+        if res["role"] == "main":
+            variant.image = res["filename"]
+        else:
+            db.session.add(ProductVariantMedia(variant_id=variant.id, filename=res["filename"]))
+    else:
+        product = products[res["product_id"]]
+        if res["role"] == "main" and res["media_type"] == "image":
+            product.image = res["filename"]
+        else:
+            db.session.add(ProductMedia(product_id=product.id, filename=res["filename"],
+                                        media_type=res["media_type"]))
+
+
+def _remove_outputs(results, out_dir: str) -> None:
+    for res in results:
+        try:
+            os.remove(os.path.join(out_dir, res["filename"]))
+        except OSError:
+            pass
+
+
+def _unconsumed_results(futures, consumed: set) -> list[dict]:
+    """Úspěšně zkonvertované soubory, které se do dávky už nedostaly."""
+    out = []
+    for fut in futures:
+        if fut in consumed or fut.cancelled() or not fut.done() or fut.exception() is not None:
+            continue
+        res = fut.result()
+        if not res.get("error"):
+            out.append(res)
+    return out
+
+
+@media_cli.command("import")
+@click.argument("source", type=click.Path(exists=True, file_okay=False))
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False),
+              help="CSV: file,product_id,variant_id,role (jinak se čte adresářová struktura)")
+@click.option("--workers", type=int, default=os.cpu_count() or 2, show_default=True,
+              help="Počet procesů pro konverzi")
+@click.option("--batch-size", type=int, default=50, show_default=True,
+              help="Počet souborů na jednu DB transakci")
+@click.option("--state", "state_path", type=click.Path(dir_okay=False),
+              help="Soubor s hotovými úlohami pro resume (default <SOURCE>/.media_import_done)")
+def import_media(source: str, manifest: str | None, workers: int, batch_size: int, state_path: str | None):
+    """Hromadný import fotek k produktům/variantám s paralelní konverzí do WebP."""
+    jobs = _jobs_from_manifest(source, manifest) if manifest else _jobs_from_dir(source)
+
+    state_path = state_path or os.path.join(source, ".media_import_done")
+    done_keys: set[str] = set()
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as fh:
+            done_keys = {line.rstrip("\n") for line in fh if line.strip()}
+
+    # Ověření cílů jedním dotazem na tabulku
+    products = {p.id: p for p in Product.query.filter(Product.id.in_({j["product_id"] for j in jobs})).all()}
+    variant_ids = {j["variant_id"] for j in jobs if j["variant_id"]}
+    variants = (
+        {v.id: v for v in ProductVariant.query.filter(ProductVariant.id.in_(variant_ids)).all()}
+        if variant_ids else {}
+    )
+
+    todo = []
+    already = 0
+    for job in jobs:
+        if _job_key(job) in done_keys:
+            already += 1
+            continue
+        if job["product_id"] not in products:
+            click.echo(f"  ! produkt {job['product_id']} neexistuje: {job['path']}", err=True)
+            continue
+        if job["variant_id"] and (
+            job["variant_id"] not in variants or variants[job["variant_id"]].product_id != job["product_id"]
+        ):
+            click.echo(f"  ! varianta {job['variant_id']} nepatří k produktu {job['product_id']}: {job['path']}",
+                       err=True)
+            continue
+        todo.append(job)
+
+    click.echo(f"Souborů: {len(jobs)}, hotovo dříve: {already}, ke zpracování: {len(todo)}")
+    if not todo:
+        return
+
+    out_dir = _uploads_dir()
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    imported = failed = 0
+    batch: list[dict] = []
+    flush_failed = False
+
+    def _flush():
+        nonlocal imported, flush_failed
+        if not batch:
+            return
+        try:
+            for res in batch:
+                _apply_result(res, products, variants)
+            db.session.commit()
+        except Exception:
+            flush_failed = True
+            db.session.rollback()
+            # soubory z neuložené dávky by zůstaly bez záznamu → uklidit, při dalším běhu se zopakují
+            _remove_outputs(batch, out_dir)
+            batch.clear()
+            raise
+        with open(state_path, "a", encoding="utf-8") as fh:
+            fh.writelines(_job_key(res) + "\n" for res in batch)
+        imported += len(batch)
+        batch.clear()
+
+    pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    futures = []
+    consumed = set()
+    try:
+        futures = [pool.submit(_convert, job, out_dir) for job in todo]
+        for fut in as_completed(futures):
+            consumed.add(fut)
+            res = fut.result()
+            if res.get("error"):
+                failed += 1
+                click.echo(f"  ! {res['path']}: {res['error']}", err=True)
+                continue
+            batch.append(res)
+            if len(batch) >= batch_size:
+                _flush()
+                elapsed = time.perf_counter() - started
+                click.echo(f"  {imported + failed}/{len(todo)} ({imported / elapsed:.1f} souborů/s)")
+    except BaseException:
+        # nečekat na celou frontu: nezačaté konverze zrušit, dokončené mimo dávku smazat
+        pool.shutdown(wait=True, cancel_futures=True)
+        _remove_outputs(_unconsumed_results(futures, consumed), out_dir)
+        raise
+    else:
+        pool.shutdown()
+    finally:
+        # i při přerušení uložíme, co je hotové – resume pak naváže;
+        # po chybě commitu už ne (dávka je zahozená a soubory smazané)
+        if not flush_failed:
+            _flush()
+
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Hotovo: {imported} importováno, {failed} chyb za {elapsed:.1f}s "
+        f"({imported / elapsed if elapsed else 0:.1f} souborů/s). Stav: {state_path}"
+    )
@@ -0,0 +1,55 @@
+# backend/cli/orders.py
+import time
+
+import click
+from flask.cli import AppGroup
+
+from backend.services import order_counts
+from backend.services.idempotency import sweep_expired
+from backend.services.stock_holds import convert_paid_holds, release_expired_holds
+
+orders_cli = AppGroup("orders", help="Údržba objednávek.")
+
+
+@orders_cli.command("sweep-holds")
+@click.option("--batch-size", type=int, default=500, show_default=True, help="Objednávek na jednu transakci")
+@click.option("--max-batches", type=int, default=0, help="Max. počet dávek za běh (0 = dokud něco zbývá)")
+def sweep_holds(batch_size: int, max_batches: int):
+    """Zruší nezaplacené objednávky s prošlou rezervací a vrátí jejich kusy na sklad."""
+    started = time.perf_counter()
+    converted = convert_paid_holds()
+    totals = {"orders": 0, "products": 0, "variants": 0, "payments": 0}
+    batches = 0
+    while True:
+        stats = release_expired_holds(batch_size=batch_size)
+        if not stats["orders"]:
+            break
+        batches += 1
+        for k in totals:
+            totals[k] += stats[k]
+        if max_batches and batches >= max_batches:
+            break
+
+    click.echo(
+        f"✅ Zrušeno objednávek: {totals['orders']} "
+        f"(produkty {totals['products']}, varianty {totals['variants']}, platby {totals['payments']}); "
+        f"převedeno na prodej: {converted} "
+        f"za {time.perf_counter() - started:.2f}s"
+    )
+
+
+@orders_cli.command("sweep-idempotency")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Klíčů na jednu transakci")
+def sweep_idempotency(batch_size: int):
+    """Smaže prošlé Idempotency-Key záznamy (IDEMPOTENCY_TTL_HOURS)."""
+    started = time.perf_counter()
+    deleted = sweep_expired(batch_size=batch_size)
+    click.echo(f"✅ Smazáno klíčů: {deleted} za {time.perf_counter() - started:.2f}s")
+
+
+@orders_cli.command("recount-status")
+def recount_status():
+    """Přepočítá čítač objednávek podle stavu (order_status_count) z tabulky order."""
+    counts = order_counts.recount()
+    summary = ", ".join(f"{s}={n}" for s, n in sorted(counts.items())) or "žádné objednávky"
+    click.echo(f"✅ Čítač přepočítán: {summary}")
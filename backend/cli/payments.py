@@ -0,0 +1,85 @@
+# backend/cli/payments.py
+import time
+
+import click
+from flask.cli import AppGroup
+
+from backend.services import bank_statements, imap_worker, order_qr
+from backend.services.payment_events import prune_events
+
+payments_cli = AppGroup("payments", help="Platby a jejich události.")
+
+
+@payments_cli.command("prune-events")
+@click.option("--days", type=int, default=7, show_default=True, help="Smazat události starší než N dní")
+@click.option("--batch-size", type=int, default=5000, show_default=True, help="Řádků na jednu transakci")
+def prune_events_cmd(days: int, batch_size: int):
+    """Smaže staré záznamy payment_event (slouží jen jako kurzor pro SSE)."""
+    started = time.perf_counter()
+    deleted = prune_events(days, batch_size=batch_size)
+    click.echo(f"✅ Smazáno událostí: {deleted} za {time.perf_counter() - started:.2f}s")
+
+
+@payments_cli.command("backfill-qr")
+@click.option("--status", default="awaiting_payment", show_default=True, help="Stav objednávek")
+@click.option("--force", is_flag=True, help="Přepsat i existující soubory")
+def backfill_qr_cmd(status: str, force: bool):
+    """Vykreslí chybějící QR platby objednávek do QR_FOLDER (static/qr/<vs>.png)."""
+    started = time.perf_counter()
+    stats = order_qr.backfill(status=status, force=force)
+    click.echo(
+        f"✅ Vykresleno QR: {stats['rendered']}, už existovalo {stats['skipped']}, "
+        f"neplatný VS {stats['invalid']} za {time.perf_counter() - started:.2f}s"
+    )
+
+
+@payments_cli.command("imap-worker")
+@click.option("--max-items", type=int, default=50, show_default=True, help="Zpráv na jeden průchod")
+@click.option("--idle-seconds", type=float, default=imap_worker.IDLE_SECONDS, show_default=True,
+              help="Délka IDLE okna, pak NOOP keepalive")
+@click.option("--poll-seconds", type=float, default=imap_worker.POLL_SECONDS, show_default=True,
+              help="Interval NOOP, když server IDLE neumí")
+@click.option("--no-mark-seen", is_flag=True, default=False, help="Nenastavovat zprávám \\Seen")
+@click.option("--once", is_flag=True, default=False, help="Jeden průchod a skončit (cron)")
+def imap_worker_cmd(max_items: int, idle_seconds: float, poll_seconds: float, no_mark_seen: bool, once: bool):
+    """Hlídá bankovní notifikace (IMAP IDLE) a hned páruje platby."""
+    click.echo(f"📬 IMAP worker (IDLE okno {idle_seconds:.0f}s)")
+    try:
+        imap_worker.run_worker(
+            once=once, log=click.echo, max_items=max_items, mark_seen=not no_mark_seen,
+            idle_seconds=idle_seconds, poll_seconds=poll_seconds,
+        )
+    except KeyboardInterrupt:
+        click.echo("⏹  ukončeno")
+
+
+@payments_cli.command("import-statement")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(bank_statements.FORMATS), default=None,
+              help="Formát (default podle přípony .gpc/.abo/.csv)")
+@click.option("--dry-run", is_flag=True, default=False, help="Jen načíst a zkontrolovat, nic nezapisovat")
+@click.option("--vs-only", is_flag=True, default=False, help="Párovat jen podle VS, bez kontroly částky")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Transakcí na jeden commit")
+def import_statement_cmd(path: str, fmt: str | None, dry_run: bool, vs_only: bool, batch_size: int):
+    """Import bankovního výpisu (GPC/ABO, ČSOB CSV) a párování příchozích plateb podle VS."""
+    try:
+        fmt = fmt or bank_statements.detect_format(path)
+        with open(path, "rb") as fh:
+            result = bank_statements.import_statement(
+                fh, fmt, dry_run=dry_run, batch_size=batch_size, require_amount_match=not vs_only,
+            )
+    except bank_statements.StatementImportError as exc:
+        raise click.ClickException(str(exc))
+
+    for err in result["errors"][:50]:
+        click.echo(f"  ! řádek {err['line']}: {err['error']}", err=True)
+    for item in result["unmatched"][:50]:
+        click.echo(f"  ? řádek {item['line']}: VS {item['vs']} {item['amount']:.2f} Kč – {item['reason']}")
+    outcomes = ", ".join(f"{k} {v}" for k, v in sorted(result["outcomes"].items())) or "–"
+    click.echo(
+        f"✅ {result['transactions']} transakcí, příjmů {result['credits']} "
+        f"(bez VS {result['credits_without_vs']}), už importováno {result['already_imported']}"
+        + (f", k importu {result['to_import']} – dry run, nic nezapsáno" if dry_run else
+           f", importováno {result['imported']}: {outcomes}, FA {result['emailed_invoices']}")
+        + f" za {result['seconds']}s"
+    )
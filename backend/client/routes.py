@@ -4,10 +4,15 @@ from decimal import Decimal, InvalidOperation
 
 from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import text
 
 from backend.extensions import db
-from backend.models import Product, Order, OrderItem, Payment
+from backend.models import Order, OrderItem, Payment
+from backend.services.stock import StockError, parse_cart_lines, reserve_cart
+from backend.services.pricing import PricingError, quote_cart
+from backend.services.idempotency import idempotent
+from backend.services.stock_holds import create_holds
+from backend.services import order_qr
+from backend.services.vs_allocator import allocate_and_reserve_vs, reserve_vs
 
 client_bp = Blueprint("client_bp", __name__)
 
@@ -19,14 +24,6 @@ def _to_decimal(val, field: str = "") -> Decimal:
     except Exception:
         raise InvalidOperation(f"NeplatnĂˇ hodnota {field or 'ÄŤĂ­sla'}")
 
-def _ensure_vs_registry():
-    """VytvoĹ™Ă­ tabulku vs_registry, pokud neexistuje (PRIMARY KEY vs)."""
-    db.session.execute(text("""
-        CREATE TABLE IF NOT EXISTS vs_registry (
-            vs TEXT PRIMARY KEY
-        )
-    """))
-
 def _sanitize_vs(v: str | None) -> str | None:
     """Nech jen ÄŤĂ­slice, max 10 znakĹŻ. VrĂˇtĂ­ None, pokud nevznikne nic."""
     if not v:
@@ -34,30 +31,10 @@ def _sanitize_vs(v: str | None) -> str | None:
     s = "".join(ch for ch in str(v) if ch.isdigit())[:10]
     return s if s else None
 
-def _reserve_exact_vs(vs: str):
-    """Atomicky zarezervuje konkrĂ©tnĂ­ VS (vloĹľĂ­ do vs_registry)."""
-    _ensure_vs_registry()
-    db.session.execute(text("INSERT INTO vs_registry (vs) VALUES (:vs)"), {"vs": vs})
-
-def _reserve_unique_vs(max_tries: int = 50) -> str:
-    """Vygeneruje a zarezervuje unikĂˇtnĂ­ VS (nikdy nepouĹľitĂ©)."""
-    from backend.api.utils.generate_vs import generate_vs  # lokĂˇlnĂ­ import, aĹĄ necyklĂ­me
-    _ensure_vs_registry()
-    tries = 0
-    while tries < max_tries:
-        vs = generate_vs()  # oÄŤekĂˇvĂˇ se 10 ÄŤĂ­slic
-        try:
-            _reserve_exact_vs(vs)
-            return vs
-        except IntegrityError:
-            db.session.rollback()
-            tries += 1
-            continue
-    raise RuntimeError("NepodaĹ™ilo se zarezervovat unikĂˇtnĂ­ VS (zkus znovu).")
-
 # --- API --------------------------------------------------------------------
 
 @client_bp.route("/api/orders/client", methods=["POST"])
+@idempotent("orders.create_client")
 def create_order_client():
     """
     KompatibilnĂ­ endpoint pro FE (klientskĂ© vytvoĹ™enĂ­ objednĂˇvky).
@@ -95,10 +72,10 @@ def create_order_client():
         client_vs = _sanitize_vs(data.get("vs"))
         try:
             if client_vs:
-                _reserve_exact_vs(client_vs)
+                reserve_vs(client_vs)
                 vs = client_vs
             else:
-                vs = _reserve_unique_vs()
+                vs = allocate_and_reserve_vs()
         except IntegrityError:
             db.session.rollback()
             return jsonify({"ok": False, "error": "ObjednĂˇvka s tĂ­mto VS uĹľ existuje, zkuste znovu."}), 409
@@ -107,56 +84,21 @@ def create_order_client():
         if Order.query.filter_by(vs=vs).first():
             return jsonify({"ok": False, "error": "ObjednĂˇvka s tĂ­mto VS uĹľ existuje."}), 409
 
-        # --- VĂ˝poÄŤet subtotal + poĹˇtovnĂ© ---
-        subtotal = Decimal("0.00")
-        for it in items_in:
-            qty = int(it.get("quantity", 1))
-            price = _to_decimal(it.get("price", "0"), "price")
-            if qty <= 0 or price <= 0:
-                return jsonify({"ok": False, "error": "PoloĹľka musĂ­ mĂ­t quantity>0 a price>0."}), 400
-            subtotal += (price * qty)
-
-        # PoĹˇtovnĂ© z ENV / config, default 89
-        import os
-        fee_raw = os.getenv("SHIPPING_FEE_CZK") or current_app.config.get("SHIPPING_FEE_CZK", "89.00")
+        # --- Ceny ze serveru (cenová mapa); ceny posílané z FE se ignorují ---
+        lines = parse_cart_lines(items_in)
         try:
-            shipping_fee = _to_decimal(fee_raw, "shipping_fee")
-        except InvalidOperation:
-            shipping_fee = Decimal("89.00")
-
-        total_czk = (subtotal + shipping_fee).quantize(Decimal("0.01"))
-        if total_czk <= 0:
-            return jsonify({"ok": False, "error": "ÄŚĂˇstka musĂ­ bĂ˝t > 0."}), 400
+            quote = quote_cart(lines, data.get("shippingMode"))
+        except PricingError as exc:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
+        total_czk = quote["total"]
 
         # --- ATOMICKĂť ODEÄŚET SKLADU (shodnĂ© chovĂˇnĂ­ jako v /api/orders) ---
-        decremented = []
-        for it in items_in:
-            pid = int(it.get("id"))
-            qty = int(it.get("quantity", 1))
-
-            product = Product.query.get(pid)
-            if not product:
-                return jsonify({"ok": False, "error": f"Produkt {pid} neexistuje"}), 404
-
-            current_stock = int(product.stock or 0)
-            if current_stock < qty:
-                return jsonify({"ok": False, "error": f"Na skladÄ› zbĂ˝vĂˇ jen {current_stock} ks pro {product.name}"}), 400
-
-            updated = db.session.execute(
-                db.text("UPDATE product SET stock = stock - :qty WHERE id = :pid AND stock >= :qty"),
-                {"qty": qty, "pid": pid},
-            )
-            if updated.rowcount == 0:
-                latest = Product.query.get(pid)
-                left = int(latest.stock or 0) if latest else 0
-                return jsonify({"ok": False, "error": f"Na skladÄ› zbĂ˝vĂˇ jen {left} ks pro {product.name}"}), 400
-
-            latest = Product.query.get(pid)
-            decremented.append({
-                "id": pid,
-                "taken_qty": qty,
-                "remaining_stock": int(latest.stock or 0) if latest else 0,
-            })
+        try:
+            decremented = reserve_cart(lines)
+        except StockError as exc:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": str(exc), **exc.details}), exc.status
 
         # --- VytvoĹ™enĂ­ Order + poloĹľek ---
         order = Order(
@@ -171,13 +113,18 @@ def create_order_client():
         )
         db.session.add(order)
         db.session.flush()
+        create_holds(order.id, decremented)
+        # QR platby se vykreslí po commitu na pozadí (static/qr/<vs>.png)
+        order_qr.schedule(order)
 
-        for it in items_in:
+        for it, line, priced in zip(items_in, lines, quote["items"]):
             db.session.add(OrderItem(
                 order_id=order.id,
+                product_id=line["product_id"],
+                variant_id=line["variant_id"],
                 product_name=str(it.get("name") or "").strip(),
                 quantity=int(it.get("quantity", 1)),
-                price=_to_decimal(it.get("price"), "price"),
+                price=priced["unit_price"],
             ))
 
         # --- Payment pending (pokud neexistuje) ---
@@ -197,6 +144,7 @@ def create_order_client():
             "orderId": order.id,
             "vs": vs,
             "status": order.status,
+            "totalCzk": float(total_czk),
             "decremented_items": decremented,
         }), 201
 
@@ -52,8 +52,42 @@ class Config:
     MAIL_DEFAULT_SENDER = _env("MAIL_DEFAULT_SENDER", _env("MAIL_USERNAME"))
     MAIL_SUPPRESS_SEND = _env_bool("MAIL_SUPPRESS_SEND", False)
     MAIL_DEBUG = _env_bool("MAIL_DEBUG", True)
+    # Sdílené SMTP spojení (MailTransport) se po této nečinnosti (s) zavře
+    MAIL_IDLE_TIMEOUT = float(_env("MAIL_IDLE_TIMEOUT", 30))
 
     PASSWORD_RESET_SALT = _env("PASSWORD_RESET_SALT", "nm-password-reset")
     PASSWORD_RESET_SUBJECT = _env("PASSWORD_RESET_SUBJECT", "Obnova hesla – Náramková Móda")
 
     MERCHANT_IBAN = _env("MERCHANT_IBAN")
+
+    # Jak dlouho drží nezaplacená objednávka sklad (pak ji `flask orders sweep-holds` zruší)
+    STOCK_HOLD_HOURS = int(_env("STOCK_HOLD_HOURS", 72))
+
+    # Outbox e-mailů: max. pokusů a základ exponenciálního odkladu (s)
+    OUTBOX_MAX_ATTEMPTS = int(_env("OUTBOX_MAX_ATTEMPTS", 8))
+    OUTBOX_BACKOFF_SECONDS = int(_env("OUTBOX_BACKOFF_SECONDS", 60))
+
+    # Jak dlouho platí Idempotency-Key u vytváření objednávek (h)
+    IDEMPOTENCY_TTL_HOURS = int(_env("IDEMPOTENCY_TTL_HOURS", 24))
+
+    # Kolik VS si proces zarezervuje najednou z vs_sequence
+    VS_BLOCK_SIZE = int(_env("VS_BLOCK_SIZE", 20))
+
+    # Max. stáří cenové mapy v procesu (ostatní workery nevidí invalidaci po commitu)
+    PRICE_MAP_TTL_SECONDS = int(_env("PRICE_MAP_TTL_SECONDS", 300))
+
+    # SSE stav platby (/api/payments/events/<vs>)
+    PAYMENT_EVENTS_POLL_SECONDS = float(_env("PAYMENT_EVENTS_POLL_SECONDS", 1.0))
+    PAYMENT_EVENTS_HEARTBEAT_SECONDS = float(_env("PAYMENT_EVENTS_HEARTBEAT_SECONDS", 15))
+    PAYMENT_EVENTS_MAX_SECONDS = float(_env("PAYMENT_EVENTS_MAX_SECONDS", 120))
+    # Max. otevřených streamů na proces (každý drží vlákno z gunicorn --threads);
+    # nad limit 503 + Retry-After a klient se vrátí k pollingu
+    PAYMENT_EVENTS_MAX_STREAMS = int(_env("PAYMENT_EVENTS_MAX_STREAMS", 8))
+    PAYMENT_EVENTS_RETRY_AFTER_SECONDS = int(_env("PAYMENT_EVENTS_RETRY_AFTER_SECONDS", 30))
+
+    # Cache stavu objednávky/platby podle VS (polling z FE)
+    STATUS_CACHE_TTL_SECONDS = float(_env("STATUS_CACHE_TTL_SECONDS", 5))
+
+    # Předem vykreslené QR platby objednávek (/api/payments/qr/order/<vs>)
+    QR_FOLDER = os.path.join(BASE_DIR, "static", "qr")
+    QR_RENDER_WORKERS = int(_env("QR_RENDER_WORKERS", 2))
@@ -2,6 +2,7 @@
 from flask import Blueprint, jsonify
 from backend.extensions import db
 from backend.config import _resolve_sqlite_uri
+from backend.services.status_cache import status_cache
 import os
 import datetime as dt
 
@@ -77,3 +78,9 @@ def debug_db():
         "counts": counts,
         "sample": sample,
     })
+
+
+@debug_bp.get("/status-cache")
+def debug_status_cache():
+    # hit rate cache stavu objednávek/plateb (jen tento worker)
+    return jsonify({"ok": True, **status_cache.stats()})
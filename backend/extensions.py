@@ -2,6 +2,10 @@
 from __future__ import annotations
 
 import socket
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
@@ -18,6 +22,19 @@ cors = CORS()
 mail = Mail()
 
 
+@event.listens_for(Engine, "connect")
+def _sqlite_wal(dbapi_connection, connection_record):
+    """
+    SQLite: WAL žurnál – čtenáři neblokují zapisovatele a commity jsou krátké,
+    takže souběžní zapisovatelé (gunicorn workery, outbox/IMAP worker, checkout)
+    se po busy timeoutu navzájem nevyhladoví do "database is locked".
+    Režim se uloží do souboru DB (vedle něj vzniknou -wal a -shm, viz README);
+    ostatních databází se netýká.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
 @login_manager.user_loader
 def load_user(user_id):
     # Lazy import to avoid circular dependency when loading the model
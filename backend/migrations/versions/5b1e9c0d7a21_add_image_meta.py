@@ -0,0 +1,37 @@
+"""add image_meta table
+
+Revision ID: 5b1e9c0d7a21
+Revises: 3cda9d5b7e42
+Create Date: 2026-01-12
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5b1e9c0d7a21"
+down_revision = "3cda9d5b7e42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "image_meta",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("byte_size", sa.Integer(), nullable=True),
+        sa.Column("dominant_color", sa.String(length=7), nullable=True),
+        sa.Column("lqip", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_image_meta_filename", "image_meta", ["filename"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_image_meta_filename", table_name="image_meta")
+    op.drop_table("image_meta")
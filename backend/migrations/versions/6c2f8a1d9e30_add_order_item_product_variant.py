@@ -0,0 +1,32 @@
+"""add product_id and variant_id to order_item
+
+Revision ID: 6c2f8a1d9e30
+Revises: 5b1e9c0d7a21
+Create Date: 2026-01-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6c2f8a1d9e30"
+down_revision = "5b1e9c0d7a21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("order_item", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("product_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("variant_id", sa.Integer(), nullable=True))
+        batch_op.create_index("ix_order_item_product_id", ["product_id"], unique=False)
+        batch_op.create_index("ix_order_item_variant_id", ["variant_id"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("order_item", schema=None) as batch_op:
+        batch_op.drop_index("ix_order_item_variant_id")
+        batch_op.drop_index("ix_order_item_product_id")
+        batch_op.drop_column("variant_id")
+        batch_op.drop_column("product_id")
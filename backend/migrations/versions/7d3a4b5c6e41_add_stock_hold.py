@@ -0,0 +1,45 @@
+"""add stock_hold table
+
+Revision ID: 7d3a4b5c6e41
+Revises: 6c2f8a1d9e30
+Create Date: 2026-01-15
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7d3a4b5c6e41"
+down_revision = "6c2f8a1d9e30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stock_hold",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=True),
+        sa.Column("variant_id", sa.Integer(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("released_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["order_id"], ["order.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_stock_hold_order_id", "stock_hold", ["order_id"], unique=False)
+    op.create_index("ix_stock_hold_product_id", "stock_hold", ["product_id"], unique=False)
+    op.create_index("ix_stock_hold_variant_id", "stock_hold", ["variant_id"], unique=False)
+    op.create_index("ix_stock_hold_status_expires", "stock_hold", ["status", "expires_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_stock_hold_status_expires", table_name="stock_hold")
+    op.drop_index("ix_stock_hold_variant_id", table_name="stock_hold")
+    op.drop_index("ix_stock_hold_product_id", table_name="stock_hold")
+    op.drop_index("ix_stock_hold_order_id", table_name="stock_hold")
+    op.drop_table("stock_hold")
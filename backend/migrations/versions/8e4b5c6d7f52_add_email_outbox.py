@@ -0,0 +1,42 @@
+"""add email_outbox table
+
+Revision ID: 8e4b5c6d7f52
+Revises: 7d3a4b5c6e41
+Create Date: 2026-01-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8e4b5c6d7f52"
+down_revision = "7d3a4b5c6e41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("subject", sa.String(length=255), nullable=False),
+        sa.Column("recipients", sa.Text(), nullable=False),
+        sa.Column("sender", sa.String(length=255), nullable=True),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("attachments", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_email_outbox_status_next", "email_outbox", ["status", "next_attempt_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_email_outbox_status_next", table_name="email_outbox")
+    op.drop_table("email_outbox")
@@ -0,0 +1,37 @@
+"""add payment_event table
+
+Revision ID: a0c6d7e8f974
+Revises: 9f5c6d7e8a63
+Create Date: 2026-01-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a0c6d7e8f974"
+down_revision = "9f5c6d7e8a63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "payment_event",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("vs", sa.String(length=32), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("order_status", sa.String(length=32), nullable=True),
+        sa.Column("amount_czk", sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_payment_event_vs", "payment_event", ["vs"], unique=False)
+    op.create_index("ix_payment_event_created_at", "payment_event", ["created_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_payment_event_created_at", table_name="payment_event")
+    op.drop_index("ix_payment_event_vs", table_name="payment_event")
+    op.drop_table("payment_event")
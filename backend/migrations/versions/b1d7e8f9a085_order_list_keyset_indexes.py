@@ -0,0 +1,47 @@
+"""order list keyset indexes and order_status_count
+
+Revision ID: b1d7e8f9a085
+Revises: a0c6d7e8f974
+Create Date: 2026-01-25
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b1d7e8f9a085"
+down_revision = "a0c6d7e8f974"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_order_status_id", "order", ["status", "id"], unique=False)
+    op.create_index("ix_order_created_at_id", "order", ["created_at", "id"], unique=False)
+    op.create_index("ix_order_total_czk_id", "order", ["total_czk", "id"], unique=False)
+
+    op.create_table(
+        "order_status_count",
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("status"),
+    )
+    # počáteční stav čítače z existujících objednávek
+    op.execute(
+        'INSERT INTO order_status_count (status, count) '
+        'SELECT status, COUNT(*) FROM "order" WHERE status IS NOT NULL GROUP BY status'
+    )
+    # známé stavy mají řádek vždy (i s nulou) – čítač pak jen upsertuje
+    for status in ("awaiting_payment", "paid", "canceled"):
+        op.execute(sa.text(
+            "INSERT INTO order_status_count (status, count) SELECT :status, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM order_status_count WHERE status = :status)"
+        ).bindparams(status=status))
+
+
+def downgrade():
+    op.drop_table("order_status_count")
+    op.drop_index("ix_order_total_czk_id", table_name="order")
+    op.drop_index("ix_order_created_at_id", table_name="order")
+    op.drop_index("ix_order_status_id", table_name="order")
@@ -0,0 +1,35 @@
+"""add imap_checkpoint table
+
+Revision ID: c2e8f9a0b196
+Revises: b1d7e8f9a085
+Create Date: 2026-02-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c2e8f9a0b196"
+down_revision = "b1d7e8f9a085"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "imap_checkpoint",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("account", sa.String(length=255), nullable=False),
+        sa.Column("folder", sa.String(length=255), nullable=False),
+        sa.Column("scope", sa.String(length=32), nullable=False),
+        sa.Column("uidvalidity", sa.BigInteger(), nullable=False),
+        sa.Column("last_uid", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("account", "folder", "scope", name="uq_imap_checkpoint_account_folder_scope"),
+    )
+
+
+def downgrade():
+    op.drop_table("imap_checkpoint")
@@ -0,0 +1,46 @@
+"""add bank_message table (processed bank notifications)
+
+Revision ID: d3f9a0b1c2a7
+Revises: c2e8f9a0b196
+Create Date: 2026-02-08
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d3f9a0b1c2a7"
+down_revision = "c2e8f9a0b196"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "bank_message",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("message_id", sa.String(length=255), nullable=False),
+        sa.Column("body_hash", sa.String(length=64), nullable=False),
+        sa.Column("source", sa.String(length=16), nullable=False),
+        sa.Column("imap_uid", sa.BigInteger(), nullable=True),
+        sa.Column("vs", sa.String(length=32), nullable=True),
+        sa.Column("amount_czk", sa.Numeric(10, 2), nullable=True),
+        sa.Column("outcome", sa.String(length=32), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.Integer(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["order_id"], ["order.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("message_id"),
+    )
+    op.create_index("ix_bank_message_body_hash", "bank_message", ["body_hash"], unique=False)
+    op.create_index("ix_bank_message_vs", "bank_message", ["vs"], unique=False)
+    op.create_index("ix_bank_message_order_id", "bank_message", ["order_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_bank_message_order_id", table_name="bank_message")
+    op.drop_index("ix_bank_message_vs", table_name="bank_message")
+    op.drop_index("ix_bank_message_body_hash", table_name="bank_message")
+    op.drop_table("bank_message")
@@ -1,4 +1,4 @@
-# backend/models/__init__.py
+# backend/models/__init__.py
 from .user import User
 from .category import Category
 from .product import Product
@@ -9,8 +9,16 @@ from .order import Order
 from .order_item import OrderItem
 from .sold_product import SoldProduct
 from .payment import Payment
+from .image_meta import ImageMeta
+from .stock_hold import StockHold
+from .email_outbox import EmailOutbox
+from .idempotency_key import IdempotencyKey
+from .payment_event import PaymentEvent
+from .order_status_count import OrderStatusCount
+from .imap_checkpoint import ImapCheckpoint
+from .bank_message import BankMessage
 
-__all__ = [
+__all__ = [
     "User",
     "Category",
     "Product",
@@ -20,4 +28,12 @@ __all__ = [
     "OrderItem",
     "SoldProduct",
     "Payment",
+    "ImageMeta",
+    "StockHold",
+    "EmailOutbox",
+    "IdempotencyKey",
+    "PaymentEvent",
+    "OrderStatusCount",
+    "ImapCheckpoint",
+    "BankMessage",
 ]
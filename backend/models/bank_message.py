@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class BankMessage(db.Model):
+    """
+    Zpracovaná bankovní notifikace (index proti opakovanému zpracování + audit).
+
+    `message_id` je Message-ID e-mailu (bez něj `body:<hash>`); podle něj se
+    známé zprávy přeskočí už po stažení hlaviček. `body_hash` (sha256 těla)
+    zachytí stejnou notifikaci pod jiným Message-ID. `outcome` říká, jak
+    párování dopadlo a `order_id` / `payment_id`, čeho se týkalo.
+    """
+
+    __tablename__ = "bank_message"
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(255), nullable=False, unique=True)
+    body_hash = db.Column(db.String(64), nullable=False, index=True)
+    source = db.Column(db.String(16), nullable=False, default="imap")
+    imap_uid = db.Column(db.BigInteger, nullable=True)
+    vs = db.Column(db.String(32), nullable=True, index=True)
+    amount_czk = db.Column(db.Numeric(10, 2), nullable=True)
+    # pending | paid | already_paid | order_not_found | amount_mismatch |
+    # order_amount_missing | unparsed | duplicate
+    outcome = db.Column(db.String(32), nullable=False, default="pending")
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id", ondelete="SET NULL"), nullable=True, index=True)
+    payment_id = db.Column(db.Integer, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<BankMessage {self.message_id} VS:{self.vs} {self.outcome}>"
@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class EmailOutbox(db.Model):
+    """
+    Fronta odchozích e-mailů. Zapisuje se ve stejné transakci jako objednávka,
+    odesílá `flask mail outbox-worker`.
+    pending → sending → sent | (chyba) pending s odkladem … → failed
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False, default="")
+    recipients = db.Column(db.Text, nullable=False)  # JSON seznam adres
+    sender = db.Column(db.String(255), nullable=True)
+    body = db.Column(db.Text, nullable=False, default="")
+    attachments = db.Column(db.Text, nullable=True)  # JSON [{filename, mimetype, content_b64 | path}]
+
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    @property
+    def recipient_list(self) -> list[str]:
+        try:
+            return list(json.loads(self.recipients or "[]"))
+        except ValueError:
+            return []
+
+    @property
+    def attachment_list(self) -> list[dict]:
+        try:
+            return list(json.loads(self.attachments or "[]"))
+        except ValueError:
+            return []
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<EmailOutbox #{self.id} {self.status} {self.subject!r}>"
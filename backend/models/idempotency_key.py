@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    Uložená odpověď na požadavek s hlavičkou Idempotency-Key (opakování
+    požadavku vrátí stejnou odpověď, aniž by se znovu vytvářela objednávka).
+    """
+
+    __tablename__ = "idempotency_key"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 těla požadavku
+    status = db.Column(db.String(16), nullable=False, default="processing")  # processing | completed
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    response_mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("key", "endpoint", name="uq_idempotency_key_endpoint"),
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<IdempotencyKey {self.endpoint}:{self.key} {self.status}>"
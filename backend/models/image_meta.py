@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class ImageMeta(db.Model):
+    """Metadata normalizovaného obrázku v uploads (klíčem je název souboru)."""
+
+    __tablename__ = "image_meta"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True, index=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    byte_size = db.Column(db.Integer, nullable=True)
+    dominant_color = db.Column(db.String(7), nullable=True)  # "#rrggbb"
+    lqip = db.Column(db.Text, nullable=True)  # data:image/webp;base64,...
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "byte_size": self.byte_size,
+            "dominant_color": self.dominant_color,
+            "lqip": self.lqip,
+        }
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<ImageMeta {self.filename} {self.width}x{self.height}>"
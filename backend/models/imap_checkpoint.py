@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class ImapCheckpoint(db.Model):
+    """
+    Kde skončila synchronizace IMAP složky: poslední zpracované UID platné
+    pro danou UIDVALIDITY. Změna UIDVALIDITY (složka přečíslována) = checkpoint
+    neplatí a začíná se znovu od nepřečtených zpráv.
+    `scope` odděluje nezávislé čtenáře stejné složky (např. "bank").
+    """
+
+    __tablename__ = "imap_checkpoint"
+
+    id = db.Column(db.Integer, primary_key=True)
+    account = db.Column(db.String(255), nullable=False)  # user@host
+    folder = db.Column(db.String(255), nullable=False)
+    scope = db.Column(db.String(32), nullable=False, default="bank")
+    uidvalidity = db.Column(db.BigInteger, nullable=False)
+    last_uid = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("account", "folder", "scope", name="uq_imap_checkpoint_account_folder_scope"),
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<ImapCheckpoint {self.account}/{self.folder} [{self.scope}] {self.uidvalidity}:{self.last_uid}>"
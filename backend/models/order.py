@@ -4,7 +4,13 @@ from backend.extensions import db
 
 class Order(db.Model):
     __tablename__ = 'order'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # keyset stránkování seznamu plateb (řazení sloupec + id)
+        db.Index("ix_order_status_id", "status", "id"),
+        db.Index("ix_order_created_at_id", "created_at", "id"),
+        db.Index("ix_order_total_czk_id", "total_czk", "id"),
+        {'extend_existing': True},
+    )
     __tablename__ = "order"
 
     id = db.Column(db.Integer, primary_key=True)
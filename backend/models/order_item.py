@@ -13,3 +13,7 @@ class OrderItem(db.Model):
 
     order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False)
 
+    # odkaz na zdroj skladu (bez FK – produkt/varianta může být později smazána)
+    product_id = db.Column(db.Integer, nullable=True, index=True)
+    variant_id = db.Column(db.Integer, nullable=True, index=True)
+
@@ -0,0 +1,16 @@
+from backend.extensions import db
+
+
+class OrderStatusCount(db.Model):
+    """
+    Počet objednávek v daném stavu, udržovaný průběžně (services/order_counts).
+    Seznam plateb z něj bere `total` místo COUNT(*) přes celou tabulku.
+    """
+
+    __tablename__ = "order_status_count"
+
+    status = db.Column(db.String(32), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<OrderStatusCount {self.status}={self.count}>"
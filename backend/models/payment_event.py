@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class PaymentEvent(db.Model):
+    """
+    Append-only záznam změny stavu platby. `id` slouží jako kurzor: každý
+    worker si čte jen řádky s vyšším id (a krátce i díry pod ním – pozdě
+    commitnuté transakce) a rozesílá je SSE posluchačům.
+    """
+
+    __tablename__ = "payment_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    vs = db.Column(db.String(32), nullable=False, index=True)
+    status = db.Column(db.String(32), nullable=False)
+    order_status = db.Column(db.String(32), nullable=True)
+    amount_czk = db.Column(db.Numeric(10, 2), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<PaymentEvent #{self.id} VS:{self.vs} {self.status}>"
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from backend.extensions import db
+
+
+class StockHold(db.Model):
+    """
+    Dočasná rezervace skladu pro nezaplacenou objednávku.
+    held → converted (zaplaceno) | released (vypršelo, sklad vrácen).
+    """
+
+    __tablename__ = "stock_hold"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, nullable=True, index=True)
+    variant_id = db.Column(db.Integer, nullable=True, index=True)  # je-li vyplněno, drží sklad varianty
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="held")
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_stock_hold_status_expires", "status", "expires_at"),
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - debug aid
+        return f"<StockHold order={self.order_id} p={self.product_id} v={self.variant_id} x{self.quantity} {self.status}>"
@@ -0,0 +1,68 @@
+# backend/scripts/_bench_common.py
+"""Společný základ pro bench_* skripty: dočasná SQLite DB + počítadlo SQL příkazů."""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))   # .../backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                 # .../backend
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)               # <root>
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# spawnované podprocesy (multiprocessing) dědí env a sdílí tak stejnou DB
+TMP_DIR = os.environ.get("NM_BENCH_DIR") or tempfile.mkdtemp(prefix="nm-bench-")
+os.environ["NM_BENCH_DIR"] = TMP_DIR
+# DB musí být nastavená dřív, než se naimportuje backend.app (Config se čte při importu)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TMP_DIR, "bench.db").replace("\\", "/")
+os.environ.setdefault("MAIL_SUPPRESS_SEND", "true")
+
+
+def make_app():
+    """Vytvoří app nad prázdnou dočasnou DB (db.create_all)."""
+    import logging
+
+    logging.disable(logging.WARNING)
+    from backend.app import create_app
+    from backend.extensions import db
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement.split()[0].upper())
+
+
+@contextmanager
+def count_statements(engine):
+    """Spočítá SQL příkazy poslané do DB uvnitř bloku."""
+    from sqlalchemy import event
+
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def timed(label: str, n: int = 1):
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    per = elapsed / n * 1000 if n else 0.0
+    print(f"{label:45s} {elapsed * 1000:9.1f} ms celkem  {per:8.3f} ms/op")
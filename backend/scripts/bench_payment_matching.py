@@ -0,0 +1,139 @@
+# backend/scripts/bench_payment_matching.py
+"""
+Párování bankovních potvrzení: původní smyčka ze sync_csob_mail (Order + Payment
+dotazem na každé potvrzení) vs. services.payment_matching.match_confirmations
+(2 IN dotazy, párování v paměti, jeden commit).
+
+Dávka: ~90 % sedí, ~5 % jiná částka, ~5 % neznámý VS. Navíc kontrola, že
+platba ke zrušené objednávce (propadlá rezervace) ji nepřepne na paid.
+
+Spuštění:  python backend/scripts/bench_payment_matching.py [--confirmations 5000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from _bench_common import count_statements, make_app
+
+
+def legacy_match(db, Order, Payment, publish, pairs):
+    """Původní logika ze sync_csob_mail (před zavedením services.payment_matching)."""
+    processed, unmatched = [], []
+    for vs, amount in pairs:
+        order = Order.query.filter_by(vs=str(vs)).first()
+        if not order:
+            unmatched.append({"vs": str(vs), "reason": "order_not_found", "paid": float(amount)})
+            continue
+        expected = Decimal(str(order.total_czk))
+        paid = Decimal(str(amount))
+        if abs(paid - expected) > Decimal("0.50"):
+            unmatched.append({"vs": str(vs), "reason": "amount_mismatch", "paid": float(paid),
+                              "expected": float(expected), "orderId": order.id})
+            continue
+        if order.status != "paid":
+            order.status = "paid"
+        pay = Payment.query.filter_by(vs=str(vs)).order_by(Payment.id.desc()).first()
+        if pay:
+            pay.status = "received"
+            pay.amount_czk = paid
+            if pay.received_at is None:
+                pay.received_at = datetime.utcnow()
+        else:
+            db.session.add(Payment(vs=str(vs), amount_czk=paid, status="received", received_at=datetime.utcnow()))
+        publish(str(vs), "received", order.status, paid)
+        processed.append({"vs": str(vs), "amount": float(paid), "expected": float(expected), "orderId": order.id})
+    if processed:
+        db.session.commit()
+    return {"processed": processed, "unmatched": unmatched}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--confirmations", type=int, default=5000)
+    args = ap.parse_args()
+    n = args.confirmations
+
+    app = make_app()
+    from sqlalchemy import delete, func, insert, select, update
+
+    from backend.extensions import db
+    from backend.models import Order, Payment, PaymentEvent
+    from backend.services import order_counts
+    from backend.services.payment_events import publish
+    from backend.services.payment_matching import match_confirmations
+
+    random.seed(42)
+    with app.app_context():
+        totals = [Decimal(random.randint(150, 3000)) for _ in range(n)]
+        db.session.execute(insert(Order), [
+            {"vs": f"26{i:08d}", "customer_name": "Zákazník", "customer_email": "z@example.cz",
+             "customer_address": "Praha", "status": "awaiting_payment", "total_czk": totals[i]}
+            for i in range(n)
+        ])
+        db.session.execute(insert(Payment), [
+            {"vs": f"26{i:08d}", "amount_czk": totals[i], "status": "pending"} for i in range(n)
+        ])
+        db.session.commit()
+        order_counts.recount()
+
+        pairs = []
+        for i in range(n):
+            roll = random.random()
+            if roll < 0.05:
+                pairs.append((f"99{i:08d}", totals[i]))          # neznámý VS
+            elif roll < 0.10:
+                pairs.append((f"26{i:08d}", totals[i] + 10))     # jiná částka
+            else:
+                pairs.append((f"26{i:08d}", totals[i]))
+
+        def reset():
+            db.session.execute(update(Order).values(status="awaiting_payment"))
+            db.session.execute(update(Payment).values(status="pending", received_at=None))
+            db.session.execute(delete(PaymentEvent))
+            db.session.commit()
+            order_counts.recount()
+            db.session.expunge_all()
+
+        results = {}
+        for label, run in (
+            ("původní smyčka", lambda: legacy_match(db, Order, Payment, publish, pairs)),
+            ("match_confirmations", lambda: match_confirmations(pairs, require_amount_match=True)),
+        ):
+            reset()
+            with count_statements(db.engine) as counter:
+                started = time.perf_counter()
+                report = run()
+                elapsed = time.perf_counter() - started
+            results[label] = report
+            print(f"{label:22s} {elapsed * 1000:9.1f} ms  {counter.count:6d} SQL  "
+                  f"spárováno {len(report['processed'])}, nespárováno {len(report['unmatched'])}")
+
+        # zrušené objednávky (sweeper vrátil kusy na sklad): v obou režimech zůstanou zrušené
+        canceled_ok = True
+        for strict in (True, False):
+            reset()
+            canceled = [f"26{i:08d}" for i in range(0, n, 50)]
+            db.session.execute(update(Order).where(Order.vs.in_(canceled)).values(status="canceled"))
+            db.session.execute(update(Payment).where(Payment.vs.in_(canceled)).values(status="canceled"))
+            db.session.commit()
+            report = match_confirmations([(vs, totals[int(vs[2:])]) for vs in canceled],
+                                         require_amount_match=strict)
+            still = db.session.execute(
+                select(func.count()).where(Order.vs.in_(canceled), Order.status == "canceled")
+            ).scalar()
+            reasons = {item["reason"] for item in report["items"]}
+            ok = still == len(canceled) and not report["processed"] and reasons == {"order_canceled"}
+            canceled_ok = canceled_ok and ok
+            print(f"zrušené ({'s částkou' if strict else 'jen VS'}): {len(canceled)} plateb, "
+                  f"zůstalo zrušených {still}, důvody {sorted(reasons)} {'✅' if ok else '❌'}")
+
+    legacy, batched = results.values()
+    same = legacy["processed"] == batched["processed"] and legacy["unmatched"] == batched["unmatched"]
+    print("✅ stejný report" if same else "❌ reporty se liší")
+    print("✅ zrušené objednávky nepřepnuty" if canceled_ok else "❌ zrušená objednávka přepnuta na paid")
+
+
+if __name__ == "__main__":
+    main()
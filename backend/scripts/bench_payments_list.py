@@ -0,0 +1,89 @@
+# backend/scripts/bench_payments_list.py
+"""
+GET /api/payments?per_page=200: počet SQL příkazů a doba odpovědi.
+
+Objednávky mají total_czk = NULL, takže se částka počítá z order_item
+(_compute_amounts_for_orders). Schéma order_item se zjišťuje jen při prvním
+požadavku (inspector); dřív se při každém požadavku volalo PRAGMA table_info.
+
+Nakonec porovná poslední stránku přes OFFSET (?page=N) a přes keyset (?cursor=…).
+
+Spuštění:  python backend/scripts/bench_payments_list.py [--orders 2000] [--items 3] [--rounds 50]
+"""
+import argparse
+import time
+
+from _bench_common import count_statements, make_app
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=2000)
+    ap.add_argument("--items", type=int, default=3)
+    ap.add_argument("--rounds", type=int, default=50)
+    args = ap.parse_args()
+
+    app = make_app()
+    from sqlalchemy import insert
+
+    from backend.extensions import db
+    from backend.models import Order, OrderItem
+
+    with app.app_context():
+        db.session.execute(insert(Order), [
+            {"vs": f"26{i:08d}", "customer_name": "Zákazník", "customer_email": "z@example.cz",
+             "customer_address": "Praha", "status": "awaiting_payment", "total_czk": None}
+            for i in range(1, args.orders + 1)
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": oid, "product_name": "Náramek", "quantity": 1 + k, "price": 199}
+            for oid in range(1, args.orders + 1) for k in range(args.items)
+        ])
+        db.session.commit()
+
+        client = app.test_client()
+        url = "/api/payments?per_page=200&page=2"
+
+        with count_statements(db.engine) as cold:
+            first = client.get(url).get_json()
+        with count_statements(db.engine) as warm:
+            client.get(url)
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            client.get(url)
+        per_request = (time.perf_counter() - started) / args.rounds * 1000
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            db.session.execute(db.text("PRAGMA table_info('order_item');")).fetchall()
+        pragma = (time.perf_counter() - started) / args.rounds * 1000
+
+        # poslední stránka: OFFSET vs. keyset cursor
+        last_page = (args.orders + 199) // 200
+        cursor = None
+        for _ in range(last_page - 1):
+            cursor = client.get("/api/payments?per_page=200&sort=created_at" + (f"&cursor={cursor}" if cursor else "")).get_json()["next_cursor"]
+        deep = {}
+        for label, deep_url in (
+            ("offset", f"/api/payments?per_page=200&sort=created_at&page={last_page}"),
+            ("cursor", f"/api/payments?per_page=200&sort=created_at&cursor={cursor}"),
+        ):
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                client.get(deep_url)
+            deep[label] = (time.perf_counter() - started) / args.rounds * 1000
+
+    amounts = [it["amount"] for it in first.get("items", [])]
+    expected = 199 * sum(1 + k for k in range(args.items))
+    print(f"{args.orders} objednávek × {args.items} položek, per_page=200")
+    print(f"první požadavek:  {cold.count} SQL (vč. inspectoru)")
+    print(f"další požadavky:  {warm.count} SQL, {per_request:.2f} ms/požadavek")
+    print(f"PRAGMA table_info (dřív při každém požadavku): {pragma:.3f} ms")
+    print(f"poslední stránka ({last_page}): offset {deep['offset']:.2f} ms, cursor {deep['cursor']:.2f} ms")
+    ok = len(amounts) == 200 and all(a == expected for a in amounts)
+    print("✅ částky dopočteny z order_item" if ok else f"❌ neočekávané částky: {amounts[:5]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# backend/scripts/bench_smtp_transport.py
+"""
+Propustnost odesílání e-mailů: `mail.send` (nové spojení na zprávu)
+vs. MailTransport (jedno sdílené spojení) vs. outbox worker nad MailTransport.
+
+Proti lokálnímu SMTP serveru (stdlib socketserver, zprávy zahazuje). Zpoždění
+při navázání spojení (`--handshake-ms`) simuluje TLS handshake + login u Seznamu.
+`--drop-every N` nechá server po N zprávách spojení shodit (ověření reconnectu).
+
+Spuštění:  python backend/scripts/bench_smtp_transport.py [--messages 200] [--handshake-ms 30]
+"""
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+import _bench_common
+
+
+class _Stats:
+    connections = 0
+    messages = 0
+    lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimální SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)."""
+
+    handshake_delay = 0.0
+    drop_every = 0
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        with _Stats.lock:
+            _Stats.connections += 1
+        time.sleep(self.handshake_delay)
+        self._reply("220 bench ESMTP")
+        in_conn = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode("ascii", "replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self._reply("250-bench")
+                self._reply("250 8BITMIME")
+            elif cmd.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with _Stats.lock:
+                    _Stats.messages += 1
+                in_conn += 1
+                self._reply("250 OK queued")
+                if self.drop_every and in_conn >= self.drop_every:
+                    return  # server spojení shodí bez QUIT
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+def start_server(handshake_ms: float, drop_every: int):
+    SMTPHandler.handshake_delay = handshake_ms / 1000.0
+    SMTPHandler.drop_every = drop_every
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--handshake-ms", type=float, default=30.0)
+    ap.add_argument("--drop-every", type=int, default=0)
+    args = ap.parse_args()
+
+    server = start_server(args.handshake_ms, args.drop_every)
+    os.environ.update({
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(server.server_address[1]),
+        "MAIL_USE_SSL": "false",
+        "MAIL_USE_TLS": "false",
+        "MAIL_USERNAME": "",
+        "MAIL_DEFAULT_SENDER": "shop@example.com",
+        "MAIL_SUPPRESS_SEND": "false",
+        "MAIL_DEBUG": "false",
+    })
+
+    app = _bench_common.make_app()
+    from backend.api.utils.email import build_message
+    from backend.api.utils.mail_transport import MailTransport
+    from backend.extensions import db, mail
+    from backend.services import outbox
+
+    def messages():
+        return [
+            build_message(f"Bench #{i}", ["customer@example.com"], "Dobrý den,\n" * 20)
+            for i in range(args.messages)
+        ]
+
+    def run(label, fn):
+        _Stats.connections = _Stats.messages = 0
+        msgs = messages()
+        started = time.perf_counter()
+        fn(msgs)
+        elapsed = time.perf_counter() - started
+        print(f"{label:32s} {len(msgs) / elapsed:8.1f} zpráv/s  "
+              f"({_Stats.messages} doručeno, {_Stats.connections} spojení, {elapsed:.2f}s)")
+
+    with app.app_context():
+        def per_message(msgs):
+            for m in msgs:
+                mail.send(m)
+
+        def pooled(msgs):
+            with MailTransport() as transport:
+                transport.send_many(msgs)
+
+        def worker(msgs):
+            for i in range(len(msgs)):
+                outbox.enqueue_email(f"Bench #{i}", ["customer@example.com"], "Dobrý den,\n" * 20)
+            db.session.commit()
+            with MailTransport() as transport:
+                while outbox.process_batch(50, transport)["claimed"]:
+                    pass
+
+        print(f"lokální SMTP 127.0.0.1:{server.server_address[1]}, handshake {args.handshake_ms:.0f} ms"
+              + (f", shození spojení po {args.drop_every} zprávách" if args.drop_every else ""))
+        run("mail.send (spojení na zprávu)", per_message)
+        run("MailTransport (sdílené spojení)", pooled)
+        run("outbox worker + MailTransport", worker)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
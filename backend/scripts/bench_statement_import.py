@@ -0,0 +1,118 @@
+# backend/scripts/bench_statement_import.py
+"""
+Import bankovního výpisu (services.bank_statements): vygeneruje GPC a ČSOB CSV
+s `--transactions` pohyby (~60 % příjmy s VS objednávek, z nich část s jinou
+částkou / neznámým VS, zbytek odchozí platby), naimportuje je a změří čas,
+počet SQL a špičku paměti (tracemalloc). Druhý import stejného souboru musí
+všechno přeskočit (bank_message, klíč stmt:<ID transakce>).
+
+Spuštění:  python backend/scripts/bench_statement_import.py [--transactions 20000] [--format gpc|csv]
+"""
+import argparse
+import os
+import random
+import tracemalloc
+from decimal import Decimal
+
+from _bench_common import TMP_DIR, count_statements, make_app
+
+
+def gpc_line(txid: int, vs: str, amount: Decimal, credit: bool) -> str:
+    haler = int(amount * 100)
+    return (
+        "075" + "0000000123456789" + "0000000987654321" + f"{txid:013d}" + f"{haler:012d}"
+        + ("2" if credit else "1") + vs.rjust(10, "0") + "00" + "0300" + "0000" + "0" * 10
+        + "150126" + "Zakaznik Novak".ljust(20) + "0" + "0203" + "150126"
+    )
+
+
+def write_gpc(path: str, rows) -> None:
+    with open(path, "w", encoding="cp1250", newline="") as fh:
+        fh.write("074" + "0000000123456789" + "NARAMKOVA MODA".ljust(20) + "010126"
+                 + "0" * 14 + "+" + "0" * 14 + "+" + "0" * 14 + "0" + "0" * 14 + "0" + "001" + "310126"
+                 + " " * 14 + "\r\n")
+        for row in rows:
+            fh.write(gpc_line(*row) + "\r\n")
+
+
+def write_csv(path: str, rows) -> None:
+    with open(path, "w", encoding="cp1250", newline="") as fh:
+        fh.write("Pohyby na účtu;123456789/0300\r\n\r\n")
+        fh.write("číslo účtu;datum zaúčtování;částka;měna;zůstatek;číslo účtu protiúčtu;kód banky protiúčtu;"
+                 "název účtu protiúčtu;konstantní symbol;variabilní symbol;specifický symbol;"
+                 "označení operace;ID transakce;poznámka\r\n")
+        for txid, vs, amount, credit in rows:
+            signed = f"{'' if credit else '-'}{amount:,.2f}".replace(",", " ").replace(".", ",")
+            fh.write(f"123456789/0300;15.01.2026;{signed};CZK;0,00;987654321;0100;Novák;0308;{vs};;"
+                     f"Příchozí úhrada;{txid};\"poznámka; s oddělovačem\"\r\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--transactions", type=int, default=20000)
+    ap.add_argument("--format", choices=("gpc", "csv"), default="gpc")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    args = ap.parse_args()
+    n = args.transactions
+
+    app = make_app()
+    from sqlalchemy import func, insert, select
+
+    from backend.extensions import db
+    from backend.models import BankMessage, Order, Payment
+    from backend.services import bank_statements, order_counts
+
+    random.seed(7)
+    orders = n // 2
+    totals = [Decimal(random.randint(150, 3000)) for _ in range(orders)]
+    rows, expected_paid = [], 0
+    for i in range(n):
+        roll = random.random()
+        if roll < 0.4:
+            rows.append((100000 + i, "", Decimal(random.randint(50, 5000)), False))   # odchozí
+            continue
+        o = random.randrange(orders)
+        if roll < 0.52:
+            rows.append((100000 + i, f"99{i:08d}", totals[o], True))                   # neznámý VS
+        elif roll < 0.58:
+            rows.append((100000 + i, f"26{o:08d}", totals[o] + 25, True))              # jiná částka
+        else:
+            rows.append((100000 + i, f"26{o:08d}", totals[o], True))
+            expected_paid += 1
+    path = os.path.join(TMP_DIR, f"vypis.{args.format}")
+    (write_gpc if args.format == "gpc" else write_csv)(path, rows)
+    print(f"výpis: {n} transakcí, {os.path.getsize(path) / 1024 / 1024:.1f} MB ({args.format})")
+
+    with app.app_context():
+        db.session.execute(insert(Order), [
+            {"vs": f"26{i:08d}", "customer_name": "Zákazník", "customer_email": "z@example.cz",
+             "customer_address": "Praha", "status": "awaiting_payment", "total_czk": totals[i]}
+            for i in range(orders)
+        ])
+        db.session.execute(insert(Payment), [
+            {"vs": f"26{i:08d}", "amount_czk": totals[i], "status": "pending"} for i in range(orders)
+        ])
+        db.session.commit()
+        order_counts.recount()
+
+        for label in ("import", "znovu (idempotence)"):
+            tracemalloc.start()
+            with count_statements(db.engine) as counter, open(path, "rb") as fh:
+                result = bank_statements.import_statement(fh, args.format, batch_size=args.batch_size)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:20s} {result['seconds'] * 1000:9.1f} ms  {counter.count:6d} SQL  "
+                  f"špička {peak / 1024 / 1024:5.1f} MB  importováno {result['imported']}, "
+                  f"přeskočeno {result['already_imported']}, {result['outcomes']}, chyb {len(result['errors'])}")
+
+        paid = db.session.execute(select(func.count()).where(Order.status == "paid")).scalar()
+        logged = db.session.execute(select(func.count(BankMessage.id))).scalar()
+        credits = sum(1 for r in rows if r[3])
+        paid_orders = len({r[1] for r in rows if r[3] and r[1].startswith("26") and r[2] == totals[int(r[1][2:])]})
+    ok = paid == paid_orders and logged == credits and result["imported"] == 0
+    print(f"zaplaceno objednávek {paid} (čekáno {paid_orders}), bank_message {logged} (příjmů {credits})")
+    print("✅ sedí" if ok else "❌ nesedí")
+
+
+if __name__ == "__main__":
+    main()
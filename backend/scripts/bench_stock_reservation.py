@@ -0,0 +1,84 @@
+# backend/scripts/bench_stock_reservation.py
+"""
+Odečet skladu pro košík: původní smyčka (get + UPDATE + get na položku)
+vs. services.stock.reserve_products (1 SELECT + 1 UPDATE … RETURNING).
+
+Spuštění:  python backend/scripts/bench_stock_reservation.py [--lines 10] [--rounds 200]
+"""
+import argparse
+import time
+
+from _bench_common import count_statements, make_app
+
+
+def legacy_reserve(db, Product, cart):
+    """Původní logika z create_order (před zavedením services.stock)."""
+    decremented = []
+    for pid, qty in cart:
+        product = db.session.get(Product, pid)
+        if not product or int(product.stock or 0) < qty:
+            raise RuntimeError("nedostatek")
+        updated = db.session.execute(
+            db.text("UPDATE product SET stock = stock - :qty WHERE id = :pid AND stock >= :qty"),
+            {"qty": qty, "pid": pid},
+        )
+        if updated.rowcount == 0:
+            raise RuntimeError("nedostatek")
+        db.session.expire(product)
+        latest = db.session.get(Product, pid)
+        decremented.append({"id": pid, "taken_qty": qty, "remaining_stock": int(latest.stock or 0)})
+    return decremented
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=10)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    app = make_app()
+    from backend.extensions import db
+    from backend.models import Product
+    from backend.services.stock import StockError, reserve_products
+
+    with app.app_context():
+        db.session.add_all(
+            [Product(name=f"Náramek {i}", price_czk=199, stock=10**6) for i in range(args.lines)]
+        )
+        db.session.commit()
+        cart = [(p.id, 1) for p in Product.query.order_by(Product.id).all()]
+
+        def run(label, fn):
+            with count_statements(db.engine) as counter:
+                fn()
+                db.session.commit()
+                db.session.expunge_all()
+            per_cart = counter.count
+            # měříme jen dobu uvnitř transakce (tj. jak dlouho drží zámek), commit zvlášť
+            elapsed = 0.0
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                fn()
+                elapsed += time.perf_counter() - started
+                db.session.commit()
+                db.session.expunge_all()
+            print(f"{label} ({args.lines} položek)".ljust(45)
+                  + f" {elapsed / args.rounds * 1000:8.3f} ms/košík  {per_cart} SQL příkazů")
+
+        run("původní smyčka", lambda: legacy_reserve(db, Product, cart))
+        run("reserve_products", lambda: reserve_products(cart))
+
+        # nedostatek u dvou položek → celý košík selže, nic se neodečte
+        before = {p.id: p.stock for p in Product.query.all()}
+        short = [(cart[0][0], 10**7), (cart[1][0], 10**7)] + cart[2:]
+        try:
+            reserve_products(short)
+        except StockError as exc:
+            db.session.rollback()
+            print(f"nedostatek: {exc.status} {len(exc.details['shortages'])} položky v 'shortages'")
+        after = {p.id: p.stock for p in Product.query.all()}
+        print("sklad beze změny:", before == after)
+
+
+if __name__ == "__main__":
+    main()
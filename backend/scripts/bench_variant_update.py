@@ -0,0 +1,86 @@
+# backend/scripts/bench_variant_update.py
+"""
+Počet SQL příkazů při editaci produktu, která mění jediné pole jedné varianty.
+
+Spuštění:  python backend/scripts/bench_variant_update.py [--variants 10] [--media 3]
+Skript končí s exit kódem 1, pokud editace změní jiné řádky variant/médií
+než ten jeden (tj. kdyby se vrátilo mazání a znovuvkládání variant).
+"""
+import argparse
+import sys
+
+from _bench_common import count_statements, make_app
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--variants", type=int, default=10)
+    ap.add_argument("--media", type=int, default=3)
+    args = ap.parse_args()
+
+    app = make_app()
+    from backend.extensions import db
+    from backend.models import Category, Product, ProductVariant, ProductVariantMedia
+
+    with app.app_context():
+        db.session.add(Category(name="Bench"))
+        p = Product(name="Náramek", price_czk=199, stock=5, category_id=1)
+        db.session.add(p)
+        db.session.flush()
+        for i in range(args.variants):
+            v = ProductVariant(product_id=p.id, variant_name=f"V{i}", wrist_size="17 cm",
+                               price_czk=199, stock=3, image=f"v{i}.webp")
+            v.media = [ProductVariantMedia(filename=f"v{i}_{m}.webp") for m in range(args.media)]
+            db.session.add(v)
+        db.session.commit()
+        product_id = p.id
+        variants = ProductVariant.query.filter_by(product_id=product_id).order_by(ProductVariant.id).all()
+        ids_before = [v.id for v in variants]
+        media_before = sorted(m.id for v in variants for m in v.media)
+
+        # formulář tak, jak ho posílá admin (všechny varianty, jedna má změněný sklad)
+        form = {
+            "name": "Náramek", "price": "199", "stock": "5", "category_id": "1",
+            "variant_id[]": [str(v.id) for v in variants],
+            "variant_name[]": [v.variant_name for v in variants],
+            "variant_wrist_size[]": [v.wrist_size for v in variants],
+            "variant_stock[]": ["7" if i == 0 else "3" for i in range(len(variants))],
+            "variant_price[]": ["199" for _ in variants],
+            "variant_description[]": ["" for _ in variants],
+            "variant_image_existing[]": [v.image for v in variants],
+        }
+        for i, v in enumerate(variants):
+            form[f"variant_image_existing_multi_{i}[]"] = [m.filename for m in v.media]
+        db.session.remove()
+
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    with count_statements(engine) as counter:
+        resp = client.put(f"/api/products/{product_id}", data=form, content_type="multipart/form-data")
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+
+    kinds = {k: counter.statements.count(k) for k in sorted(set(counter.statements))}
+    print(f"Varianty: {args.variants}, médií na variantu: {args.media}")
+    print(f"SQL příkazů celkem: {counter.count}  {kinds}")
+
+    with app.app_context():
+        variants = ProductVariant.query.filter_by(product_id=product_id).order_by(ProductVariant.id).all()
+        ids_after = [v.id for v in variants]
+        media_after = sorted(m.id for v in variants for m in v.media)
+        stock0 = variants[0].stock
+
+    ok = (
+        ids_before == ids_after
+        and media_before == media_after
+        and stock0 == 7
+        and kinds.get("INSERT", 0) == 0
+        and kinds.get("DELETE", 0) == 0
+        and kinds.get("UPDATE", 0) == 1
+    )
+    print("OK – změněn jen jeden řádek, PK variant i médií zachovány" if ok else "CHYBA – varianty se přepsaly")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/scripts/bench_vs_allocator.py
+"""
+Souběžné přidělování VS: původní generate_vs (RRRRDDMMHHMM + retry smyčka)
+vs. blokový alokátor services.vs_allocator (procesy × vlákna nad jednou DB).
+
+Spuštění:  python backend/scripts/bench_vs_allocator.py [--procs 2] [--threads 4] [--per-thread 100]
+Skript končí s exit kódem 1, pokud alokátor vydá některý VS dvakrát nebo
+některé přidělení selže. Zámky SQLite při souběhu zapisovačů alokátor zkouší
+znovu (vs_allocator.RETRIES); "selhalo" zbývá jen pro commit testu.
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import threading
+import time
+from datetime import datetime
+
+import _bench_common
+
+
+def _legacy_reserve(db, text, IntegrityError, max_tries=50):
+    """Původní _reserve_unique_vs z client/routes.py (DDL + INSERT + rollback při kolizi)."""
+    retries = 0
+    for _ in range(max_tries):
+        vs = datetime.now().strftime("%Y%d%m%H%M")
+        db.session.execute(text("CREATE TABLE IF NOT EXISTS vs_registry (vs TEXT PRIMARY KEY)"))
+        try:
+            db.session.execute(text("INSERT INTO vs_registry (vs) VALUES (:vs)"), {"vs": vs})
+            db.session.commit()
+            return vs, retries
+        except IntegrityError:
+            db.session.rollback()
+            retries += 1
+    return None, retries
+
+
+def worker(mode: str, threads: int, per_thread: int, queue) -> None:
+    import logging
+
+    logging.disable(logging.WARNING)
+    from sqlalchemy import text
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.services.vs_allocator import allocate_and_reserve_vs
+
+    app = create_app()
+    results = {"vs": [], "retries": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def run():
+        got, retries, failed = [], 0, 0
+        with app.app_context():
+            for _ in range(per_thread):
+                if mode == "legacy":
+                    vs, r = _legacy_reserve(db, text, IntegrityError)
+                    retries += r
+                    if vs is None:
+                        failed += 1
+                        continue
+                else:
+                    try:
+                        vs = allocate_and_reserve_vs()
+                        db.session.commit()
+                    except OperationalError:  # commit: SQLite busy timeout při souběhu zapisovačů
+                        db.session.rollback()
+                        failed += 1
+                        continue
+                got.append(vs)
+            db.session.remove()
+        with lock:
+            results["vs"] += got
+            results["retries"] += retries
+            results["failed"] += failed
+
+    ts = [threading.Thread(target=run) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    queue.put(results)
+
+
+def run_mode(mode: str, procs: int, threads: int, per_thread: int) -> list[str]:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    started = time.perf_counter()
+    ps = [ctx.Process(target=worker, args=(mode, threads, per_thread, queue)) for _ in range(procs)]
+    for p in ps:
+        p.start()
+    results = [queue.get() for _ in ps]
+    for p in ps:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    issued = [vs for r in results for vs in r["vs"]]
+    retries = sum(r["retries"] for r in results)
+    failed = sum(r["failed"] for r in results)
+    total = procs * threads * per_thread
+    print(f"{mode:10s} {len(issued):6d}/{total} VS  {len(issued) / elapsed:8.1f} VS/s  "
+          f"retry {retries:6d}  selhalo {failed:5d}  duplicit {len(issued) - len(set(issued))}")
+    return issued, total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=2)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--per-thread", type=int, default=100)
+    ap.add_argument("--legacy-per-thread", type=int, default=5,
+                    help="Původní generátor vydá max. 1 VS za minutu – stačí pár pokusů")
+    args = ap.parse_args()
+
+    app = _bench_common.make_app()  # založí schéma + VS tabulky
+    del app
+
+    print(f"{args.procs} procesů × {args.threads} vláken, SQLite {_bench_common.TMP_DIR}")
+    run_mode("legacy", args.procs, args.threads, args.legacy_per_thread)
+    issued, total = run_mode("allocator", args.procs, args.threads, args.per_thread)
+
+    bad = [vs for vs in issued if len(vs) != 10 or not vs.isdigit()]
+    if len(issued) != len(set(issued)) or bad or not issued:
+        print("❌ alokátor vydal duplicitní nebo neplatný VS")
+        sys.exit(1)
+    if len(issued) != total:
+        print(f"❌ alokátor nepřidělil {total - len(issued)} VS")
+        sys.exit(1)
+    print("✅ všechny VS přidělené, unikátní, 10 číslic")
+
+
+if __name__ == "__main__":
+    main()
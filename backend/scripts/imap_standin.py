@@ -0,0 +1,413 @@
+# backend/scripts/imap_standin.py
+"""
+Lokální náhrada IMAP serveru banky pro `flask payments imap-worker` (offline test).
+
+Minimální IMAP4rev1 nad jednou složkou INBOX v paměti (stdlib socketserver,
+bez TLS): CAPABILITY, LOGIN, SELECT, NOOP, IDLE/DONE, UID SEARCH/FETCH/STORE,
+CLOSE, LOGOUT. Notifikace ve stylu ČSOB (HTML tabulka + text) se přidávají
+souborem .eml do `--dir` (příkaz `send`); klientům v IDLE server hned pošle
+`* n EXISTS`. `--drop-after S` shodí každé spojení po S sekundách (reconnect),
+`--no-idle` schová IDLE (worker přejde na NOOP polling).
+
+Příkazy:
+  serve – server pro ruční test:
+    python backend/scripts/imap_standin.py serve [--port 1143] [--dir /tmp/imap-standin]
+    IMAP_HOST=127.0.0.1 IMAP_PORT=1143 IMAP_SSL=false IMAP_USER=test IMAP_PASSWORD=test \\
+      flask payments imap-worker
+  send  – vloží notifikaci o platbě:
+    python backend/scripts/imap_standin.py send --vs 2600000001 --amount 1290,00 [--dir ...]
+  demo  – vše v jednom procesu (dočasná SQLite DB, objednávky, worker ve vlákně);
+    měří zpoždění od doručení notifikace po Order.status = paid:
+
+Spuštění:  python backend/scripts/imap_standin.py demo [--orders 20] [--drop-after 0] [--no-idle]
+"""
+import argparse
+import glob
+import os
+import re
+import select
+import socket
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "imap-standin")
+
+_SEQ_RE = re.compile(r"^[\d:*,]+$")
+_FIELDS_RE = re.compile(r"HEADER\.FIELDS \(([^)]*)\)", re.I)
+
+
+# ---- notifikace -------------------------------------------------------------
+
+def bank_notification(vs: str, amount: str, sender: str = "ČSOB <noreply@csob.cz>") -> bytes:
+    """Zpráva jako avízo ČSOB: HTML tabulka (Variabilní symbol / Částka) + textová část."""
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "shop@example.cz"
+    msg["Subject"] = "Avízo - příchozí platba"
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid(domain="standin.local")
+    msg.set_content(f"Příchozí platba\nVariabilní symbol: {vs}\nČástka: +{amount} CZK\n")
+    msg.add_alternative(
+        "<html><body><table>"
+        f"<tr><td>Variabilní symbol</td><td>{vs}</td></tr>"
+        f"<tr><td>Částka</td><td>+{amount} CZK</td></tr>"
+        "</table></body></html>",
+        subtype="html",
+    )
+    return msg.as_bytes().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+def drop_message(directory: str, raw: bytes) -> str:
+    """Uloží .eml do složky, kterou server sleduje (atomicky: tmp + rename)."""
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.join(directory, f"{time.time_ns()}.eml")
+    with open(name + ".tmp", "wb") as fh:
+        fh.write(raw)
+    os.replace(name + ".tmp", name)
+    return name
+
+
+# ---- úložiště ---------------------------------------------------------------
+
+class Mailbox:
+    """INBOX v paměti: [(uid, flags, raw)], UID rostou, UIDVALIDITY pevná."""
+
+    def __init__(self, uidvalidity: int):
+        self.uidvalidity = uidvalidity
+        self.messages: list[tuple[int, set, bytes]] = []
+        self.uidnext = 1
+        self.lock = threading.Lock()
+
+    def append(self, raw: bytes, seen: bool = False) -> int:
+        with self.lock:
+            uid = self.uidnext
+            self.uidnext += 1
+            self.messages.append((uid, {"\\Seen"} if seen else set(), raw))
+            return uid
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.messages)
+
+    def resolve(self, spec: str) -> list[tuple[int, int, set, bytes]]:
+        """UID sekvence ("1:3,7,9:*") → [(seq, uid, flags, raw)]; "n:*" nad max. vrátí poslední."""
+        with self.lock:
+            msgs = list(self.messages)
+        top = msgs[-1][0] if msgs else 0
+        wanted: set[int] = set()
+        ranges = []
+        for part in spec.split(","):
+            lo, _, hi = part.partition(":")
+            lo = top if lo == "*" else int(lo)
+            hi = lo if not hi else (top if hi == "*" else int(hi))
+            ranges.append((min(lo, hi), max(lo, hi)))
+        for seq, (uid, flags, raw) in enumerate(msgs, 1):
+            if any(lo <= uid <= hi for lo, hi in ranges):
+                wanted.add(uid)
+        return [(seq, uid, flags, raw) for seq, (uid, flags, raw) in enumerate(msgs, 1) if uid in wanted]
+
+
+def watch_dir(mailbox: Mailbox, directory: str, stop: threading.Event, log=print) -> None:
+    """Načítá nové *.eml ze složky do schránky (jednou za 0,2 s)."""
+    seen: set[str] = set()
+    while not stop.is_set():
+        for path in sorted(glob.glob(os.path.join(directory, "*.eml"))):
+            if path in seen:
+                continue
+            seen.add(path)
+            with open(path, "rb") as fh:
+                uid = mailbox.append(fh.read())
+            log(f"standin: {os.path.basename(path)} → UID {uid}")
+        stop.wait(0.2)
+
+
+# ---- protokol ---------------------------------------------------------------
+
+def _header_fields(raw: bytes, names: list[str]) -> bytes:
+    head = raw.split(b"\r\n\r\n", 1)[0]
+    wanted = {n.lower().encode() for n in names}
+    out, keep = [], False
+    for line in head.split(b"\r\n"):
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                out.append(line)
+            continue
+        keep = line.split(b":", 1)[0].strip().lower() in wanted
+        if keep:
+            out.append(line)
+    return b"\r\n".join(out) + b"\r\n\r\n"
+
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+    rbufsize = 0  # bez bufferu – select() na socketu pak nic nepřehlédne
+
+    mailbox: Mailbox = None
+    idle = True
+    drop_after = 0.0
+
+    def setup(self):
+        super().setup()
+        # odpověď jde po řádcích – bez NODELAY by každý příkaz čekal na delayed ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _send(self, data) -> None:
+        self.wfile.write(data if isinstance(data, bytes) else (data + "\r\n").encode("utf-8"))
+
+    def _expired(self) -> bool:
+        return bool(self.drop_after) and time.monotonic() - self.started > self.drop_after
+
+    def _readline(self) -> bytes | None:
+        """Řádek od klienta; None = klient odešel nebo vypršel --drop-after."""
+        while True:
+            if self._expired():
+                return None
+            ready, _, _ = select.select([self.connection], [], [], 0.2)
+            if ready:
+                line = self.rfile.readline()
+                return line or None
+
+    def _report_exists(self) -> None:
+        count = self.mailbox.count()
+        if count != self.reported:
+            self.reported = count
+            self._send(f"* {count} EXISTS")
+
+    def handle(self):
+        self.started = time.monotonic()
+        self.reported = 0
+        caps = "IMAP4rev1 IDLE" if self.idle else "IMAP4rev1"
+        self._send(f"* OK [CAPABILITY {caps}] imap stand-in ready")
+        while True:
+            raw = self._readline()
+            if raw is None:
+                return  # shozené spojení bez BYE
+            tag, _, rest = raw.decode("utf-8", "replace").strip().partition(" ")
+            cmd, _, args = rest.partition(" ")
+            cmd = cmd.upper()
+            if cmd == "UID":
+                sub, _, args = args.partition(" ")
+                cmd = "UID " + sub.upper()
+
+            if cmd == "CAPABILITY":
+                self._send(f"* CAPABILITY {caps}")
+            elif cmd in ("LOGIN", "CLOSE"):
+                pass
+            elif cmd in ("SELECT", "EXAMINE"):
+                if args.strip('"').upper() != "INBOX":
+                    self._send(f"{tag} NO no such mailbox")
+                    continue
+                self.reported = self.mailbox.count()
+                self._send(f"* {self.reported} EXISTS")
+                self._send("* 0 RECENT")
+                self._send(f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UIDs valid")
+                self._send(f"* OK [UIDNEXT {self.mailbox.uidnext}] next UID")
+                self._send("* FLAGS (\\Seen)")
+                self._send(f"{tag} OK [READ-WRITE] {cmd} completed")
+                continue
+            elif cmd == "NOOP":
+                self._report_exists()
+            elif cmd == "IDLE" and self.idle:
+                self._send("+ idling")
+                while True:
+                    self._report_exists()
+                    if self._expired():
+                        return
+                    ready, _, _ = select.select([self.connection], [], [], 0.2)
+                    if ready:
+                        line = self.rfile.readline()
+                        if not line:
+                            return
+                        if line.strip().upper() == b"DONE":
+                            break
+            elif cmd == "UID SEARCH":
+                unseen = "UNSEEN" in args.upper()
+                with self.mailbox.lock:
+                    uids = [uid for uid, flags, _ in self.mailbox.messages if not (unseen and "\\Seen" in flags)]
+                self._send("* SEARCH" + "".join(f" {u}" for u in uids))
+            elif cmd == "UID FETCH":
+                spec, _, items = args.partition(" ")
+                if not _SEQ_RE.match(spec):
+                    self._send(f"{tag} BAD invalid sequence set")
+                    continue
+                self._fetch(spec, items.upper())
+            elif cmd == "UID STORE":
+                spec, _, rest = args.partition(" ")
+                op, _, _flags = rest.partition(" ")
+                for _seq, _uid, flags, _raw in self.mailbox.resolve(spec):
+                    if op.upper().startswith("+"):
+                        flags.add("\\Seen")
+                    elif op.upper().startswith("-"):
+                        flags.discard("\\Seen")
+            elif cmd == "LOGOUT":
+                self._send("* BYE stand-in closing")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            else:
+                self._send(f"{tag} BAD unsupported command")
+                continue
+            self._send(f"{tag} OK {cmd} completed")
+
+    def _fetch(self, spec: str, items: str) -> None:
+        fields = _FIELDS_RE.search(items)
+        whole = "BODY.PEEK[]" in items or "BODY[]" in items or "RFC822" in items
+        for seq, uid, flags, raw in self.mailbox.resolve(spec):
+            parts = [f"UID {uid}"]
+            if "FLAGS" in items and not fields:
+                parts.append(f"FLAGS ({' '.join(sorted(flags))})")
+            head = f"* {seq} FETCH ({' '.join(parts)}"
+            if fields:
+                data = _header_fields(raw, fields.group(1).split())
+                self._send(f"{head} BODY[HEADER.FIELDS ({fields.group(1)})] {{{len(data)}}}\r\n".encode() + data + b")\r\n")
+            elif whole:
+                if "PEEK" not in items:
+                    flags.add("\\Seen")
+                self._send(f"{head} BODY[] {{{len(raw)}}}\r\n".encode() + raw + b")\r\n")
+            else:
+                self._send(head + ")")
+
+
+def start_server(port: int, mailbox: Mailbox, idle: bool = True, drop_after: float = 0.0):
+    IMAPHandler.mailbox = mailbox
+    IMAPHandler.idle = idle
+    IMAPHandler.drop_after = drop_after
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), IMAPHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---- příkazy ----------------------------------------------------------------
+
+def cmd_serve(args) -> None:
+    mailbox = Mailbox(args.uidvalidity)
+    server = start_server(args.port, mailbox, idle=not args.no_idle, drop_after=args.drop_after)
+    stop = threading.Event()
+    os.makedirs(args.dir, exist_ok=True)
+    print(f"IMAP stand-in na 127.0.0.1:{server.server_address[1]}, notifikace z {args.dir} (Ctrl+C ukončí)")
+    try:
+        watch_dir(mailbox, args.dir, stop)
+    except KeyboardInterrupt:
+        stop.set()
+        server.shutdown()
+
+
+def cmd_send(args) -> None:
+    path = drop_message(args.dir, bank_notification(args.vs, args.amount))
+    print(f"✅ {path}")
+
+
+def cmd_demo(args) -> None:
+    from decimal import Decimal
+
+    from _bench_common import make_app
+
+    app = make_app()
+    from sqlalchemy import insert, select
+
+    from backend.extensions import db
+    from backend.models import Order, Payment
+    from backend.services import order_counts
+    from backend.services.imap_worker import ImapWorker
+
+    n = args.orders
+    with app.app_context():
+        db.session.execute(insert(Order), [
+            {"vs": f"26{i:08d}", "customer_name": "Zákazník", "customer_email": "z@example.cz",
+             "customer_address": "Praha", "status": "awaiting_payment", "total_czk": Decimal(100 + i)}
+            for i in range(n)
+        ])
+        db.session.execute(insert(Payment), [
+            {"vs": f"26{i:08d}", "amount_czk": Decimal(100 + i), "status": "pending"} for i in range(n)
+        ])
+        db.session.commit()
+        order_counts.recount()
+
+    mailbox = Mailbox(uidvalidity=1)
+    mailbox.append(bank_notification("1", "1,00", sender="spam@example.com"))  # cizí pošta
+    server = start_server(0, mailbox, idle=not args.no_idle, drop_after=args.drop_after)
+    settings = {
+        "host": "127.0.0.1", "port": server.server_address[1], "ssl": False,
+        "user": "test", "password": "test", "folder": "INBOX",
+    }
+    stop = threading.Event()
+    lines: list[str] = []
+    worker = ImapWorker(settings, poll_seconds=args.poll_seconds, log=lines.append, stop=stop)
+
+    def run_worker():
+        with app.app_context():
+            worker.run()
+
+    thread = threading.Thread(target=run_worker, name="imap-worker", daemon=True)
+    thread.start()
+    time.sleep(0.5)  # připojení + úvodní průchod
+
+    latencies = []
+    with app.app_context():
+        for i in range(n):
+            vs = f"26{i:08d}"
+            mailbox.append(bank_notification(vs, f"{100 + i},00"))
+            started = time.perf_counter()
+            while True:
+                status = db.session.execute(select(Order.status).where(Order.vs == vs)).scalar()
+                db.session.rollback()
+                if status == "paid":
+                    latencies.append(time.perf_counter() - started)
+                    break
+                if time.perf_counter() - started > args.timeout:
+                    print(f"❌ VS {vs}: nezaplaceno do {args.timeout}s")
+                    break
+                time.sleep(0.01)
+            time.sleep(args.interval)
+
+    stop.set()
+    thread.join(timeout=5)
+    server.shutdown()
+
+    for line in lines:
+        print("  " + line)
+    if latencies:
+        ms = sorted(x * 1000 for x in latencies)
+        print(f"{'IDLE' if not args.no_idle else 'NOOP polling'}: zaplaceno {len(ms)}/{n}, "
+              f"zpoždění p50 {statistics.median(ms):.0f} ms, max {ms[-1]:.0f} ms")
+    print("✅ vše spárováno" if len(latencies) == n else "❌ něco se nespárovalo")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve")
+    serve.add_argument("--port", type=int, default=1143)
+    serve.add_argument("--dir", default=DEFAULT_DIR)
+    serve.add_argument("--uidvalidity", type=int, default=1)
+    serve.add_argument("--drop-after", type=float, default=0.0)
+    serve.add_argument("--no-idle", action="store_true")
+    serve.set_defaults(func=cmd_serve)
+
+    send = sub.add_parser("send")
+    send.add_argument("--vs", required=True)
+    send.add_argument("--amount", required=True, help='např. "1 290,00"')
+    send.add_argument("--dir", default=DEFAULT_DIR)
+    send.set_defaults(func=cmd_send)
+
+    demo = sub.add_parser("demo")
+    demo.add_argument("--orders", type=int, default=20)
+    demo.add_argument("--interval", type=float, default=0.1, help="Pauza mezi notifikacemi (s)")
+    demo.add_argument("--drop-after", type=float, default=0.0)
+    demo.add_argument("--no-idle", action="store_true")
+    demo.add_argument("--poll-seconds", type=float, default=2.0)
+    demo.add_argument("--timeout", type=float, default=30.0)
+    demo.set_defaults(func=cmd_demo)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# backend/services/bank_messages.py
+"""
+Index zpracovaných bankovních notifikací (tabulka bank_message).
+
+- `known(keys)` / `known_hashes(hashes)` – jeden IN dotaz na dávku; IMAP sync
+  jimi přeskočí už zpracované zprávy před stažením těla (Message-ID) a stejnou
+  notifikaci pod jiným Message-ID před párováním (hash těla);
+- `stage(...)` zařadí záznam do session.info volajícího; `record(items)` volá
+  match_confirmations těsně před commitem a čekajícím záznamům (podle VS,
+  v pořadí dávky) doplní outcome, order_id a payment_id;
+- při commitu se všechny zařazené záznamy vloží jedním INSERT executemany
+  (before_commit) – ve stejné transakci jako spárované platby, takže pád
+  před commitem = zpráva se zpracuje znovu. Přes ORM by šel INSERT po řádku.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from backend.extensions import db
+from backend.models import BankMessage
+
+PENDING = "pending"
+PAID = "paid"
+ALREADY_PAID = "already_paid"
+ORDER_NOT_FOUND = "order_not_found"
+UNPARSED = "unparsed"
+DUPLICATE = "duplicate"
+
+IN_CHUNK = 5000
+_SESSION_KEY = "bank_messages_pending"
+
+
+def body_hash(raw: bytes) -> str:
+    """sha256 těla zprávy – bez hlaviček (Received, Delivered-To… se liší u každého doručení)."""
+    parts = raw.replace(b"\r\n", b"\n").split(b"\n\n", 1)
+    return hashlib.sha256(parts[-1]).hexdigest()
+
+
+def message_key(message_id: str | None, digest: str | None = None) -> str | None:
+    """Klíč záznamu: Message-ID, bez něj `body:<hash>` (dokud hash neznáme, None)."""
+    mid = (message_id or "").strip()
+    if not mid:
+        return f"body:{digest}" if digest else None
+    if len(mid) > 255:
+        return "sha256:" + hashlib.sha256(mid.encode("utf-8", "replace")).hexdigest()
+    return mid
+
+
+def _chunks(values: list, size: int = IN_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def known(keys: Iterable[str]) -> dict[str, str]:
+    """{klíč: outcome} pro už uložené zprávy."""
+    keys = sorted({k for k in keys if k})
+    out: dict[str, str] = {}
+    for chunk in _chunks(keys):
+        out.update(db.session.execute(
+            select(BankMessage.message_id, BankMessage.outcome).where(BankMessage.message_id.in_(chunk))
+        ).all())
+    return out
+
+
+def known_hashes(hashes: Iterable[str]) -> set[str]:
+    hashes = sorted(set(hashes))
+    out: set[str] = set()
+    for chunk in _chunks(hashes):
+        out.update(db.session.execute(
+            select(BankMessage.body_hash).where(BankMessage.body_hash.in_(chunk))
+        ).scalars())
+    return out
+
+
+def stage(
+    key: str,
+    digest: str,
+    *,
+    source: str = "imap",
+    imap_uid: int | None = None,
+    vs: str | None = None,
+    amount=None,
+    outcome: str = PENDING,
+) -> None:
+    """Zařadí záznam k zápisu při commitu session; PENDING s VS čeká na `record`."""
+    row = {
+        "message_id": key, "body_hash": digest, "source": source, "imap_uid": imap_uid,
+        "vs": str(vs) if vs else None, "amount_czk": amount, "outcome": outcome,
+        "order_id": None, "payment_id": None, "processed_at": datetime.utcnow(),
+    }
+    pending = db.session.info.setdefault(_SESSION_KEY, {"rows": [], "by_vs": {}})
+    pending["rows"].append(row)
+    if outcome == PENDING and vs:
+        pending["by_vs"].setdefault(str(vs), []).append(row)
+
+
+def outcome_of(item: dict) -> str:
+    """Výsledek položky match_confirmations jako outcome záznamu."""
+    if item.get("reason"):
+        return item["reason"]
+    if item["payment_updated"] or item["order_updated"]:
+        return PAID
+    if item["order_id"] or item["payment_id"]:
+        return ALREADY_PAID
+    return ORDER_NOT_FOUND
+
+
+def record(items: list[dict]) -> None:
+    """Doplní výsledky párování čekajícím záznamům (před commitem)."""
+    pending = db.session.info.get(_SESSION_KEY)
+    if not pending:
+        return
+    by_vs = pending["by_vs"]
+    for item in items:
+        queue = by_vs.get(item["vs"])
+        if queue:
+            row = queue.pop(0)
+            row["outcome"] = outcome_of(item)
+            row["order_id"] = item["order_id"]
+            row["payment_id"] = item["payment_id"]
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # commit bez párování → záznamy se uloží jako "pending"
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending and pending["rows"]:
+        session.connection().execute(insert(BankMessage), pending["rows"])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_KEY, None)
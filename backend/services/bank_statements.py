@@ -0,0 +1,336 @@
+# backend/services/bank_statements.py
+"""
+Import bankovních výpisů pro hromadné párování plateb (nezávisle na HTML
+notifikací ČSOB).
+
+Formáty:
+- GPC/ABO (pevná šířka, .gpc/.abo): obratové řádky `075`, příjem = kód
+  účtování "2"; ostatní věty (074 hlavička, 076–079 doplňky) se přeskočí;
+- ČSOB CSV (export pohybů): oddělovač ';' nebo ',', kódování cp1250 nebo
+  UTF-8 (rozhoduje se po řádcích), hlavička se hledá v prvních
+  CSV_HEADER_SCAN řádcích (před ní bývá popis účtu).
+
+Soubor se čte po řádcích, příjmy s VS jdou po `batch_size` do
+match_confirmations (2 IN dotazy + jeden commit na dávku); objednávky, které
+dávka přepnula na paid, pak projdou stejným krokem po commitu jako párování
+z IMAP (`notify_matched`: FA zákazníkovi, Telegram). Každá transakce
+se zapíše do bank_message s klíčem `stmt:<ID transakce>` – opakovaný import
+stejného (nebo překrývajícího se) výpisu už zpracované transakce přeskočí.
+Chybné řádky se jen nahlásí (nejvýš MAX_ERRORS); díky klíčům je bezpečné
+opravený soubor nahrát znovu.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable, Iterator
+
+from backend.api.utils.csob_mail_sync import notify_matched
+from backend.services import bank_messages
+from backend.services.payment_matching import match_confirmations
+
+FORMATS = ("gpc", "csv")
+CSV_HEADER_SCAN = 50
+MAX_ERRORS = 200
+MAX_UNMATCHED = 200
+
+# GPC 075 – kódy účtování
+GPC_CREDIT = b"2"
+
+# aliasy sloupců ČSOB CSV (po odstranění diakritiky, malými písmeny)
+CSV_COLUMNS = {
+    "vs": ("variabilni symbol", "vs"),
+    "amount": ("castka", "objem", "castka v mene uctu"),
+    "txid": ("id transakce", "identifikace transakce", "id pohybu", "cislo transakce"),
+    "counter": ("cislo uctu protiuctu", "protiucet", "cislo protiuctu"),
+    "currency": ("mena",),
+}
+
+
+class StatementImportError(ValueError):
+    """Soubor nejde zpracovat jako výpis (neznámý formát, chybí hlavička)."""
+
+
+@dataclass
+class Transaction:
+    line: int
+    txid: str | None
+    vs: str | None
+    amount: Decimal          # v Kč, příjem kladně
+    credit: bool
+    counter_account: str | None
+    digest: str              # sha256 řádku (bank_message.body_hash)
+
+    @property
+    def key(self) -> str:
+        return f"stmt:{self.txid}" if self.txid else f"stmt:line:{self.digest}"
+
+
+def detect_format(filename: str | None, default: str | None = None) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".gpc", ".abo")):
+        return "gpc"
+    if name.endswith(".csv"):
+        return "csv"
+    if default in FORMATS:
+        return default
+    raise StatementImportError(f"Neznámý formát výpisu: {filename!r} (podporováno: .gpc/.abo, .csv)")
+
+
+def _digits(value: str | None) -> str | None:
+    """Symbol bez mezer a úvodních nul; None, pokud nejde o číslo."""
+    value = (value or "").strip().replace(" ", "")
+    if not value.isdigit():
+        return None
+    return value.lstrip("0") or None
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _error(errors: list[dict], line: int, message: str) -> None:
+    if len(errors) < MAX_ERRORS:
+        errors.append({"line": line, "error": message})
+
+
+# ========================= GPC / ABO =========================
+
+def iter_gpc(stream, errors: list[dict]) -> Iterator[Transaction]:
+    """
+    Věty 075 (obratová položka), pozice podle specifikace GPC (1 = první znak):
+      4–19 číslo účtu, 20–35 protiúčet, 36–48 ID transakce (číslo dokladu),
+      49–60 částka v haléřích, 61 kód účtování, 62–71 VS, 74–77 kód banky.
+    Čte se po bajtech – jméno protistrany (cp1250) na pozicích neovlivní.
+    """
+    for no, raw in enumerate(stream, 1):
+        raw = raw.rstrip(b"\r\n")
+        if no == 1:
+            raw = raw.removeprefix(b"\xef\xbb\xbf")
+        if not raw.startswith(b"075"):
+            continue
+        if len(raw) < 71:
+            _error(errors, no, f"krátká věta 075 ({len(raw)} znaků)")
+            continue
+        amount_raw = raw[48:60].decode("ascii", "replace").strip()
+        if not amount_raw.isdigit():
+            _error(errors, no, f"neplatná částka {amount_raw!r}")
+            continue
+        counter = _digits(raw[19:35].decode("ascii", "replace"))
+        bank = raw[73:77].decode("ascii", "replace").strip() if len(raw) >= 77 else ""
+        yield Transaction(
+            line=no,
+            txid=_digits(raw[35:48].decode("ascii", "replace")),
+            vs=_digits(raw[61:71].decode("ascii", "replace")),
+            amount=Decimal(int(amount_raw)) / 100,
+            credit=raw[60:61] == GPC_CREDIT,
+            counter_account=f"{counter}/{bank}" if counter and bank.isdigit() else counter,
+            digest=_digest(raw),
+        )
+
+
+# ========================= ČSOB CSV =========================
+
+def _norm_header(value: str) -> str:
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(value.strip().strip('"').lower().split())
+
+
+def _decode(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1250", errors="replace")
+
+
+def _parse_amount(value: str) -> Decimal | None:
+    """"+1 290,00", "1.290,00", "-50.5", "1290 CZK" → Decimal."""
+    value = (value or "").replace("\xa0", "").replace(" ", "").upper()
+    value = value.removesuffix("CZK").removesuffix("KČ").removesuffix("KC")
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def _column_map(cells: list[str]) -> dict[str, int] | None:
+    names = [_norm_header(c) for c in cells]
+    found = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for i, name in enumerate(names):
+            if name in aliases:
+                found[key] = i
+                break
+    return found if "vs" in found and "amount" in found else None
+
+
+def iter_csob_csv(stream, errors: list[dict]) -> Iterator[Transaction]:
+    """ČSOB CSV po řádcích: nejdřív hlavička (sloupce podle CSV_COLUMNS), pak transakce."""
+    lines = iter(stream)
+    offset = 0
+    columns = delimiter = None
+    for raw in lines:
+        offset += 1
+        if offset == 1:
+            raw = raw.removeprefix(b"\xef\xbb\xbf")
+        text = _decode(raw)
+        delimiter = ";" if text.count(";") >= text.count(",") else ","
+        columns = _column_map(next(csv.reader([text], delimiter=delimiter), []))
+        if columns or offset >= CSV_HEADER_SCAN:
+            break
+    if not columns:
+        raise StatementImportError(
+            "V CSV chybí hlavička se sloupci 'Variabilní symbol' a 'Částka' "
+            f"(hledáno v prvních {CSV_HEADER_SCAN} řádcích)."
+        )
+
+    raw_lines: list[bytes] = []
+
+    def text_lines():
+        for raw in lines:
+            raw_lines.append(raw)
+            yield _decode(raw)
+
+    reader = csv.reader(text_lines(), delimiter=delimiter)
+    width = max(columns.values()) + 1
+    for cells in reader:
+        no = offset + reader.line_num
+        raw = b"".join(raw_lines)
+        raw_lines.clear()
+        if not any(c.strip() for c in cells):
+            continue
+        if len(cells) < width:
+            _error(errors, no, f"málo sloupců ({len(cells)})")
+            continue
+        currency = cells[columns["currency"]].strip().upper() if "currency" in columns else ""
+        if currency and currency != "CZK":
+            continue  # cizoměnové pohyby s objednávkami v Kč nepárujeme
+        amount = _parse_amount(cells[columns["amount"]])
+        if amount is None:
+            _error(errors, no, f"neplatná částka {cells[columns['amount']]!r}")
+            continue
+        yield Transaction(
+            line=no,
+            txid=(cells[columns["txid"]].strip() or None) if "txid" in columns else None,
+            vs=_digits(cells[columns["vs"]]),
+            amount=abs(amount),
+            credit=amount > 0,
+            counter_account=(cells[columns["counter"]].strip() or None) if "counter" in columns else None,
+            digest=_digest(raw.rstrip(b"\r\n")),
+        )
+
+
+def iter_transactions(stream, fmt: str, errors: list[dict]) -> Iterator[Transaction]:
+    if fmt == "gpc":
+        return iter_gpc(stream, errors)
+    if fmt == "csv":
+        return iter_csob_csv(stream, errors)
+    raise StatementImportError(f"Neznámý formát výpisu: {fmt!r}")
+
+
+# ========================= Import =========================
+
+def _unique_keys(batch: list[Transaction], seen: Counter) -> list[Transaction]:
+    """Transakce bez ID se stejným řádkem (dvě stejné platby) odliší pořadím v souboru."""
+    out = []
+    for tx in batch:
+        seen[tx.key] += 1
+        if seen[tx.key] > 1:
+            if tx.txid:
+                continue  # stejné ID transakce v souboru dvakrát
+            tx.digest = _digest(f"{tx.digest}#{seen[tx.key]}".encode())
+        out.append(tx)
+    return out
+
+
+def import_statement(
+    stream: Iterable[bytes],
+    fmt: str,
+    *,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+    require_amount_match: bool = True,
+    shipping_fee: Decimal = Decimal("0"),
+    item_totals: Callable[[list[int]], dict] | None = None,
+) -> dict:
+    """
+    Načte výpis (binární stream, po řádcích) a spáruje příchozí platby s VS.
+    `require_amount_match` a další parametry viz match_confirmations.
+    S `dry_run` jen parsuje a zjistí, co už bylo importováno – nic nezapíše.
+    """
+    started = time.perf_counter()
+    errors: list[dict] = []
+    stats = Counter()
+    outcomes = Counter()
+    unmatched: list[dict] = []
+    seen_keys: Counter = Counter()
+    batch: list[Transaction] = []
+
+    def flush() -> None:
+        txs = _unique_keys(batch, seen_keys)
+        stats["duplicates_in_file"] += len(batch) - len(txs)
+        batch.clear()
+        done = bank_messages.known(tx.key for tx in txs)
+        fresh = [tx for tx in txs if tx.key not in done]
+        stats["already_imported"] += len(txs) - len(fresh)
+        if dry_run or not fresh:
+            stats["to_import"] += len(fresh)
+            return
+        for tx in fresh:
+            bank_messages.stage(tx.key, tx.digest, source="statement", vs=tx.vs, amount=tx.amount)
+        report = match_confirmations(
+            [(tx.vs, tx.amount) for tx in fresh],
+            require_amount_match=require_amount_match,
+            shipping_fee=shipping_fee,
+            item_totals=item_totals,
+        )
+        stats["imported"] += len(fresh)
+        # po commitu dávky: FA + Telegram pro nově zaplacené objednávky
+        paid_items = [item for item in report["items"] if item["order_updated"]]
+        if paid_items:
+            stats["emailed_invoices"] += notify_matched(paid_items)["emailed_invoices"]
+        for tx, item in zip(fresh, report["items"]):
+            outcome = bank_messages.outcome_of(item)
+            outcomes[outcome] += 1
+            if outcome not in (bank_messages.PAID, bank_messages.ALREADY_PAID) and len(unmatched) < MAX_UNMATCHED:
+                unmatched.append({"line": tx.line, "vs": tx.vs, "amount": float(tx.amount), "reason": outcome})
+
+    for tx in iter_transactions(stream, fmt, errors):
+        stats["transactions"] += 1
+        if not tx.credit:
+            continue
+        stats["credits"] += 1
+        if not tx.vs:
+            stats["credits_without_vs"] += 1
+            continue
+        batch.append(tx)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "format": fmt,
+        "dry_run": dry_run,
+        "transactions": stats["transactions"],
+        "credits": stats["credits"],
+        "credits_without_vs": stats["credits_without_vs"],
+        "duplicates_in_file": stats["duplicates_in_file"],
+        "already_imported": stats["already_imported"],
+        "imported": stats["imported"] if not dry_run else 0,
+        "to_import": stats["to_import"] if dry_run else 0,
+        "outcomes": dict(outcomes),
+        "emailed_invoices": stats["emailed_invoices"],
+        "unmatched": unmatched,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+    }
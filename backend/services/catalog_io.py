@@ -0,0 +1,352 @@
+# backend/services/catalog_io.py
+"""
+Hromadný import/export katalogu (produkty + varianty + sklad) v CSV a XLSX.
+
+Formát (hlavička je povinná, pořadí sloupců libovolné):
+  product_id, variant_id, name, variant_name, category_id, price_czk, stock, wrist_size, description
+
+Řádek bez variant_id a variant_name je produkt (bez product_id = nový produkt),
+řádek s variant_id je úprava varianty, řádek s product_id + variant_name (bez variant_id)
+je nová varianta. Zapisují se jen sloupce, které v souboru jsou – pro přecenění stačí
+`product_id,price_czk`.
+
+Import běží ve dvou průchodech: nejdřív validace celého souboru, pak dávkové
+(executemany) UPDATE/INSERT po `chunk_size` řádcích v jedné transakci.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert, update
+
+from backend.extensions import db
+from backend.models import Category, Product, ProductVariant
+from backend.services import pricing
+
+COLUMNS = [
+    "product_id", "variant_id", "name", "variant_name", "category_id",
+    "price_czk", "stock", "wrist_size", "description",
+]
+PRODUCT_FIELDS = ("name", "category_id", "price_czk", "stock", "wrist_size", "description")
+VARIANT_FIELDS = ("variant_name", "price_czk", "stock", "wrist_size", "description")
+
+# SQLite má limit na počet bind parametrů → IN dotazy dělíme
+_IN_CHUNK = 500
+
+
+class CatalogImportError(ValueError):
+    """Soubor neprošel validací – `errors` obsahuje seznam {row, error}."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f"{len(errors)} chybných řádků")
+        self.errors = errors
+
+
+@dataclass
+class ImportPlan:
+    rows: int = 0
+    product_updates: list[dict] = field(default_factory=list)
+    product_inserts: list[dict] = field(default_factory=list)
+    variant_updates: list[dict] = field(default_factory=list)
+    variant_inserts: list[dict] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+
+
+# ========================= Čtení souborů (streamovaně) =========================
+
+def _norm_header(h) -> str:
+    return str(h or "").strip().lower().replace(" ", "_")
+
+
+def iter_csv_rows(stream) -> Iterator[dict]:
+    """CSV po řádcích (UTF-8 s/bez BOM, oddělovač ',' nebo ';' podle hlavičky)."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    header_line = text.readline()
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = [_norm_header(h) for h in next(csv.reader([header_line], delimiter=delimiter))]
+    for values in csv.reader(text, delimiter=delimiter):
+        if not any((v or "").strip() for v in values):
+            continue
+        yield dict(zip(header, values))
+
+
+def iter_xlsx_rows(stream) -> Iterator[dict]:
+    """XLSX v read-only režimu openpyxl (řádky se nenačítají do paměti najednou)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_norm_header(h) for h in next(rows, ())]
+        for values in rows:
+            if not any(v not in (None, "") for v in values):
+                continue
+            yield {h: ("" if v is None else v) for h, v in zip(header, values)}
+    finally:
+        wb.close()
+
+
+def iter_rows(stream, fmt: str) -> Iterator[dict]:
+    if fmt == "xlsx":
+        return iter_xlsx_rows(stream)
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    raise ValueError(f"Nepodporovaný formát: {fmt}")
+
+
+def detect_format(filename: str | None, default: str = "csv") -> str:
+    name = (filename or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        return "xlsx"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+# ========================= Validace =========================
+
+def _to_int(raw, field_name: str, minimum: int | None = None) -> int:
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)
+    try:
+        val = int(str(raw).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"{field_name}: neplatné celé číslo '{raw}'")
+    if minimum is not None and val < minimum:
+        raise ValueError(f"{field_name}: musí být >= {minimum}")
+    return val
+
+
+def _to_price(raw) -> Decimal:
+    s = str(raw).strip().replace("\xa0", "").replace(" ", "").replace(",", ".")
+    try:
+        val = Decimal(s).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"price_czk: neplatná cena '{raw}'")
+    if val < 0:
+        raise ValueError("price_czk: nesmí být záporná")
+    return val
+
+
+def _text(raw) -> str | None:
+    s = str(raw).strip()
+    return s or None
+
+
+def _parse_fields(row: dict, allowed: tuple[str, ...]) -> dict:
+    """Převede jen sloupce přítomné v řádku; prázdná buňka = NULL (u textů)."""
+    out: dict = {}
+    for name in allowed:
+        if name not in row:
+            continue
+        raw = row[name]
+        blank = raw is None or str(raw).strip() == ""
+        if name == "price_czk":
+            if not blank:
+                out[name] = _to_price(raw)
+        elif name == "stock":
+            if not blank:
+                out[name] = _to_int(raw, "stock", minimum=0)
+        elif name == "category_id":
+            if not blank:
+                out[name] = _to_int(raw, "category_id", minimum=1)
+        else:
+            out[name] = None if blank else _text(raw)
+    return out
+
+
+def _existing_ids(column, ids: set[int]) -> set[int]:
+    found: set[int] = set()
+    ids_list = sorted(ids)
+    for i in range(0, len(ids_list), _IN_CHUNK):
+        chunk = ids_list[i:i + _IN_CHUNK]
+        found.update(r[0] for r in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def build_plan(rows: Iterable[dict]) -> ImportPlan:
+    """První průchod: parsování + validace, bez zápisu do DB."""
+    plan = ImportPlan()
+    product_refs: dict[int, list[int]] = {}
+    category_refs: dict[int, list[int]] = {}
+    variant_refs: dict[int, list[int]] = {}
+    variant_owner: dict[int, int] = {}
+
+    for rowno, row in enumerate(rows, start=2):  # řádek 1 = hlavička
+        plan.rows += 1
+        try:
+            pid = _to_int(row["product_id"], "product_id", 1) if str(row.get("product_id", "")).strip() else None
+            vid = _to_int(row["variant_id"], "variant_id", 1) if str(row.get("variant_id", "")).strip() else None
+            is_variant = vid is not None or bool(str(row.get("variant_name", "")).strip())
+
+            if is_variant:
+                values = _parse_fields(row, VARIANT_FIELDS)
+                if vid is not None:
+                    variant_refs.setdefault(vid, []).append(rowno)
+                    if pid is not None:
+                        variant_owner[vid] = pid
+                    if values:
+                        plan.variant_updates.append({"id": vid, **values})
+                else:
+                    if pid is None:
+                        raise ValueError("nová varianta potřebuje product_id")
+                    product_refs.setdefault(pid, []).append(rowno)
+                    plan.variant_inserts.append({"product_id": pid, "stock": 0, **values})
+            else:
+                values = _parse_fields(row, PRODUCT_FIELDS)
+                if "name" in values and not values["name"]:
+                    raise ValueError("name nesmí být prázdné")
+                if "category_id" in values:
+                    category_refs.setdefault(values["category_id"], []).append(rowno)
+                if pid is not None:
+                    product_refs.setdefault(pid, []).append(rowno)
+                    if values:
+                        plan.product_updates.append({"id": pid, **values})
+                else:
+                    missing = [f for f in ("name", "price_czk") if values.get(f) is None]
+                    if missing:
+                        raise ValueError(f"nový produkt potřebuje {', '.join(missing)}")
+                    plan.product_inserts.append({"stock": 1, **values})
+        except ValueError as exc:
+            plan.errors.append({"row": rowno, "error": str(exc)})
+
+    # existence odkazovaných záznamů – jeden IN dotaz (po dávkách) na tabulku
+    for ids, column, label in (
+        (product_refs, Product.id, "product_id"),
+        (category_refs, Category.id, "category_id"),
+        (variant_refs, ProductVariant.id, "variant_id"),
+    ):
+        if not ids:
+            continue
+        missing = set(ids) - _existing_ids(column, set(ids))
+        for ref in sorted(missing):
+            for rowno in ids[ref]:
+                plan.errors.append({"row": rowno, "error": f"{label} {ref} neexistuje"})
+
+    if variant_owner:
+        owners: dict[int, int] = {}
+        vids = sorted(variant_owner)
+        for i in range(0, len(vids), _IN_CHUNK):
+            owners.update(
+                db.session.query(ProductVariant.id, ProductVariant.product_id)
+                .filter(ProductVariant.id.in_(vids[i:i + _IN_CHUNK]))
+                .all()
+            )
+        for vid, pid in variant_owner.items():
+            if vid in owners and owners[vid] != pid:
+                for rowno in variant_refs[vid]:
+                    plan.errors.append({"row": rowno, "error": f"varianta {vid} nepatří k produktu {pid}"})
+
+    plan.errors.sort(key=lambda e: e["row"])
+    return plan
+
+
+# ========================= Zápis =========================
+
+def _chunks(items: list[dict], size: int) -> Iterator[list[dict]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def apply_plan(plan: ImportPlan, chunk_size: int = 1000) -> dict:
+    """Druhý průchod: dávkové UPDATE/INSERT (executemany) v jedné transakci."""
+    now = datetime.utcnow()
+    try:
+        for chunk in _chunks(plan.product_updates, chunk_size):
+            db.session.execute(update(Product), [{**r, "updated_at": now} for r in chunk])
+        for chunk in _chunks(plan.product_inserts, chunk_size):
+            db.session.execute(insert(Product), [{**r, "created_at": now, "updated_at": now} for r in chunk])
+        for chunk in _chunks(plan.variant_updates, chunk_size):
+            db.session.execute(update(ProductVariant), chunk)
+        for chunk in _chunks(plan.variant_inserts, chunk_size):
+            db.session.execute(insert(ProductVariant), chunk)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    # Core UPDATE/INSERT obchází mapper eventy → cenovou mapu zahodit ručně
+    pricing.invalidate()
+
+    return {
+        "products_updated": len(plan.product_updates),
+        "products_created": len(plan.product_inserts),
+        "variants_updated": len(plan.variant_updates),
+        "variants_created": len(plan.variant_inserts),
+    }
+
+
+def import_catalog(stream, fmt: str, *, dry_run: bool = False, chunk_size: int = 1000) -> dict:
+    """Validace + zápis. Při chybách vyhodí CatalogImportError a nic nezapíše."""
+    started = time.perf_counter()
+    plan = build_plan(iter_rows(stream, fmt))
+    if plan.errors:
+        raise CatalogImportError(plan.errors)
+
+    result = {"rows": plan.rows, "dry_run": dry_run}
+    if not dry_run:
+        result.update(apply_plan(plan, chunk_size=chunk_size))
+    elapsed = time.perf_counter() - started
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_sec"] = round(plan.rows / elapsed, 1) if elapsed > 0 else None
+    return result
+
+
+# ========================= Export =========================
+
+def _fmt_price(v) -> str:
+    return f"{Decimal(str(v)):.2f}" if v is not None else ""
+
+
+def iter_export_rows(batch_size: int = 500) -> Iterator[list]:
+    """Produkty a pod nimi jejich varianty, streamovaně po dávkách (keyset podle id)."""
+    from sqlalchemy.orm import selectinload
+
+    yield list(COLUMNS)
+    last_id = 0
+    while True:
+        batch = (
+            Product.query.options(selectinload(Product.variants))
+            .filter(Product.id > last_id)
+            .order_by(Product.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for p in batch:
+            yield [p.id, "", p.name, "", p.category_id or "", _fmt_price(p.price_czk), p.stock,
+                   p.wrist_size or "", p.description or ""]
+            for v in sorted(p.variants or [], key=lambda x: x.id):
+                yield [p.id, v.id, "", v.variant_name or "", "", _fmt_price(v.price_czk), v.stock,
+                       v.wrist_size or "", v.description or ""]
+        last_id = batch[-1].id
+        db.session.expunge_all()
+
+
+def iter_export_csv() -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in iter_export_rows():
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+
+
+def export_xlsx(fileobj) -> None:
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Katalog")
+    for row in iter_export_rows():
+        ws.append(row)
+    wb.save(fileobj)
@@ -0,0 +1,165 @@
+# backend/services/idempotency.py
+"""
+Podpora hlavičky `Idempotency-Key` pro endpointy, které vytváří objednávku.
+
+1. Před zpracováním se commitne zástupný řádek (key, endpoint, hash těla).
+   Unikátní index zajistí, že souběžný retry se stejným klíčem neprojde.
+2. Po zpracování se k řádku uloží odpověď; opakovaný požadavek ji dostane
+   zpět (hlavička `Idempotent-Replayed: true`) bez zásahu do skladu, e-mailů i VS.
+3. Stejný klíč s jiným tělem → 422, klíč ještě ve zpracování → 409.
+Odpovědi 5xx (a výjimky) se neukládají – klient může požadavek zopakovat.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from backend.extensions import db
+from backend.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# zástupný řádek starší než tohle = požadavek spadl, klíč se smí použít znovu
+PROCESSING_TIMEOUT = timedelta(seconds=60)
+
+
+def _ttl() -> timedelta:
+    try:
+        return timedelta(hours=int(current_app.config.get("IDEMPOTENCY_TTL_HOURS", 24)))
+    except (TypeError, ValueError):
+        return timedelta(hours=24)
+
+
+def request_hash() -> str:
+    """sha256 těla; JSON se normalizuje (pořadí klíčů), aby retry se stejnými daty sedělo."""
+    raw = request.get_data(cache=True) or b""
+    try:
+        raw = json.dumps(json.loads(raw), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass
+    return hashlib.sha256(request.method.encode() + b" " + request.path.encode() + b"\n" + raw).hexdigest()
+
+
+def _claim(key: str, endpoint: str, req_hash: str):
+    """Vloží zástupný řádek; vrací (id, None), nebo (None, existující řádek)."""
+    now = datetime.utcnow()
+    for _ in range(2):
+        row = IdempotencyKey(
+            key=key, endpoint=endpoint, request_hash=req_hash,
+            status="processing", created_at=now, expires_at=now + _ttl(),
+        )
+        db.session.add(row)
+        try:
+            db.session.commit()
+            return row.id, None
+        except IntegrityError:
+            db.session.rollback()
+
+        existing = IdempotencyKey.query.filter_by(key=key, endpoint=endpoint).first()
+        if existing is None:
+            continue  # mezitím ho smazal sweeper
+        stale = existing.expires_at < now or (
+            existing.status == "processing" and existing.created_at < now - PROCESSING_TIMEOUT
+        )
+        if not stale:
+            return None, existing
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == existing.id))
+        db.session.commit()
+    return None, None
+
+
+def _finish(row_id: int, response) -> None:
+    if response.status_code >= 500:
+        _release(row_id)
+        return
+    row = db.session.get(IdempotencyKey, row_id)
+    if row is None:
+        return
+    row.status = "completed"
+    row.response_status = response.status_code
+    row.response_body = response.get_data(as_text=True)
+    row.response_mimetype = response.mimetype
+    db.session.commit()
+
+
+def _release(row_id: int) -> None:
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == row_id))
+    db.session.commit()
+
+
+def _replay(row: IdempotencyKey):
+    resp = make_response(row.response_body or "", row.response_status or 200)
+    resp.mimetype = row.response_mimetype or "application/json"
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def idempotent(endpoint: str):
+    """Dekorátor view funkce; bez hlavičky Idempotency-Key se chová jako dřív."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.headers.get(HEADER) or "").strip()
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"ok": False, "error": f"{HEADER} je delší než {MAX_KEY_LENGTH} znaků."}), 400
+
+            req_hash = request_hash()
+            row_id, existing = _claim(key, endpoint, req_hash)
+            if row_id is None:
+                if existing is None:
+                    return jsonify({"ok": False, "error": "Požadavek se zpracovává, zkuste to znovu."}), 409
+                if existing.request_hash != req_hash:
+                    return jsonify({
+                        "ok": False,
+                        "error": f"{HEADER} už byl použit pro jiný požadavek.",
+                    }), 422
+                if existing.status != "completed":
+                    resp = jsonify({"ok": False, "error": "Požadavek se stejným klíčem se právě zpracovává."})
+                    resp.status_code = 409
+                    resp.headers["Retry-After"] = "2"
+                    return resp
+                return _replay(existing)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                _release(row_id)
+                raise
+            try:
+                _finish(row_id, response)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("Uložení idempotentní odpovědi selhalo (%s)", key)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def sweep_expired(batch_size: int = 1000, now: datetime | None = None) -> int:
+    """Smaže prošlé klíče po dávkách (každá dávka = jedna transakce). Vrací počet smazaných."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        ids = [
+            i for (i,) in
+            db.session.query(IdempotencyKey.id)
+            .filter(IdempotencyKey.expires_at < now)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return total
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
@@ -0,0 +1,111 @@
+# backend/services/images.py
+"""
+Normalizace obrázků a jejich metadata (rozměry, velikost, dominantní barva, LQIP).
+
+Funkce zde nepotřebují Flask kontext, takže je lze volat i z worker procesů
+(ProcessPoolExecutor v CLI příkazech).
+"""
+from __future__ import annotations
+
+import base64
+import io
+import os
+import uuid
+
+# --- Volitelné závislosti pro robustní práci s obrázky ---
+try:
+    from PIL import Image, ImageOps
+    PIL_OK = True
+except Exception:
+    PIL_OK = False
+
+# HEIC (iPhone) podpora je volitelná – pokud je nainstalováno pillow-heif, zaregistrujeme dekodér
+if PIL_OK:
+    try:
+        import pillow_heif  # type: ignore
+        pillow_heif.register_heif_opener()
+    except Exception:
+        pass
+
+MAX_SIDE = 1600
+WEBP_QUALITY = 85
+LQIP_SIDE = 16
+LQIP_QUALITY = 30
+
+
+def safe_uuid_name(ext: str = ".webp") -> str:
+    """Vytvoří bezpečný název souboru `uuid.ext`."""
+    return f"{uuid.uuid4().hex}{ext.lower()}"
+
+
+def _dominant_color(img) -> str:
+    """Průměrná barva obrázku jako #rrggbb (zmenšení na 1×1 px)."""
+    px = img.convert("RGB").resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return "#{:02x}{:02x}{:02x}".format(*px[:3])
+
+
+def _lqip_data_uri(img) -> str:
+    """Miniatura (max 16 px) jako WebP data URI – frontend ji rozmaže jako placeholder."""
+    thumb = img.convert("RGB")
+    thumb.thumbnail((LQIP_SIDE, LQIP_SIDE), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    thumb.save(buf, format="WEBP", quality=LQIP_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def image_meta(img, path: str) -> dict:
+    """Metadata pro již uložený obrázek `img` (PIL) na cestě `path`."""
+    return {
+        "width": img.width,
+        "height": img.height,
+        "byte_size": os.path.getsize(path),
+        "dominant_color": _dominant_color(img),
+        "lqip": _lqip_data_uri(img),
+    }
+
+
+def normalize_image(src, out_dir: str) -> tuple[str, dict]:
+    """
+    Normalizace obrázku:
+    - EXIF orientace
+    - RGB
+    - max 1600x1600
+    - WebP (quality 85)
+    `src` je cesta nebo file-like objekt. Vrací (název .webp, metadata).
+    Při chybě vyhazuje výjimku – fallback řeší volající.
+    """
+    if not PIL_OK:
+        raise RuntimeError("PIL není dostupné")
+
+    # Načtení přes PIL (pillow-heif umožní HEIC/HEIF)
+    img = Image.open(src)
+    # EXIF auto-rotate
+    img = ImageOps.exif_transpose(img)
+    # Konverze do RGB (odstranění profilů/CMYK apod.)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+    # Zmenšit dlouhou stranu na max 1600
+    img.thumbnail((MAX_SIDE, MAX_SIDE), Image.Resampling.LANCZOS)
+
+    # Pokud je RGBA, převedeme na RGB s bílým pozadím (aby WebP nemělo nečekanou průhlednost)
+    if img.mode == "RGBA":
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        bg.paste(img, mask=img.split()[-1])
+        img = bg
+
+    out_name = safe_uuid_name(".webp")
+    out_path = os.path.join(out_dir, out_name)
+    img.save(out_path, format="WEBP", quality=WEBP_QUALITY, method=6)
+    return out_name, image_meta(img, out_path)
+
+
+def probe_image(path: str) -> dict | None:
+    """Metadata existujícího souboru (backfill). Vrací None, pokud to není čitelný obrázek."""
+    if not PIL_OK or not os.path.isfile(path):
+        return None
+    try:
+        with Image.open(path) as img:
+            img.load()
+            return image_meta(img, path)
+    except Exception:
+        return None
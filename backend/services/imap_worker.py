@@ -0,0 +1,220 @@
+# backend/services/imap_worker.py
+"""
+Dlouho běžící IMAP worker pro bankovní notifikace (`flask payments imap-worker`).
+
+Místo cronu / ručního /api/payments/sync-csob-mail drží jedno přihlášené
+spojení a čeká v IMAP IDLE (RFC 2177): jakmile server ohlásí novou zprávu
+(`* n EXISTS`), proběhne `fetch_from_connection` (UID od checkpointu) a dávka
+jde do `apply_bank_confirmations` (párování, FA, Telegram) – do pár sekund.
+
+- IDLE se po `idle_seconds` ukončí (DONE) a spojení se ověří přes NOOP –
+  udrží NAT/firewall a odhalí mrtvé TCP; server bez IDLE se polluje NOOPem;
+- výpadek (socket, BYE, chyba DB) → spojení se zahodí a naváže znovu
+  s exponenciálním odkladem RECONNECT_MIN..RECONNECT_MAX (± 20 % jitter);
+- po každém (znovu)připojení jeden průchod – dožene, co přišlo mezitím.
+
+V nasazení běží jako samostatný proces: `imap` v Procfile, služba imap-worker
+v docker-compose*.yml. Lokálně bez banky: backend/scripts/imap_standin.py.
+"""
+from __future__ import annotations
+
+import imaplib
+import random
+import select
+import threading
+import time
+
+from flask import current_app
+
+from backend.api.utils import csob_mail_sync as mail_sync
+from backend.extensions import db
+
+# RFC 2177: IDLE obnovit nejpozději po 29 min; NAT bývá kratší
+IDLE_SECONDS = 300.0
+POLL_SECONDS = 60.0
+TIMEOUT_SECONDS = 60.0
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 300.0
+# průchodů za jedno probuzení, když se nové zprávy nevejdou do max_items
+MAX_PASSES = 20
+# jak často se při čekání kontroluje `stop`
+STOP_CHECK_SECONDS = 1.0
+
+# imaplib (do Pythonu 3.14) IDLE nezná – _command ho jinak odmítne
+imaplib.Commands.setdefault("IDLE", ("AUTH", "SELECTED"))
+
+
+class ImapWorker:
+    """Jedno IMAP spojení: průchod → IDLE → průchod…; `stop` ukončí smyčku."""
+
+    def __init__(
+        self,
+        settings: dict | None = None,
+        *,
+        max_items: int = 50,
+        mark_seen: bool = True,
+        idle_seconds: float = IDLE_SECONDS,
+        poll_seconds: float = POLL_SECONDS,
+        log=print,
+        stop: threading.Event | None = None,
+    ):
+        self.settings = settings or mail_sync.imap_settings()
+        self.max_items = max_items
+        self.mark_seen = mark_seen
+        self.idle_seconds = idle_seconds
+        self.poll_seconds = poll_seconds
+        self.log = log
+        self.stop = stop or threading.Event()
+        self.imap: imaplib.IMAP4 | None = None
+        self.can_idle = False
+
+    # ---- spojení ----------------------------------------------------------
+
+    def connect(self) -> None:
+        s = self.settings
+        cls = imaplib.IMAP4_SSL if s["ssl"] else imaplib.IMAP4
+        imap = cls(s["host"], s["port"], timeout=TIMEOUT_SECONDS)
+        try:
+            imap.login(s["user"], s["password"])
+            # schopnosti se po přihlášení můžou změnit (IDLE bývá až tady)
+            typ, data = imap.capability()
+            caps = data[0].upper().split() if typ == "OK" and data and data[0] else []
+        except Exception:
+            _logout(imap)
+            raise
+        self.imap = imap
+        self.can_idle = b"IDLE" in caps
+
+    def disconnect(self) -> None:
+        if self.imap is not None:
+            _logout(self.imap)
+            self.imap = None
+
+    # ---- průchod ----------------------------------------------------------
+
+    def sync(self) -> dict:
+        """Stáhne a spáruje nové notifikace; opakuje, dokud zbývají kandidáti."""
+        totals = {"checked": 0, "updated_payments": 0, "updated_orders": 0}
+        s = self.settings
+        try:
+            for _ in range(MAX_PASSES):
+                rows, more, seen = mail_sync.fetch_from_connection(
+                    self.imap,
+                    account=f"{s['user']}@{s['host']}",
+                    folder=s["folder"],
+                    max_items=self.max_items,
+                    allow_senders=mail_sync.BANK_SENDERS,
+                    mark_seen=self.mark_seen,
+                    checkpoint_scope="bank",
+                )
+                # commit i pro prázdnou dávku – uloží posunutý checkpoint
+                results = mail_sync.apply_bank_confirmations([(vs, amt) for vs, amt, _ in rows])
+                mail_sync.mark_seen_uids(self.imap, seen)  # \Seen až po commitu párování
+                for key in totals:
+                    totals[key] += results[key]
+                if not more:
+                    break
+        finally:
+            db.session.remove()
+        self._take_exists()  # EXISTS ze SELECT průchodu už je zpracovaný
+        return totals
+
+    # ---- čekání na poštu --------------------------------------------------
+
+    def wait(self) -> bool:
+        """Počká na novou poštu nebo konec okna; True = server ohlásil zprávu."""
+        if self.can_idle:
+            return self._idle()
+        if self.stop.wait(self.poll_seconds):
+            return False
+        self.imap.noop()
+        return self._take_exists()
+
+    def _idle(self) -> bool:
+        imap = self.imap
+        tag = imap._command("IDLE")
+        while imap._get_response() is not None:  # None = pokračování "+ idling"
+            if imap.tagged_commands.get(tag) is not None:
+                typ, data = imap.tagged_commands.pop(tag)
+                raise imaplib.IMAP4.error(f"IDLE odmítnut: {typ} {data}")
+
+        deadline = time.monotonic() + self.idle_seconds
+        while not self.stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._readable(min(remaining, STOP_CHECK_SECONDS)):
+                # jakýkoli řádek (EXISTS, EXPUNGE, FETCH, BYE) ukončí IDLE – DONE
+                # pak dočte i to, co zůstalo v bufferu
+                imap._get_response()
+                break
+
+        imap.send(b"DONE\r\n")
+        imap._command_complete("IDLE", tag)  # BYE → abort
+        if self._take_exists():
+            return True
+        if not self.stop.is_set():
+            imap.noop()  # keepalive + kontrola, že spojení žije
+        return self._take_exists()
+
+    def _readable(self, timeout: float) -> bool:
+        sock = self.imap.sock
+        pending = getattr(sock, "pending", None)  # SSL: už dešifrovaná data
+        if pending is not None and pending():
+            return True
+        readable, _, _ = select.select([sock], [], [], timeout)
+        return bool(readable)
+
+    def _take_exists(self) -> bool:
+        untagged = self.imap.untagged_responses
+        exists = untagged.pop("EXISTS", None)
+        recent = untagged.pop("RECENT", None)
+        return bool(exists) or any(r not in (b"0", 0) for r in recent or ())
+
+    # ---- smyčka -----------------------------------------------------------
+
+    def run(self, once: bool = False) -> None:
+        """Hlavní smyčka; `once` = připojit, jeden průchod, skončit (cron)."""
+        delay = RECONNECT_MIN
+        try:
+            while not self.stop.is_set():
+                try:
+                    if self.imap is None:
+                        self.connect()
+                        self._report(self.sync())
+                        delay = RECONNECT_MIN
+                        if once:
+                            return
+                        self.log(f"imap: připojeno, čekám na poštu ({'IDLE' if self.can_idle else 'NOOP polling'})")
+                    if self.wait():
+                        self._report(self.sync())
+                except Exception as exc:
+                    self.disconnect()
+                    if once:
+                        raise
+                    current_app.logger.warning("IMAP worker: %s", exc, exc_info=True)
+                    wait = delay * random.uniform(0.8, 1.2)
+                    self.log(f"imap: chyba ({exc}), nové spojení za {wait:.0f}s")
+                    self.stop.wait(wait)
+                    delay = min(delay * 2, RECONNECT_MAX)
+        finally:
+            self.disconnect()
+
+    def _report(self, totals: dict) -> None:
+        if totals["checked"]:
+            self.log(
+                f"imap: potvrzení {totals['checked']}, platby {totals['updated_payments']}, "
+                f"objednávky {totals['updated_orders']}"
+            )
+
+
+def _logout(imap) -> None:
+    try:
+        imap.logout()
+    except Exception:
+        pass
+
+
+def run_worker(once: bool = False, log=print, **kwargs) -> None:
+    """Spustí worker s nastavením z .env (IMAP_*); kwargs viz ImapWorker."""
+    ImapWorker(log=log, **kwargs).run(once=once)
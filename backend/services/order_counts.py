@@ -0,0 +1,147 @@
+# backend/services/order_counts.py
+"""
+Průběžně udržované počty objednávek podle stavu (tabulka order_status_count).
+
+- ORM insert/delete/změna `Order.status` upraví čítač ve stejné transakci
+  (mapper eventy sečtou rozdíly v session, zapíšou se až v before_commit
+  jedním upsertem na dotčený stav – INSERT … ON CONFLICT (status) DO UPDATE;
+  zámek řádku čítače se tak drží jen po dobu commitu, ne celý checkout,
+  a první objednávka v novém stavu nezávodí o INSERT);
+- hromadné Core UPDATE (stock_holds sweeper) volají `adjust()` ručně;
+- `recount()` čítač přepočítá z tabulky `order` (CLI `flask orders recount-status`),
+  např. po ručních zásazích do DB.
+
+Čítač je tedy „levný odhad“; přesný COUNT si lze vyžádat (payments_list ?count=exact).
+"""
+from __future__ import annotations
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, object_session
+
+from backend.extensions import db
+from backend.models import Order, OrderStatusCount
+
+_table = OrderStatusCount.__table__
+_SESSION_KEY = "order_status_deltas"
+
+# stavy objednávky; migrace b1d7e8f9a085 i recount() pro ně drží řádek i s nulou
+STATUSES = ("awaiting_payment", "paid", "canceled")
+
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def _bump(connection, deltas: dict[str, int]) -> None:
+    """count += delta pro každý stav; chybějící řádek se založí (upsert)."""
+    # pevné pořadí stavů = stejné pořadí zámků ve všech transakcích
+    rows = [{"status": s, "count": d} for s, d in sorted(deltas.items()) if d and s is not None]
+    if not rows:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is None:
+        # jiná DB bez ON CONFLICT: UPDATE, chybějící řádek INSERTem
+        for row in rows:
+            res = connection.execute(
+                update(_table).where(_table.c.status == row["status"])
+                .values(count=_table.c.count + row["count"])
+            )
+            if not res.rowcount:
+                connection.execute(insert(_table).values(**row))
+        return
+    stmt = dialect_insert(_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_table.c.status],
+        set_={"count": _table.c.count + stmt.excluded.count},
+    )
+    connection.execute(stmt, rows)
+
+
+def _merge(deltas: dict[str, int], more: dict[str, int]) -> None:
+    for status, delta in more.items():
+        _add(deltas, status, delta)
+
+
+def adjust(deltas: dict[str, int]) -> None:
+    """Ruční úprava čítače po Core zápisech do `order` – zapíše se s commitem session."""
+    _merge(db.session.info.setdefault(_SESSION_KEY, {}), deltas)
+
+
+def _pending(target) -> dict[str, int] | None:
+    session = object_session(target)
+    return session.info.setdefault(_SESSION_KEY, {}) if session is not None else None
+
+
+def _add(deltas: dict[str, int] | None, status: str | None, delta: int) -> None:
+    if deltas is not None and status is not None:
+        deltas[status] = deltas.get(status, 0) + delta
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target):
+    _add(_pending(target), target.status, 1)
+
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target):
+    _add(_pending(target), target.status, -1)
+
+
+@event.listens_for(Order.status, "set", active_history=True)
+def _status_set(target, value, oldvalue, initiator):
+    # active_history: i u expirované objednávky (po commitu) se načte starý stav,
+    # jinak by history.deleted byla prázdná a čítač by ho neodečetl
+    pass
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    hist = inspect(target).attrs.status.history
+    if not hist.has_changes():
+        return
+    deltas = _pending(target)
+    for old in hist.deleted:
+        _add(deltas, old, -1)
+    for new in hist.added:
+        _add(deltas, new, 1)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # flush patří do commitu i tak – tady proběhne dřív, aby jeho změny stavů
+    # byly sečtené; pak jeden upsert za celou transakci (dávka 5000 zaplacených = 1 příkaz)
+    session.flush()
+    deltas = session.info.pop(_SESSION_KEY, None)
+    if deltas:
+        _bump(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def status_total(status: str | None = None) -> int:
+    """Počet objednávek (v daném stavu) z čítače – jeden dotaz na malou tabulku."""
+    q = select(func.coalesce(func.sum(OrderStatusCount.count), 0))
+    if status is not None:
+        q = q.where(OrderStatusCount.status == status)
+    return int(db.session.execute(q).scalar() or 0)
+
+
+def recount() -> dict[str, int]:
+    """Přepočítá čítač z tabulky `order` (jedna transakce); vrací nové počty."""
+    db.session.flush()
+    db.session.info.pop(_SESSION_KEY, None)  # rozdíly už jsou v COUNT níže
+    counts = {
+        status: int(n)
+        for status, n in db.session.execute(
+            select(Order.status, func.count(Order.id)).group_by(Order.status)
+        )
+        if status is not None
+    }
+    db.session.execute(delete(OrderStatusCount))
+    rows = {**dict.fromkeys(STATUSES, 0), **counts}
+    db.session.execute(insert(OrderStatusCount), [{"status": s, "count": n} for s, n in rows.items()])
+    db.session.commit()
+    return counts
@@ -9,8 +9,9 @@ from decimal import Decimal
 from flask import current_app
 from backend.extensions import db
 from backend.models import Order, OrderItem, SoldProduct
-from backend.api.utils.email import send_email
 from backend.invoicing import build_invoice_pdf_bytes
+from backend.services.outbox import enqueue_email
+from backend.services.stock_holds import convert_holds
 
 # ---- pomocné ---------------------------------------------------------------
 
@@ -165,7 +166,7 @@ def _send_invoice_email(order: Order, pdf_bytes: bytes, filename: str) -> None:
         "content": pdf_bytes,
         "mimetype": "application/pdf",
     }]
-    send_email(subject=subject, recipients=[recipient], body=body, attachments=attachments)
+    enqueue_email(subject=subject, recipients=[recipient], body=body, attachments=attachments)
 
 def _notify_telegram(order: Order) -> None:
     """
@@ -184,20 +185,21 @@ def _notify_telegram(order: Order) -> None:
 def on_order_marked_paid(order_id: int) -> dict:
     """
     Volat POUZE při přechodu objednávky do stavu 'paid' / 'zaplaceno'.
-    1) doplní SoldProduct (idempotentně)
+    1) doplní SoldProduct (idempotentně) a převede StockHold na prodej
     2) vytvoří souhrnný objekt a vygeneruje 1 PDF přes build_invoice_pdf_bytes(...)
-    3) odešle e-mailem fakturu
+    3) zařadí e-mail s fakturou do outboxu
     4) (volitelně) pošle Telegram
     """
     order: Order | None = Order.query.get(order_id)
     if not order:
         return {"ok": False, "error": "Order not found"}
 
-    # 1) SoldProduct
+    # 1) SoldProduct + rezervace skladu se stává prodejem
     created_rows = _ensure_sold_rows(order)
+    converted_holds = convert_holds(order.id)
 
     try:
-        if created_rows:
+        if created_rows or converted_holds:
             db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -209,13 +211,15 @@ def on_order_marked_paid(order_id: int) -> dict:
     pdf_bytes = build_invoice_pdf_bytes(proxy)
     filename = f"Invoice-Order-{order.id}.pdf"
 
-    # 3) E-mail
+    # 3) E-mail – do outboxu, odešle `flask mail outbox-worker`
     emailed = False
     try:
         _send_invoice_email(order, pdf_bytes, filename)
+        db.session.commit()
         emailed = True
     except Exception:
-        current_app.logger.exception("Odeslání e-mailu s fakturou selhalo")
+        db.session.rollback()
+        current_app.logger.exception("Zařazení e-mailu s fakturou selhalo")
 
     # 4) Telegram (pokud máš)
     _notify_telegram(order)
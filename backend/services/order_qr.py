@@ -0,0 +1,168 @@
+# backend/services/order_qr.py
+"""
+Předem vykreslené QR platby objednávek: static/qr/<vs>.png (QR_FOLDER).
+
+VS i total_czk se po vytvoření objednávky nemění, takže QR stačí vykreslit
+jednou. `schedule(order)` si payload připraví v requestu a po commitu ho
+předá malému poolu vláken (QR_RENDER_WORKERS) – checkout na PNG nečeká.
+Soubor pak servíruje /api/payments/qr/order/<vs> a potvrzovací e-mail ho
+přikládá odkazem (outbox příloha {"path": ..., "spd": ...}), bez dalšího
+volání qrcode. Když PNG při odeslání ještě není (worker předběhne vlákno,
+restart webu, chyba vykreslení), vykreslí ho outbox worker z payloadu `spd`;
+QR je jen doplněk, potvrzení objednávky kvůli němu nikdy nepropadne.
+Chybějící soubory starších objednávek doplní `flask payments backfill-qr`.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.extensions import db
+from backend.models import Order
+from backend.services.qr import build_spd_payload, get_iban, order_message, render_png
+
+_SESSION_KEY = "order_qr_pending"
+_VS_RE = re.compile(r"^\d{1,32}$")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_pid: int | None = None
+_executor_lock = threading.Lock()
+
+
+def qr_folder() -> str:
+    return current_app.config.get("QR_FOLDER") or os.path.join(current_app.root_path, "static", "qr")
+
+
+def qr_filename(vs: str) -> str:
+    """Název souboru pro VS; VS mimo číslice (cesta!) se odmítne."""
+    vs = str(vs).strip()
+    if not _VS_RE.match(vs):
+        raise ValueError(f"Neplatný VS pro QR: {vs!r}")
+    return f"{vs}.png"
+
+
+def qr_path(vs: str) -> str:
+    return os.path.join(qr_folder(), qr_filename(vs))
+
+
+def order_payload(order: Order) -> str | None:
+    """SPD payload objednávky (stejný jako v potvrzení), None bez částky/VS."""
+    if not order.vs or order.total_czk is None or order.total_czk <= 0:
+        return None
+    amount = Decimal(order.total_czk).quantize(Decimal("0.01"))
+    return build_spd_payload(get_iban(), amount, order.vs, order_message(order.vs))
+
+
+def write_qr(path: str, payload: str) -> str:
+    """Vykreslí PNG a atomicky ho zapíše (tmp + rename) – čtenář nevidí půl souboru."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(render_png(payload))
+    os.replace(tmp, path)
+    return path
+
+
+def ensure_order_qr(order: Order) -> str | None:
+    """Synchronně: cesta k PNG objednávky, vykreslí ho, pokud ještě neexistuje."""
+    payload = order_payload(order)
+    if payload is None:
+        return None
+    path = qr_path(order.vs)
+    if not os.path.exists(path):
+        write_qr(path, payload)
+    return path
+
+
+def email_attachment(order: Order) -> dict:
+    """
+    Příloha pro outbox odkazem na soubor – obsah se načte až při odeslání;
+    `spd` je payload, ze kterého worker PNG vykreslí, pokud soubor chybí.
+    """
+    return {
+        "filename": f"qr-platba-{order.vs}.png",
+        "mimetype": "image/png",
+        "path": qr_path(order.vs),
+        "spd": order_payload(order),
+    }
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = int(current_app.config.get("QR_RENDER_WORKERS", 2))
+            _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="order-qr")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _render_job(path: str, payload: str, log) -> None:
+    try:
+        if not os.path.exists(path):
+            write_qr(path, payload)
+    except Exception:
+        log.exception("Vykreslení QR %s selhalo", path)
+
+
+def schedule(order: Order) -> bool:
+    """
+    Naplánuje vykreslení QR objednávky po commitu aktuální transakce
+    (rollback = nic). Vrací False, pokud objednávka QR mít nemůže.
+    """
+    try:
+        payload = order_payload(order)
+        path = qr_path(order.vs) if payload else None
+    except (RuntimeError, ValueError) as exc:  # chybí MERCHANT_IBAN / nečíselný VS
+        current_app.logger.warning("QR objednávky %s se nevykreslí: %s", order.vs, exc)
+        return False
+    if payload is None:
+        return False
+    # executor i logger se berou teď – after_commit může běžet mimo app context
+    pending = db.session.info.setdefault(
+        _SESSION_KEY, {"jobs": [], "executor": _get_executor(), "log": current_app.logger}
+    )
+    pending["jobs"].append((path, payload))
+    return True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        for path, payload in pending["jobs"]:
+            pending["executor"].submit(_render_job, path, payload, pending["log"])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def backfill(status: str = "awaiting_payment", force: bool = False) -> dict:
+    """Doplní chybějící PNG (s `force` přepíše všechny) pro objednávky v daném stavu."""
+    stats = {"rendered": 0, "skipped": 0, "invalid": 0}
+    q = (
+        Order.query
+        .filter(Order.status == status, Order.vs.isnot(None), Order.total_czk > 0)
+        .order_by(Order.id)
+    )
+    for order in q.yield_per(500):
+        try:
+            path = qr_path(order.vs)
+        except ValueError:
+            stats["invalid"] += 1
+            continue
+        if not force and os.path.exists(path):
+            stats["skipped"] += 1
+            continue
+        write_qr(path, order_payload(order))
+        stats["rendered"] += 1
+    return stats
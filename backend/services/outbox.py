@@ -0,0 +1,255 @@
+# backend/services/outbox.py
+"""
+Outbox pro odchozí e-maily.
+
+`enqueue_email` jen přidá řádek do session – commit proběhne spolu s daty,
+ke kterým e-mail patří (objednávka, změna stavu). Odesílá worker
+(`flask mail outbox-worker`) po dávkách s opakováním a exponenciálním odkladem.
+V nasazení běží jako samostatný proces: `worker` v Procfile, služba
+outbox-worker v docker-compose*.yml (sdílí s webem instance/ a static/qr/).
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_, update
+
+from backend.api.utils.email import build_message
+from backend.api.utils.mail_transport import MailTransport
+from backend.extensions import db
+from backend.models import EmailOutbox
+from backend.services.order_qr import write_qr
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Zpráva ve stavu 'sending' déle než tohle = worker spadl, vezme ji jiný
+LOCK_TIMEOUT = timedelta(minutes=10)
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def _encode_attachments(attachments) -> str | None:
+    """
+    Přílohy do JSON: obsah jako base64, nebo jen odkaz `path` na soubor na disku
+    (např. předem vykreslený QR) – načte se až při odeslání. Volitelné `spd`
+    (payload QR platby) umožní chybějící PNG vykreslit až ve workeru.
+    """
+    out = []
+    for att in attachments or []:
+        if not isinstance(att, dict):
+            continue
+        if att.get("path"):
+            out.append({
+                "filename": att.get("filename") or os.path.basename(att["path"]),
+                "mimetype": att.get("mimetype") or "application/octet-stream",
+                "path": att["path"],
+                **({"spd": att["spd"]} if att.get("spd") else {}),
+            })
+            continue
+        data = att.get("content", att.get("data"))
+        if data is None:
+            continue
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        out.append({
+            "filename": att.get("filename") or "attachment",
+            "mimetype": att.get("mimetype") or att.get("content_type") or "application/octet-stream",
+            "content_b64": base64.b64encode(data).decode("ascii"),
+        })
+    return json.dumps(out) if out else None
+
+
+def _read_attachment(att: dict) -> bytes | None:
+    """Obsah přílohy; None = soubor chybí a nejde dovykreslit (e-mail odejde bez ní)."""
+    path = att.get("path")
+    if not path:
+        return base64.b64decode(att.get("content_b64") or "")
+    if att.get("spd") and not os.path.exists(path):
+        # QR z webu ještě není (vlákno nestihlo, restart, chyba) – vykreslí ho worker
+        try:
+            write_qr(path, att["spd"])
+        except Exception:
+            current_app.logger.exception("Vykreslení přílohy %s selhalo", path)
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except OSError as exc:
+        current_app.logger.warning("Příloha %s chybí, e-mail odejde bez ní: %s", path, exc)
+        return None
+
+
+def _decode_attachments(row: EmailOutbox) -> list[dict]:
+    out = []
+    for att in row.attachment_list:
+        content = _read_attachment(att)
+        if content is not None:
+            out.append({
+                "filename": att.get("filename"),
+                "mimetype": att.get("mimetype"),
+                "content": content,
+            })
+    return out
+
+
+def enqueue_email(subject, recipients, body, attachments=None, sender=None) -> EmailOutbox:
+    """
+    Zařadí e-mail do fronty (stejná signatura jako api.utils.email.send_email).
+    Nic necommituje – řádek se uloží v transakci volajícího.
+    """
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    row = EmailOutbox(
+        subject=(subject or "")[:255],
+        recipients=json.dumps([r for r in (recipients or []) if r]),
+        sender=sender if isinstance(sender, str) else (json.dumps(list(sender)) if sender else None),
+        body=body or "",
+        attachments=_encode_attachments(attachments),
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(row)
+    return row
+
+
+def build_outbox_message(row: EmailOutbox):
+    sender = row.sender
+    if sender and sender.startswith("["):
+        sender = tuple(json.loads(sender))  # ("Jméno", "adresa")
+    return build_message(
+        row.subject, row.recipient_list, row.body,
+        attachments=_decode_attachments(row), sender=sender,
+    )
+
+
+def backoff_seconds(attempts: int) -> int:
+    """60 s, 2 min, 4 min, … (základ z OUTBOX_BACKOFF_SECONDS), strop 6 h."""
+    base = int(current_app.config.get("OUTBOX_BACKOFF_SECONDS", 60))
+    return min(base * (2 ** max(attempts - 1, 0)), MAX_BACKOFF_SECONDS)
+
+
+def claim_batch(limit: int = 50, now: datetime | None = None) -> list[EmailOutbox]:
+    """
+    Zamkne až `limit` zpráv k odeslání (pending a splatné, nebo zaseklé v 'sending').
+    Podmíněný UPDATE zajistí, že stejnou zprávu nevezmou dva workery.
+    """
+    now = now or datetime.utcnow()
+    due = or_(
+        (EmailOutbox.status == PENDING) & (EmailOutbox.next_attempt_at <= now),
+        (EmailOutbox.status == SENDING) & (EmailOutbox.locked_at < now - LOCK_TIMEOUT),
+    )
+    ids = [
+        i for (i,) in
+        db.session.query(EmailOutbox.id).filter(due).order_by(EmailOutbox.id).limit(limit)
+    ]
+    if not ids:
+        return []
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), due)
+        .values(status=SENDING, locked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return (
+        EmailOutbox.query
+        .filter(EmailOutbox.id.in_(ids), EmailOutbox.status == SENDING, EmailOutbox.locked_at == now)
+        .order_by(EmailOutbox.id)
+        .all()
+    )
+
+
+def mark_sent(row: EmailOutbox) -> None:
+    row.status = SENT
+    row.sent_at = datetime.utcnow()
+    row.locked_at = None
+    row.last_error = None
+    row.attempts = (row.attempts or 0) + 1
+
+
+def mark_failed(row: EmailOutbox, exc: Exception) -> None:
+    """Neúspěšný pokus: další pokus s odkladem, po OUTBOX_MAX_ATTEMPTS stav 'failed'."""
+    row.attempts = (row.attempts or 0) + 1
+    row.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    row.locked_at = None
+    max_attempts = int(current_app.config.get("OUTBOX_MAX_ATTEMPTS", 8))
+    if row.attempts >= max_attempts:
+        row.status = FAILED
+    else:
+        row.status = PENDING
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(row.attempts))
+
+
+def _send_batch(rows: list[EmailOutbox], transport: MailTransport) -> None:
+    """
+    Odešle dávku jedním SMTP spojením; jedna špatná zpráva neshodí ostatní.
+    Výsledky se commitují jednou za dávku – když worker spadne uprostřed, zprávy
+    dávky se po LOCK_TIMEOUT pošlou znovu (doručení „alespoň jednou“).
+    """
+    for row in rows:
+        try:
+            transport.send(build_outbox_message(row))
+        except Exception as exc:
+            current_app.logger.warning("Outbox #%s: odeslání selhalo: %s", row.id, exc)
+            mark_failed(row, exc)
+        else:
+            mark_sent(row)
+    db.session.commit()
+
+
+def process_batch(limit: int = 50, transport: MailTransport | None = None) -> dict:
+    """
+    Jedna dávka workeru. Bez předaného `transport` si otevře vlastní spojení
+    jen na tuto dávku. Vrací {"claimed", "sent", "retry", "failed"}.
+    """
+    rows = claim_batch(limit)
+    if not rows:
+        return {"claimed": 0, "sent": 0, "retry": 0, "failed": 0}
+    if transport is None:
+        with MailTransport() as own:
+            _send_batch(rows, own)
+    else:
+        _send_batch(rows, transport)
+    return {
+        "claimed": len(rows),
+        "sent": sum(1 for r in rows if r.status == SENT),
+        "retry": sum(1 for r in rows if r.status == PENDING),
+        "failed": sum(1 for r in rows if r.status == FAILED),
+    }
+
+
+def run_worker(batch_size: int = 50, interval: float = 5.0, once: bool = False, log=print) -> None:
+    """
+    Smyčka workeru: dávky bez pauzy, dokud je co posílat, jinak spánek `interval`.
+    SMTP spojení se drží mezi dávkami (MailTransport ho po nečinnosti zavře sám).
+    """
+    with MailTransport() as transport:
+        while True:
+            stats = process_batch(batch_size, transport)
+            if stats["claimed"]:
+                log(f"outbox: odesláno {stats['sent']}, znovu později {stats['retry']}, selhalo {stats['failed']}")
+            if once and not stats["claimed"]:
+                return
+            if not stats["claimed"]:
+                db.session.remove()
+                time.sleep(interval)
+
+
+def retry(ids: list[int] | None = None) -> int:
+    """Vrátí 'failed' zprávy (všechny nebo vybrané) do fronty s vynulovanými pokusy."""
+    stmt = update(EmailOutbox).where(EmailOutbox.status == FAILED)
+    if ids is not None:
+        stmt = stmt.where(EmailOutbox.id.in_(ids))
+    result = db.session.execute(
+        stmt.values(status=PENDING, attempts=0, next_attempt_at=datetime.utcnow(), locked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount or 0
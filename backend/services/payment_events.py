@@ -0,0 +1,307 @@
+# backend/services/payment_events.py
+"""
+Push změn stavu platby (Server-Sent Events) napříč gunicorn workery.
+
+- `publish()` přidá PaymentEvent do session volajícího – událost se uloží ve
+  stejné transakci jako změna platby (rollback = žádná událost).
+- V každém workeru běží jedno vlákno (`EventBroadcaster`), které – jen když
+  má posluchače – čte `payment_event` od posledního kurzoru (id) a rozdává
+  události do front posluchačů podle VS. Commit ve stejném procesu vlákno
+  probudí hned, z ostatních workerů dorazí do PAYMENT_EVENTS_POLL_SECONDS.
+- Id ze sekvence (PostgreSQL) se přiděluje při INSERTu, viditelné je až po
+  commitu – pomalejší transakce s nižším id se objeví až za vyšším. Díry
+  v id za kurzorem se proto GAP_SECONDS dočítají zvlášť (díra po rollbacku
+  prostě vyprší); každá událost se rozešle jednou.
+- Každý stream drží jedno gthread vlákno workeru, proto je jich na proces
+  nejvýš PAYMENT_EVENTS_MAX_STREAMS (`StreamLimitReached` → endpoint 503
+  s Retry-After, klient přejde na polling status/by-vs).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from backend.extensions import db
+from backend.models import PaymentEvent
+from backend.services.status_cache import invalidate_on_commit, status_cache
+
+log = logging.getLogger(__name__)
+
+POLL_BATCH = 500
+QUEUE_SIZE = 100
+TERMINAL_STATUSES = ("received", "canceled")
+_SESSION_FLAG = "payment_events"
+# jak dlouho čekat na pozdě commitnuté id v díře; kolik děr sledovat
+GAP_SECONDS = 30.0
+MAX_GAPS = 100
+
+
+def publish(vs: str, status: str, order_status: str | None = None, amount=None) -> None:
+    """
+    Zaznamená změnu stavu platby; nic necommituje (transakce volajícího).
+    Po commitu zároveň zahodí cachovaný stav daného VS (status_cache).
+    """
+    db.session.add(PaymentEvent(
+        vs=str(vs),
+        status=status,
+        order_status=order_status,
+        amount_czk=amount,
+        created_at=datetime.utcnow(),
+    ))
+    db.session.info[_SESSION_FLAG] = True
+    invalidate_on_commit(vs)
+
+
+def publish_many(events: list[dict]) -> None:
+    """
+    Dávková varianta `publish` (párování výpisů/potvrzení): jeden INSERT
+    executemany místo ORM objektu na událost. Položky: vs, status,
+    order_status, amount. Nic necommituje.
+    """
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(PaymentEvent), [
+        {
+            "vs": str(ev["vs"]),
+            "status": ev["status"],
+            "order_status": ev.get("order_status"),
+            "amount_czk": ev.get("amount"),
+            "created_at": now,
+        }
+        for ev in events
+    ])
+    db.session.info[_SESSION_FLAG] = True
+    invalidate_on_commit(*(ev["vs"] for ev in events))
+
+
+def event_json(ev_id: int | None, vs: str, status: str | None, order_status: str | None, amount) -> dict:
+    return {
+        "id": ev_id,
+        "vs": vs,
+        "status": status,
+        "orderStatus": order_status,
+        "amountCzk": float(amount) if amount is not None else None,
+    }
+
+
+def _missing_ranges(lo: int, hi: int, present: list[int]) -> list[tuple[int, int]]:
+    """Úseky <lo, hi>, které v seřazeném `present` chybí."""
+    out, nxt = [], lo
+    for i in present:
+        if i > hi:
+            break
+        if i > nxt:
+            out.append((nxt, i - 1))
+        nxt = max(nxt, i + 1)
+    if nxt <= hi:
+        out.append((nxt, hi))
+    return out
+
+
+class StreamLimitReached(Exception):
+    """Proces už drží maximální počet otevřených SSE streamů."""
+
+
+class EventBroadcaster:
+    """Rozesílání událostí posluchačům v tomto procesu; vlákno se spouští líně (po forku)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: dict[str, set[queue.Queue]] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._cursor: int | None = None
+        self._gaps: list[tuple[int, int, float]] = []  # (od id, do id, platnost – monotonic)
+        self._app = None
+
+    def subscribe(self, app, vs: str, limit: int = 0) -> queue.Queue:
+        """Nová fronta posluchače; s `limit` > 0 nad ním `StreamLimitReached`."""
+        q: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            if limit > 0 and sum(len(s) for s in self._subs.values()) >= limit:
+                raise StreamLimitReached(limit)
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._start(app)
+            if self._cursor is None:
+                # události před tímto bodem pokrývá počáteční stav, který posílá endpoint –
+                # kromě ještě necommitnutých s nižším id: díry pod kurzorem sledujeme taky
+                cursor = db.session.execute(select(func.max(PaymentEvent.id))).scalar() or 0
+                low = max(1, cursor - POLL_BATCH + 1)
+                present = db.session.execute(
+                    select(PaymentEvent.id).where(PaymentEvent.id >= low).order_by(PaymentEvent.id)
+                ).scalars().all()
+                deadline = time.monotonic() + GAP_SECONDS
+                self._cursor = cursor
+                self._gaps = [(lo, hi, deadline) for lo, hi in _missing_ranges(low, cursor, present)][-MAX_GAPS:]
+            self._subs.setdefault(vs, set()).add(q)
+        return q
+
+    def unsubscribe(self, vs: str, q: queue.Queue) -> None:
+        with self._lock:
+            subs = self._subs.get(vs)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[vs]
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def _start(self, app) -> None:
+        self._pid = os.getpid()
+        self._app = app
+        self._subs = {}
+        self._cursor = None
+        self._gaps = []
+        self._thread = threading.Thread(target=self._run, name="payment-events", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        app = self._app
+        interval = float(app.config.get("PAYMENT_EVENTS_POLL_SECONDS", 1.0))
+        with app.app_context():
+            engine = db.engine
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self._poll(engine)
+            except Exception:
+                log.exception("Čtení payment_event selhalo")
+                time.sleep(interval)
+
+    def _poll(self, engine) -> None:
+        with self._lock:
+            if not self._subs:
+                self._cursor = None  # nikdo neposlouchá → nečteme
+                self._gaps = []
+                return
+            cursor = self._cursor or 0
+            now = time.monotonic()
+            gaps = [g for g in self._gaps if g[2] > now]
+
+        columns = (
+            PaymentEvent.id, PaymentEvent.vs, PaymentEvent.status,
+            PaymentEvent.order_status, PaymentEvent.amount_czk,
+        )
+        if gaps:
+            with engine.connect() as conn:
+                late = conn.execute(
+                    select(*columns)
+                    .where(or_(*(PaymentEvent.id.between(lo, hi) for lo, hi, _ in gaps)))
+                    .order_by(PaymentEvent.id)
+                    .limit(POLL_BATCH)
+                ).all()
+            if late:
+                found = [r.id for r in late]
+                gaps = [(a, b, dl) for lo, hi, dl in gaps for a, b in _missing_ranges(lo, hi, found)]
+                self._dispatch(late)
+
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(*columns)
+                    .where(PaymentEvent.id > cursor)
+                    .order_by(PaymentEvent.id)
+                    .limit(POLL_BATCH)
+                ).all()
+            if rows:
+                ids = [r.id for r in rows]
+                gaps += [(lo, hi, now + GAP_SECONDS) for lo, hi in _missing_ranges(cursor + 1, ids[-1], ids)]
+                cursor = ids[-1]
+                self._dispatch(rows, cursor)
+            if len(rows) < POLL_BATCH:
+                break
+
+        with self._lock:
+            self._gaps = gaps[-MAX_GAPS:]
+
+    def _dispatch(self, rows, cursor: int | None = None) -> None:
+        # změny z ostatních workerů → zahodit i lokálně cachovaný stav
+        status_cache.invalidate(*{r.vs for r in rows})
+        with self._lock:
+            if cursor is not None:
+                self._cursor = max(self._cursor or 0, cursor)
+            for r in rows:
+                for q in self._subs.get(r.vs, ()):
+                    try:
+                        q.put_nowait(event_json(r.id, r.vs, r.status, r.order_status, r.amount_czk))
+                    except queue.Full:
+                        pass  # pomalý klient – stav si dočte po reconnectu
+
+
+broadcaster = EventBroadcaster()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        broadcaster.wake()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_FLAG, None)
+
+
+def _sse(data: dict, event_name: str = "status") -> str:
+    head = f"id: {data['id']}\n" if data.get("id") is not None else ""
+    return f"{head}event: {event_name}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(vs: str, q: queue.Queue, initial: dict, heartbeat: float, max_seconds: float):
+    """
+    Generátor SSE zpráv pro jedno spojení: nejdřív aktuální stav, pak změny.
+    Po stavu `received`/`canceled` (nebo po max_seconds) stream skončí – klient
+    má po něm zavřít EventSource, jinak se za `retry` ms připojí znovu.
+    """
+    try:
+        yield "retry: 5000\n\n"
+        yield _sse(initial)
+        if initial.get("status") in TERMINAL_STATUSES:
+            return
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                data = q.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield _sse(data)
+            if data.get("status") in TERMINAL_STATUSES:
+                return
+    finally:
+        broadcaster.unsubscribe(vs, q)
+
+
+def prune_events(older_than_days: int, batch_size: int = 5000) -> int:
+    """Smaže staré události (slouží jen jako kurzor, historii nepotřebujeme)."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(PaymentEvent.id).where(PaymentEvent.created_at < cutoff).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(PaymentEvent).where(PaymentEvent.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+    return deleted
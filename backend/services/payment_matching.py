@@ -0,0 +1,196 @@
+# backend/services/payment_matching.py
+"""
+Dávkové párování potvrzení z banky (VS, částka) s objednávkami a platbami.
+
+Místo dvou dotazů na každé potvrzení (Order podle VS + poslední Payment podle VS)
+se pro celou dávku načtou objednávky a poslední platby dvěma IN dotazy
+(po IN_CHUNK VS), spáruje se v paměti a všechny změny stavů se zapíšou jedním
+commitem. Rollback = nezmění se nic.
+
+Dva režimy:
+- `require_amount_match=True` (ruční sync /api/payments/sync-csob-mail):
+  objednávka musí existovat a částka sedět s toleranci AMOUNT_TOLERANCE;
+  chybějící Payment se založí;
+- `require_amount_match=False` (apply_bank_confirmations – cron i IMAP worker): VS stačí,
+  označí se existující Payment i Order (bez kontroly částky).
+
+Zrušenou objednávku (sweeper po propadlé rezervaci vrátil kusy na sklad)
+platba v žádném režimu nepřepne: položka skončí v unmatched s důvodem
+order_canceled (a tím i v bank_message / reportu importu výpisu).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable
+
+from sqlalchemy import func, select
+
+from backend.extensions import db
+from backend.models import Order, Payment
+from backend.services import bank_messages
+from backend.services.payment_events import publish_many
+
+AMOUNT_TOLERANCE = Decimal("0.50")
+# VS na jeden IN dotaz (pod limitem parametrů SQLite i PostgreSQL)
+IN_CHUNK = 5000
+
+
+def amounts_equal(a, b, tol: Decimal = AMOUNT_TOLERANCE) -> bool:
+    """Porovnání částek s tolerancí (odchylky/zaokrouhlení)."""
+    return abs(Decimal(str(a)) - Decimal(str(b))) <= tol
+
+
+def _chunks(values: list, size: int):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def load_batch(vs_list: Iterable[str]) -> tuple[dict[str, Order], dict[str, Payment]]:
+    """Objednávky a poslední (nejvyšší id) platby pro dané VS – dva dotazy na chunk."""
+    vs_list = sorted({str(v) for v in vs_list if v})
+    orders: dict[str, Order] = {}
+    payments: dict[str, Payment] = {}
+    for chunk in _chunks(vs_list, IN_CHUNK):
+        for o in Order.query.filter(Order.vs.in_(chunk)):
+            orders[o.vs] = o
+        latest = (
+            select(func.max(Payment.id))
+            .where(Payment.vs.in_(chunk))
+            .group_by(Payment.vs)
+        )
+        for p in Payment.query.filter(Payment.id.in_(latest)):
+            payments[p.vs] = p
+    return orders, payments
+
+
+def _expected_amount(order: Order, item_totals: dict, shipping_fee: Decimal) -> Decimal | None:
+    """Očekávaná částka: Order.total_czk, jinak součet položek + poštovné."""
+    if order.total_czk is not None:
+        try:
+            return Decimal(str(order.total_czk))
+        except InvalidOperation:
+            return None
+    base = item_totals.get(order.id)
+    if base is None:
+        return None
+    return Decimal(str(base)) + shipping_fee
+
+
+def match_confirmations(
+    pairs: Iterable[tuple[str, Decimal]],
+    *,
+    require_amount_match: bool = True,
+    shipping_fee: Decimal = Decimal("0"),
+    item_totals: Callable[[list[int]], dict] | None = None,
+) -> dict:
+    """
+    Spáruje potvrzení a v jedné transakci zapíše změny (vč. payment_event).
+
+    `item_totals(order_ids) -> {order_id: součet}` dopočítá částku objednávek
+    bez total_czk (jeden dotaz pro celou dávku).
+
+    Vrací {"processed": [...], "unmatched": [...], "items": [...]}:
+    processed/unmatched ve formátu /api/payments/sync-csob-mail, items po jednom
+    na potvrzení (payment_id, order_id, payment_updated, order_updated, matched,
+    reason u nespárovaných).
+    """
+    pairs = [(str(vs), amount) for vs, amount in pairs]
+    orders, payments = load_batch(vs for vs, _ in pairs)
+
+    totals: dict = {}
+    if require_amount_match and item_totals is not None:
+        missing = [o.id for o in orders.values() if o.total_czk is None]
+        totals = item_totals(missing) if missing else {}
+
+    processed, unmatched, items, events = [], [], [], []
+    now = datetime.utcnow()
+    try:
+        for vs, amount in pairs:
+            order = orders.get(vs)
+            pay = payments.get(vs)
+            item = {
+                "vs": vs, "amount": str(amount),
+                "payment_id": pay.id if pay else None,
+                "order_id": order.id if order else None,
+                "payment_updated": False, "order_updated": False,
+                "matched": False, "reason": None,
+            }
+            items.append(item)
+            paid = Decimal(str(amount))
+
+            if order is not None and order.status == "canceled":
+                # propadlá rezervace: kusy jsou zpět v prodeji → nepřepínat, vyřeší se ručně
+                item["reason"] = "order_canceled"
+                unmatched.append({"vs": vs, "reason": "order_canceled", "paid": float(paid), "orderId": order.id})
+                continue
+
+            if require_amount_match:
+                if order is None:
+                    item["reason"] = "order_not_found"
+                    unmatched.append({"vs": vs, "reason": "order_not_found", "paid": float(paid)})
+                    continue
+                expected = _expected_amount(order, totals, shipping_fee)
+                if expected is None:
+                    item["reason"] = "order_amount_missing"
+                    unmatched.append({"vs": vs, "reason": "order_amount_missing", "paid": float(paid)})
+                    continue
+                if not amounts_equal(paid, expected):
+                    item["reason"] = "amount_mismatch"
+                    unmatched.append({
+                        "vs": vs,
+                        "reason": "amount_mismatch",
+                        "paid": float(paid),
+                        "expected": float(expected),
+                        "orderId": order.id,
+                    })
+                    continue
+
+            if pay is not None:
+                if pay.status != "received":
+                    pay.status = "received"
+                    item["payment_updated"] = True
+                if pay.received_at is None:
+                    pay.received_at = now
+                    item["payment_updated"] = True
+                if require_amount_match:
+                    pay.amount_czk = paid
+            elif require_amount_match:
+                pay = Payment(vs=vs, amount_czk=paid, status="received", received_at=now)
+                db.session.add(pay)
+                payments[vs] = pay  # opakovaný VS v dávce → stejná platba
+                item["payment_updated"] = True
+
+            if order is not None and order.status != "paid":
+                order.status = "paid"
+                item["order_updated"] = True
+
+            changed = item["payment_updated"] or item["order_updated"]
+            if require_amount_match:
+                item["matched"] = True
+                processed.append({
+                    "vs": vs,
+                    "amount": float(paid),
+                    "expected": float(expected),
+                    "orderId": order.id,
+                })
+                events.append({"vs": vs, "status": "received", "order_status": order.status, "amount": paid})
+            elif changed:
+                item["matched"] = True
+                events.append({
+                    "vs": vs, "status": "received",
+                    "order_status": order.status if order else None, "amount": paid,
+                })
+
+        publish_many(events)
+        db.session.flush()  # id nově založených plateb (po commitu by se každá načítala znovu)
+        for item in items:
+            if item["payment_id"] is None and item["vs"] in payments:
+                item["payment_id"] = payments[item["vs"]].id
+        bank_messages.record(items)  # výsledek k notifikacím z bank_message (stejný commit)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"processed": processed, "unmatched": unmatched, "items": items}
@@ -0,0 +1,238 @@
+# backend/services/pricing.py
+"""
+Ceny košíku na serveru z cenové mapy držené v paměti procesu.
+
+Mapa = {product_id: cena} + {variant_id: (product_id, cena varianty | None)},
+načtená dvěma SELECTy přes celý katalog. Dokud je platná, výpočet košíku
+(`quote_cart`) nesahá do DB vůbec.
+
+Invalidace:
+- ORM zápisy Product/ProductVariant, které mění cenu nebo příslušnost varianty
+  (mapper eventy), zahodí mapu až po commitu – souběžný request tak nenačte
+  a nezacachuje ještě nezapsaný stav;
+- hromadné Core zápisy (catalog_io.apply_plan) volají `invalidate()` ručně;
+- ostatní workery (gunicorn) se dozví nejpozději po PRICE_MAP_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from backend.extensions import db
+from backend.models import Product, ProductVariant
+
+CENT = Decimal("0.01")
+DEFAULT_SHIPPING_FEE = Decimal("89.00")
+DEFAULT_TTL_SECONDS = 300
+_SESSION_FLAG = "pricing_dirty"
+
+
+class PricingError(ValueError):
+    """Chyba výpočtu ceny; `status` je HTTP kód, `details` strukturované informace."""
+
+    def __init__(self, message: str, status: int = 400, details: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+class PriceMap:
+    """Cenová mapa katalogu; bezpečná pro vlákna, načítá se líně při prvním dotazu."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._products: dict[int, Decimal] | None = None
+        self._variants: dict[int, tuple[int, Decimal | None]] = {}
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._products = None
+            self._variants = {}
+
+    def _fresh(self, ttl: float) -> bool:
+        return self._products is not None and (time.monotonic() - self._loaded_at) < ttl
+
+    def snapshot(self, ttl: float):
+        """(produkty, varianty) – z paměti, případně po novém načtení z DB."""
+        with self._lock:
+            if self._fresh(ttl):
+                return self._products, self._variants
+            generation = self._generation
+
+        products = {
+            pid: Decimal(price) for pid, price in db.session.execute(select(Product.id, Product.price_czk))
+            if price is not None
+        }
+        variants = {
+            vid: (pid, Decimal(price) if price is not None else None)
+            for vid, pid, price in db.session.execute(
+                select(ProductVariant.id, ProductVariant.product_id, ProductVariant.price_czk)
+            )
+        }
+
+        with self._lock:
+            # invalidace během načítání → výsledek použijeme, ale neuložíme
+            if generation == self._generation:
+                self._products, self._variants = products, variants
+                self._loaded_at = time.monotonic()
+                self.loads += 1
+        return products, variants
+
+
+price_map = PriceMap()
+
+
+def invalidate() -> None:
+    """Zahodí cenovou mapu (volat po hromadných zápisech cen mimo ORM)."""
+    price_map.invalidate()
+
+
+# ---------- invalidace z ORM (mapper eventy → po commitu) ----------
+
+def _mark_dirty(target, attrs: tuple[str, ...] = ()) -> None:
+    if attrs:
+        state = inspect(target)
+        if not any(state.attrs[name].history.has_changes() for name in attrs):
+            return  # např. jen změna skladu – ceny se nemění
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_FLAG] = True
+
+
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_delete")
+@event.listens_for(ProductVariant, "after_insert")
+@event.listens_for(ProductVariant, "after_delete")
+def _catalog_changed(mapper, connection, target):
+    _mark_dirty(target)
+
+
+@event.listens_for(Product, "after_update")
+def _product_updated(mapper, connection, target):
+    _mark_dirty(target, ("price_czk",))
+
+
+@event.listens_for(ProductVariant, "after_update")
+def _variant_updated(mapper, connection, target):
+    _mark_dirty(target, ("price_czk", "product_id"))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        price_map.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_FLAG, None)
+
+
+# ---------- výpočet ----------
+
+def _to_decimal(val, default: Decimal) -> Decimal:
+    try:
+        return Decimal(str(val))
+    except (InvalidOperation, TypeError, ValueError):
+        return default
+
+
+def shipping_fee(shipping_mode: str | None = None) -> Decimal:
+    """
+    Poštovné: 1) ENV SHIPPING_FEE_CZK, 2) config SHIPPING_FEE_CZK, 3) 89 Kč.
+    Osobní odběr (`shipping_mode="pickup"`) je zdarma.
+    """
+    if (shipping_mode or "").strip().lower() == "pickup":
+        return Decimal("0.00")
+    raw = os.getenv("SHIPPING_FEE_CZK") or current_app.config.get("SHIPPING_FEE_CZK", "89.00")
+    return _to_decimal(raw, DEFAULT_SHIPPING_FEE).quantize(CENT)
+
+
+def quote_cart(lines: list[dict], shipping_mode: str | None = None) -> dict:
+    """
+    Autoritativní ceny pro položky z `stock.parse_cart_lines`.
+    Cena varianty má přednost, jinak cena produktu (stejně jako FE detail).
+    Vrací {"items": [...], "subtotal", "shipping_fee", "total"} (Decimal);
+    neznámé id → PricingError 404 (`missing`), cizí varianta → 400 (`mismatched`).
+    """
+    ttl = float(current_app.config.get("PRICE_MAP_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    products, variants = price_map.snapshot(ttl)
+
+    items, missing, mismatched, invalid = [], [], [], []
+    subtotal = Decimal("0.00")
+    for ln in lines:
+        pid, vid, qty = ln["product_id"], ln.get("variant_id"), int(ln["quantity"])
+        if qty <= 0:
+            invalid.append(pid)
+            continue
+        if pid not in products:
+            missing.append({"id": pid})
+            continue
+        unit = products[pid]
+        if vid is not None:
+            if vid not in variants:
+                missing.append({"id": pid, "variant_id": vid})
+                continue
+            owner, v_price = variants[vid]
+            if owner != pid:
+                mismatched.append({"id": pid, "variant_id": vid})
+                continue
+            if v_price is not None:
+                unit = v_price
+        if unit <= 0:
+            invalid.append(pid)
+            continue
+        unit = unit.quantize(CENT)
+        line_total = (unit * qty).quantize(CENT)
+        subtotal += line_total
+        items.append({
+            "product_id": pid,
+            "variant_id": vid,
+            "quantity": qty,
+            "unit_price": unit,
+            "line_total": line_total,
+        })
+
+    if missing:
+        raise PricingError("Některé položky košíku neexistují.", 404, {"missing": missing})
+    if mismatched:
+        raise PricingError("Varianta nepatří k produktu.", 400, {"mismatched": mismatched})
+    if invalid:
+        raise PricingError("Položka musí mít quantity>0 a cenu>0.", 400, {"invalid": invalid})
+
+    fee = shipping_fee(shipping_mode)
+    return {
+        "items": items,
+        "subtotal": subtotal.quantize(CENT),
+        "shipping_fee": fee,
+        "total": (subtotal + fee).quantize(CENT),
+    }
+
+
+def quote_to_json(quote: dict) -> dict:
+    """Decimal → float pro JSON odpovědi (klíče ve stylu API: camelCase)."""
+    return {
+        "items": [
+            {
+                "id": it["product_id"],
+                "variantId": it["variant_id"],
+                "quantity": it["quantity"],
+                "unitPrice": float(it["unit_price"]),
+                "lineTotal": float(it["line_total"]),
+            }
+            for it in quote["items"]
+        ],
+        "subtotalCzk": float(quote["subtotal"]),
+        "shippingCzk": float(quote["shipping_fee"]),
+        "totalCzk": float(quote["total"]),
+    }
@@ -0,0 +1,109 @@
+# backend/services/qr.py
+"""
+QR platby (SPD 1.0): IBAN obchodníka, sestavení payloadu a vykreslení PNG.
+
+PNG i SVG se cachují v paměti procesu podle payloadu – stejný VS a částka dávají
+stejný obrázek, takže opakované zobrazení děkovací stránky nic nepřepočítává.
+Obrázek je pro daný payload neměnný, proto má silný ETag odvozený z payloadu
+(`image_etag`) a prohlížeč ho může cachovat dlouho.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import os
+from decimal import Decimal
+from functools import lru_cache
+
+import qrcode
+from flask import current_app
+
+QR_CACHE_SIZE = 256
+# změnit při změně vzhledu obrázku (zneplatní ETagy v prohlížečích)
+RENDER_VERSION = "1"
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def get_iban() -> str:
+    """IBAN obchodníka (ENV MERCHANT_IBAN > Flask config MERCHANT_IBAN)."""
+    iban = os.getenv("MERCHANT_IBAN") or current_app.config.get("MERCHANT_IBAN")
+    if not iban:
+        raise RuntimeError("MERCHANT_IBAN není nastaven (ENV nebo Config).")
+    return iban.replace(" ", "").upper()
+
+
+def build_spd_payload(iban: str, amount: Decimal, vs: str | None, msg: str | None) -> str:
+    """
+    SPD 1.0 payload pro české QR platby (CZK):
+    SPD*1.0*ACC:...*AM:...*CC:CZK*X-VS:...*MSG:...
+    """
+    parts = ["SPD*1.0", f"ACC:{iban}", f"AM:{amount:.2f}", "CC:CZK"]
+    if vs:
+        parts.append(f"X-VS:{vs}")
+    if msg:
+        # SPD povoluje ASCII; vynecháme diakritiku/emoji a zkrátíme.
+        safe_msg = "".join(ch for ch in (msg or "") if 32 <= ord(ch) <= 126)
+        parts.append(f"MSG:{safe_msg[:60]}")
+    return "*".join(parts)
+
+
+def order_message(vs: str) -> str:
+    """Zpráva pro příjemce u platby objednávky (stejná jako v QR na FE)."""
+    return f"Objednavka {vs}"
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_png(payload: str) -> bytes:
+    """PNG s QR kódem pro daný payload (cache v procesu)."""
+    img = qrcode.make(payload)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_svg(payload: str) -> bytes:
+    """
+    SVG s QR kódem (cache v procesu): jedna <path> z vodorovných úseků tmavých
+    modulů, bez PIL – menší než SVG továrny qrcode a ostré v libovolné velikosti.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(runs)}"/></svg>'
+    ).encode("ascii")
+
+
+def render(payload: str, fmt: str = "png") -> bytes:
+    """Obrázek ve formátu `fmt` ('png' | 'svg')."""
+    return render_svg(payload) if fmt == "svg" else render_png(payload)
+
+
+def image_etag(payload: str, fmt: str = "png") -> str:
+    """Silný ETag obrázku – spočítá se bez vykreslení, takže 304 nic nerenderuje."""
+    raw = f"{RENDER_VERSION}:{fmt}:{payload}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def png_data_uri(payload: str) -> str:
+    """QR jako data URI pro vložení přímo do JSON odpovědi."""
+    return "data:image/png;base64," + base64.b64encode(render_png(payload)).decode("ascii")
@@ -0,0 +1,140 @@
+# backend/services/status_cache.py
+"""
+Krátkodobá read-through cache serializovaného stavu objednávky/platby podle VS.
+
+Frontend po checkoutu polluje /api/payments/status/by-vs, /api/orders/by-vs
+a /api/orders/<id>. Odpovědi se drží v LRU (max. DEFAULT_SIZE položek) s TTL
+(STATUS_CACHE_TTL_SECONDS); každý záznam nese VS, podle kterého se maže.
+
+Invalidace:
+- `invalidate_on_commit(vs)` – při změně stavu (volá ji i payment_events.publish);
+  položky se zahodí až po commitu, aby se nezacachoval nezapsaný stav;
+- v ostatních workerech je maže poller payment_events (pokud běží), jinak
+  nejpozději vyprší TTL.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.extensions import db
+
+DEFAULT_SIZE = 2048
+DEFAULT_TTL_SECONDS = 5.0
+_SESSION_KEY = "status_cache_vs"
+
+
+class StatusCache:
+    """LRU s TTL a indexem klíčů podle VS; bezpečná pro vlákna."""
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, str | None, dict]] = OrderedDict()
+        self._by_vs: dict[str, set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _drop(self, key: Hashable) -> None:
+        _, vs, _ = self._data.pop(key)
+        keys = self._by_vs.get(vs)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_vs[vs]
+
+    def get(self, key: Hashable) -> dict | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, vs: str | None, value: dict, ttl: float) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, vs, value)
+            if vs:
+                self._by_vs.setdefault(vs, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, *vs_list: str) -> int:
+        dropped = 0
+        with self._lock:
+            for vs in vs_list:
+                for key in list(self._by_vs.get(vs, ())):
+                    self._drop(key)
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_vs.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+status_cache = StatusCache()
+
+
+def cached(key: Hashable, loader: Callable[[], tuple[dict | None, str | None]]) -> dict | None:
+    """
+    Read-through: vrátí cachovanou hodnotu, jinak zavolá `loader() -> (hodnota, vs)`.
+    None (nenalezeno) se necachuje – objednávka může vzniknout hned vzápětí.
+    """
+    value = status_cache.get(key)
+    if value is not None:
+        return value
+    value, vs = loader()
+    if value is not None:
+        ttl = float(current_app.config.get("STATUS_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        status_cache.set(key, vs, value, ttl)
+    return value
+
+
+def invalidate_on_commit(*vs_list) -> None:
+    """Po commitu aktuální transakce zahodí záznamy daných VS (rollback = nic)."""
+    pending = db.session.info.setdefault(_SESSION_KEY, set())
+    pending.update(str(vs) for vs in vs_list if vs)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        status_cache.invalidate(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_KEY, None)
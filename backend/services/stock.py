@@ -0,0 +1,315 @@
+# backend/services/stock.py
+"""
+Hromadné operace se skladem (Product.stock / ProductVariant.stock).
+
+Všechny zápisy jsou množinové: jeden UPDATE s CASE na dávku id místo
+dotazu a UPDATE pro každý řádek zvlášť.
+"""
+from __future__ import annotations
+
+from sqlalchemy import case, update
+
+from backend.extensions import db
+from backend.models import Product, ProductVariant
+
+# Max. počet id v jednom UPDATE/IN (limit bind parametrů SQLite)
+CHUNK_SIZE = 500
+
+_TABLES = {
+    "product": Product,
+    "variant": ProductVariant,
+}
+
+
+class StockError(ValueError):
+    """Chyba skladové operace; `status` je HTTP kód, `details` strukturované informace."""
+
+    def __init__(self, message: str, status: int = 400, details: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+def _chunks(ids: list[int], size: int = CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _as_int(raw, label: str) -> int:
+    if isinstance(raw, bool):
+        raise ValueError(f"{label}: neplatné číslo")
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{label}: neplatné číslo '{raw}'")
+
+
+def fold_adjustments(items: list[dict]) -> tuple[dict[str, dict[int, dict]], list[dict]]:
+    """
+    Validuje a sloučí úpravy podle (tabulka, id) v pořadí, v jakém přišly:
+    absolutní `stock` přepíše předchozí stav, `delta` se sčítá.
+    Vrací ({"product": {id: {"set": int|None, "delta": int}}, "variant": {...}}, chyby).
+    """
+    folded: dict[str, dict[int, dict]] = {"product": {}, "variant": {}}
+    errors: list[dict] = []
+
+    for idx, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("položka musí být objekt")
+            has_pid = item.get("product_id") not in (None, "")
+            has_vid = item.get("variant_id") not in (None, "")
+            if has_pid == has_vid:
+                raise ValueError("zadejte právě jedno z product_id / variant_id")
+            kind = "variant" if has_vid else "product"
+            obj_id = _as_int(item.get(f"{kind}_id"), f"{kind}_id")
+
+            has_set = item.get("stock") not in (None, "")
+            has_delta = item.get("delta") not in (None, "")
+            if has_set == has_delta:
+                raise ValueError("zadejte právě jedno z stock / delta")
+
+            entry = folded[kind].setdefault(obj_id, {"set": None, "delta": 0})
+            if has_set:
+                value = _as_int(item.get("stock"), "stock")
+                if value < 0:
+                    raise ValueError("stock nesmí být záporný")
+                entry["set"], entry["delta"] = value, 0
+            else:
+                entry["delta"] += _as_int(item.get("delta"), "delta")
+        except ValueError as exc:
+            errors.append({"index": idx, "error": str(exc)})
+
+    return folded, errors
+
+
+def _new_stock_expr(model, entry: dict):
+    if entry["set"] is not None:
+        return entry["set"] + entry["delta"]
+    return model.stock + entry["delta"]
+
+
+def apply_adjustments(items: list[dict]) -> dict:
+    """
+    Aplikuje úpravy v jedné transakci: na každou tabulku jeden
+    `UPDATE … SET stock = CASE id WHEN … END WHERE id IN (…)` po dávkách,
+    pak jeden SELECT na výsledné stavy. Záporný výsledek → rollback a StockError(409).
+    Neexistující id se přeskočí a vrátí v `missing`.
+    """
+    folded, errors = fold_adjustments(items)
+    if errors:
+        raise StockError("Neplatné položky", 400, {"errors": errors})
+
+    levels: dict[str, dict[int, int]] = {"product": {}, "variant": {}}
+    try:
+        for kind, entries in folded.items():
+            model = _TABLES[kind]
+            ids = sorted(entries)
+            for chunk in _chunks(ids):
+                mapping = {i: _new_stock_expr(model, entries[i]) for i in chunk}
+                db.session.execute(
+                    update(model)
+                    .where(model.id.in_(chunk))
+                    .values(stock=case(mapping, value=model.id, else_=model.stock))
+                    .execution_options(synchronize_session=False)
+                )
+                levels[kind].update(
+                    db.session.query(model.id, model.stock).filter(model.id.in_(chunk)).all()
+                )
+
+        negative = [
+            {f"{kind}_id": i, "stock": s}
+            for kind, found in levels.items()
+            for i, s in sorted(found.items())
+            if s is not None and s < 0
+        ]
+        if negative:
+            raise StockError("Sklad by byl záporný", 409, {"negative": negative})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        "products": [{"product_id": i, "stock": s} for i, s in sorted(levels["product"].items())],
+        "variants": [{"variant_id": i, "stock": s} for i, s in sorted(levels["variant"].items())],
+        "missing": {
+            "product_ids": sorted(set(folded["product"]) - set(levels["product"])),
+            "variant_ids": sorted(set(folded["variant"]) - set(levels["variant"])),
+        },
+    }
+
+
+# ========================= Rezervace při objednávce =========================
+
+def _aggregate(lines) -> dict[int, int]:
+    """Sečte množství po id (stejný produkt může být v košíku vícekrát); pořadí = první výskyt."""
+    wanted: dict[int, int] = {}
+    for obj_id, qty in lines:
+        obj_id, qty = int(obj_id), int(qty)
+        if qty <= 0:
+            raise StockError("Položka musí mít quantity>0.", 400)
+        wanted[obj_id] = wanted.get(obj_id, 0) + qty
+    return wanted
+
+
+def _reserve(model, wanted: dict[int, int], label: str, owners: dict[int, int] | None = None) -> dict[int, int]:
+    """
+    Odečte `wanted` ({id: qty}) z `model.stock` – jeden SELECT (IN) a jeden
+    `UPDATE … SET stock = stock - CASE … WHERE id IN … AND stock >= CASE …`
+    na dávku. Vrací {id: zbývající sklad}. Při chybějícím id nebo nedostatku
+    vyhodí StockError se všemi problémy najednou; rollback řeší volající.
+    `owners` ({variant_id: product_id}) ověří, že varianta patří k produktu z košíku.
+    """
+    kind = "variant" if model is ProductVariant else "product"
+    ids = list(wanted)
+    rows: dict[int, tuple[str, int, int | None]] = {}
+    for chunk in _chunks(ids):
+        rows.update(_load_rows(model, chunk))
+
+    missing = [i for i in ids if i not in rows]
+    if missing:
+        raise StockError(f"{label} {missing[0]} neexistuje", 404, {"missing": missing})
+
+    foreign = [i for i, pid in (owners or {}).items() if pid is not None and rows[i][2] != pid]
+    if foreign:
+        raise StockError(
+            f"{label} {foreign[0]} nepatří k produktu {owners[foreign[0]]}",
+            400,
+            {"mismatched": [{"variant_id": i, "product_id": owners[i]} for i in foreign]},
+        )
+
+    def _shortages(current: dict[int, int]) -> list[dict]:
+        return [
+            {"id": i, "name": rows[i][0], "requested": wanted[i], "available": current[i], "kind": kind}
+            for i in ids
+            if i in current and current[i] < wanted[i]
+        ]
+
+    short = _shortages({i: rows[i][1] for i in ids})
+    if short:
+        raise _shortage_error(short)
+
+    use_returning = db.engine.dialect.update_returning
+    remaining: dict[int, int] = {}
+    affected = 0
+    for chunk in _chunks(ids):
+        qty_case = case({i: wanted[i] for i in chunk}, value=model.id)
+        stmt = (
+            update(model)
+            .where(model.id.in_(chunk), model.stock >= qty_case)
+            .values(stock=model.stock - qty_case)
+            .execution_options(synchronize_session=False)
+        )
+        if use_returning:
+            result = db.session.execute(stmt.returning(model.id, model.stock))
+            remaining.update((r[0], int(r[1])) for r in result)
+        else:
+            affected += db.session.execute(stmt).rowcount
+
+    if use_returning:
+        failed = [i for i in ids if i not in remaining]
+    else:
+        # bez RETURNING víme jen počet řádků; při neúspěchu nejde určit které
+        failed = [] if affected == len(ids) else ids
+
+    if failed:
+        # souběžná objednávka mezitím sklad snížila → podmínka stock >= qty řádek vyřadila
+        current = {
+            r[0]: int(r[1] or 0)
+            for r in db.session.query(model.id, model.stock).filter(model.id.in_(failed))
+        }
+        raise _shortage_error(_shortages(current) or [
+            {"id": i, "name": rows[i][0], "requested": wanted[i], "available": current.get(i, 0), "kind": kind}
+            for i in failed
+        ])
+
+    if not use_returning:
+        for chunk in _chunks(ids):
+            remaining.update(
+                (r[0], int(r[1]))
+                for r in db.session.query(model.id, model.stock).filter(model.id.in_(chunk))
+            )
+    return remaining
+
+
+def _load_rows(model, ids: list[int]) -> dict[int, tuple[str, int, int | None]]:
+    """{id: (popisek pro chybové hlášky, sklad, product_id u variant)} jedním dotazem."""
+    if model is ProductVariant:
+        q = (
+            db.session.query(
+                ProductVariant.id, Product.name, ProductVariant.variant_name,
+                ProductVariant.stock, ProductVariant.product_id,
+            )
+            .join(Product, Product.id == ProductVariant.product_id)
+            .filter(ProductVariant.id.in_(ids))
+        )
+        return {
+            vid: (f"{pname} ({vname})" if vname else pname, int(stock or 0), pid)
+            for vid, pname, vname, stock, pid in q
+        }
+    q = db.session.query(Product.id, Product.name, Product.stock).filter(Product.id.in_(ids))
+    return {pid: (name, int(stock or 0), None) for pid, name, stock in q}
+
+
+def _shortage_error(shortages: list[dict]) -> StockError:
+    first = shortages[0]
+    return StockError(
+        f"Na skladě zbývá jen {first['available']} ks pro {first['name']}",
+        400,
+        {"shortages": shortages},
+    )
+
+
+def reserve_products(lines) -> list[dict]:
+    """
+    Atomický odečet skladu pro položky košíku `lines` = [(product_id, quantity), ...].
+    Buď se odečte vše, nebo StockError (404 chybějící produkt, 400 nedostatek
+    s detailem `shortages` pro každou položku). Commit/rollback řeší volající.
+    Vrací [{"id", "taken_qty", "remaining_stock"}] po produktech.
+    """
+    wanted = _aggregate(lines)
+    remaining = _reserve(Product, wanted, "Produkt")
+    return [
+        {"id": pid, "taken_qty": qty, "remaining_stock": remaining[pid]}
+        for pid, qty in wanted.items()
+    ]
+
+
+def parse_cart_lines(items_in: list[dict]) -> list[dict]:
+    """
+    Položky košíku z FE → [{"product_id", "variant_id", "quantity"}].
+    Varianta se bere z `variant_id` nebo `variantId` (tak ji posílá FE).
+    """
+    lines = []
+    for it in items_in:
+        vid_raw = it.get("variant_id", it.get("variantId"))
+        lines.append({
+            "product_id": int(it.get("id")),
+            "variant_id": int(vid_raw) if vid_raw not in (None, "") else None,
+            "quantity": int(it.get("quantity", 1)),
+        })
+    return lines
+
+
+def reserve_cart(lines: list[dict]) -> list[dict]:
+    """
+    Atomický odečet skladu pro celý košík (výstup `parse_cart_lines`).
+    Položka s variantou odečítá jen `product_variant.stock`, bez varianty
+    `product.stock` – na každou tabulku jeden SELECT a jeden UPDATE, bez ohledu
+    na počet položek. Chyby jako u `reserve_products`; navíc 400 pro variantu,
+    která nepatří k produktu. Commit/rollback řeší volající.
+    """
+    product_lines = [(ln["product_id"], ln["quantity"]) for ln in lines if ln.get("variant_id") is None]
+    variant_lines = [(ln["variant_id"], ln["quantity"]) for ln in lines if ln.get("variant_id") is not None]
+
+    decremented = reserve_products(product_lines) if product_lines else []
+    if variant_lines:
+        wanted = _aggregate(variant_lines)
+        owners = {ln["variant_id"]: ln["product_id"] for ln in lines if ln.get("variant_id") is not None}
+        remaining = _reserve(ProductVariant, wanted, "Varianta", owners)
+        decremented += [
+            {"id": owners[vid], "variant_id": vid, "taken_qty": qty, "remaining_stock": remaining[vid]}
+            for vid, qty in wanted.items()
+        ]
+    return decremented
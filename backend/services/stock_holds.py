@@ -0,0 +1,184 @@
+# backend/services/stock_holds.py
+"""
+Časově omezené rezervace skladu pro nezaplacené objednávky.
+
+Sklad se odečítá už při vytvoření objednávky (services.stock.reserve_cart);
+tady si k tomu zapíšeme StockHold s expirací. Zaplacení hold převede na
+prodej, sweeper po expiraci vrátí kusy na sklad a objednávku i čekající
+platbu zruší.
+
+Platba, která dorazí až po zrušení, objednávku neobnoví – kusy už můžou být
+prodané jinému zákazníkovi. Zrušenou objednávku proto žádná cesta na "paid"
+nepřepne (mark-paid → 409, admin → chyba, párování z banky → unmatched
+s důvodem order_canceled + Telegram); vrácení peněz nebo novou objednávku
+řeší obchodník ručně.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+
+from backend.extensions import db
+from backend.models import Order, Payment, Product, ProductVariant, StockHold
+from backend.services import order_counts
+from backend.services.payment_events import publish
+
+HELD = "held"
+CONVERTED = "converted"
+RELEASED = "released"
+
+
+def hold_hours() -> int:
+    try:
+        return int(current_app.config.get("STOCK_HOLD_HOURS", 72))
+    except (TypeError, ValueError):
+        return 72
+
+
+def create_holds(order_id: int, decremented: list[dict], now: datetime | None = None) -> int:
+    """
+    Zapíše holdy pro právě odečtený sklad (výstup `reserve_cart`) jedním
+    executemany INSERTem. Commit řeší volající (stejná transakce jako objednávka).
+    """
+    if not decremented:
+        return 0
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(hours=hold_hours())
+    rows = [
+        {
+            "order_id": order_id,
+            "product_id": d["id"],
+            "variant_id": d.get("variant_id"),
+            "quantity": int(d["taken_qty"]),
+            "status": HELD,
+            "expires_at": expires_at,
+            "created_at": now,
+        }
+        for d in decremented
+    ]
+    db.session.execute(insert(StockHold), rows)
+    return len(rows)
+
+
+def convert_holds(order_id: int) -> int:
+    """Objednávka zaplacena → holdy se stanou prodejem (sklad už je odečtený)."""
+    result = db.session.execute(
+        update(StockHold)
+        .where(StockHold.order_id == order_id, StockHold.status == HELD)
+        .values(status=CONVERTED)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def convert_paid_holds(now: datetime | None = None) -> int:
+    """
+    Úklid pro objednávky zaplacené mimo on_order_marked_paid (párování plateb
+    z banky): prošlé holdy zaplacených objednávek převede na prodej jedním UPDATE.
+    """
+    now = now or datetime.utcnow()
+    result = db.session.execute(
+        update(StockHold)
+        .where(
+            StockHold.status == HELD,
+            StockHold.expires_at < now,
+            StockHold.order_id.in_(select(Order.id).where(Order.status == "paid")),
+        )
+        .values(status=CONVERTED)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+
+def _restore_stock(model, key_column, order_ids: list[int], variant: bool) -> int:
+    """`UPDATE model SET stock = stock + (SELECT SUM(hold.quantity) …)` – korelovaný poddotaz."""
+    held_filter = [
+        StockHold.status == HELD,
+        StockHold.order_id.in_(order_ids),
+        StockHold.variant_id.isnot(None) if variant else StockHold.variant_id.is_(None),
+    ]
+    returned = (
+        select(func.coalesce(func.sum(StockHold.quantity), 0))
+        .where(key_column == model.id, *held_filter)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(model)
+        .where(model.id.in_(select(key_column).where(*held_filter)))
+        .values(stock=model.stock + returned)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def release_expired_holds(now: datetime | None = None, batch_size: int = 500) -> dict:
+    """
+    Jedna dávka sweeperu (jedna transakce): najde až `batch_size` objednávek
+    ve stavu awaiting_payment s prošlým holdem, zruší je, vrátí sklad
+    (jeden UPDATE na tabulku produktů a variant), holdy označí jako released
+    a čekající platby zruší. Vrací počty; `orders == 0` znamená hotovo.
+    """
+    now = now or datetime.utcnow()
+    candidates = [
+        oid for (oid,) in (
+            db.session.query(StockHold.order_id)
+            .join(Order, Order.id == StockHold.order_id)
+            .filter(
+                StockHold.status == HELD,
+                StockHold.expires_at < now,
+                Order.status == "awaiting_payment",
+            )
+            .distinct()
+            .order_by(StockHold.order_id)
+            .limit(batch_size)
+        )
+    ]
+    if not candidates:
+        return {"orders": 0, "products": 0, "variants": 0, "payments": 0}
+
+    try:
+        # Nejdřív zámek na objednávky: co mezitím někdo zaplatil, podmínka vyřadí
+        canceled = db.session.execute(
+            update(Order)
+            .where(Order.id.in_(candidates), Order.status == "awaiting_payment")
+            .values(status="canceled")
+            .execution_options(synchronize_session=False)
+        ).rowcount or 0
+        order_counts.adjust({"awaiting_payment": -canceled, "canceled": canceled})
+        order_ids = [
+            oid for (oid,) in
+            db.session.query(Order.id).filter(Order.id.in_(candidates), Order.status == "canceled")
+        ]
+        if not order_ids:
+            db.session.commit()
+            return {"orders": 0, "products": 0, "variants": 0, "payments": 0}
+        for (vs,) in db.session.query(Order.vs).filter(Order.id.in_(order_ids), Order.vs.isnot(None)):
+            publish(vs, "canceled", "canceled")
+
+        products = _restore_stock(Product, StockHold.product_id, order_ids, variant=False)
+        variants = _restore_stock(ProductVariant, StockHold.variant_id, order_ids, variant=True)
+
+        db.session.execute(
+            update(StockHold)
+            .where(StockHold.order_id.in_(order_ids), StockHold.status == HELD)
+            .values(status=RELEASED, released_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        payments = db.session.execute(
+            update(Payment)
+            .where(
+                Payment.vs.in_(select(Order.vs).where(Order.id.in_(order_ids))),
+                Payment.status == "pending",
+            )
+            .values(status="canceled")
+            .execution_options(synchronize_session=False)
+        ).rowcount or 0
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"orders": len(order_ids), "products": products, "variants": variants, "payments": payments}
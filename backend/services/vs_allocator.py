@@ -0,0 +1,168 @@
+# backend/services/vs_allocator.py
+"""
+Přidělování variabilních symbolů bez kolizí a bez generování naslepo.
+
+VS = RR + 8místné pořadí v roce (např. 2600001234), tj. 10 číslic.
+Pořadí se bere z tabulky vs_sequence po blocích (VS_BLOCK_SIZE): jeden
+`UPDATE … SET next_value = next_value + :n` na samostatném spojení (commitne
+hned, nedrží zámek po dobu requestu) a pak se čísla rozdávají z paměti.
+Nepoužitá čísla z bloku při restartu propadnou – na mezerách u VS nezáleží.
+
+Rezervace do vs_registry je jeden INSERT v transakci objednávky; DDL obou
+tabulek se spouští jednou při startu (init_vs_allocator v create_app).
+
+Přechodné OperationalError při souběhu (SQLite "database is locked" po busy
+timeoutu, přerušené spojení) se u bloku i rezervace zkusí znovu – nejvýš
+RETRIES× s exponenciálním odkladem – aby checkout pod zátěží nevracel 500.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from backend.extensions import db
+
+COUNTER_DIGITS = 8
+MAX_COUNTER = 10 ** COUNTER_DIGITS - 1
+RETRIES = 4
+RETRY_BACKOFF = 0.05  # s; zdvojuje se, ± 50 % jitter
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS vs_registry (vs VARCHAR(32) PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS vs_sequence (name VARCHAR(16) PRIMARY KEY, next_value BIGINT NOT NULL)",
+)
+
+
+class VsAllocator:
+    """Blokový alokátor; jedna instance na aplikaci, bezpečný pro vlákna i fork workerů."""
+
+    def __init__(self, block_size: int = 20):
+        self.block_size = max(1, int(block_size))
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._year: str | None = None
+        self._next = 0
+        self._end = 0  # exkluzivně
+        self.blocks_fetched = 0
+
+    @staticmethod
+    def _bump(conn, year: str, n: int) -> int | None:
+        """Posune čítač o n; vrací novou hodnotu next_value, nebo None (řádek pro rok chybí)."""
+        params = {"n": n, "name": year}
+        if conn.dialect.update_returning:
+            return conn.execute(
+                text("UPDATE vs_sequence SET next_value = next_value + :n WHERE name = :name RETURNING next_value"),
+                params,
+            ).scalar()
+        if not conn.execute(
+            text("UPDATE vs_sequence SET next_value = next_value + :n WHERE name = :name"), params
+        ).rowcount:
+            return None
+        return conn.execute(text("SELECT next_value FROM vs_sequence WHERE name = :name"), params).scalar()
+
+    def _fetch_block(self, engine, year: str) -> None:
+        for attempt in range(RETRIES + 1):
+            try:
+                return self._fetch_block_once(engine, year)
+            except OperationalError:
+                if attempt == RETRIES:
+                    raise
+                _backoff(attempt)
+
+    def _fetch_block_once(self, engine, year: str) -> None:
+        n = self.block_size
+        new_next = None
+        for _ in range(2):
+            with engine.begin() as conn:
+                new_next = self._bump(conn, year, n)
+            if new_next is not None:
+                break
+            # první VS v roce – založíme řádek (souběžně ho mohl založit jiný proces)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO vs_sequence (name, next_value) VALUES (:name, 1)"), {"name": year}
+                    )
+            except IntegrityError:
+                pass
+        if new_next is None:
+            raise RuntimeError(f"Nepodařilo se načíst řadu VS pro rok {year}")
+
+        start = int(new_next) - n
+        if start + n - 1 > MAX_COUNTER:
+            raise RuntimeError(f"Vyčerpána řada VS pro rok {year}")
+        self._year, self._next, self._end = year, start, start + n
+        self.blocks_fetched += 1
+
+    def allocate(self, engine, now: datetime | None = None) -> str:
+        year = (now or datetime.now()).strftime("%y")
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork (gunicorn --preload): blok rodiče nesmí použít i potomek
+                self._pid, self._year, self._next, self._end = os.getpid(), None, 0, 0
+            if self._year != year or self._next >= self._end:
+                self._fetch_block(engine, year)
+            value = self._next
+            self._next += 1
+        return f"{year}{value:0{COUNTER_DIGITS}d}"
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def ensure_vs_tables(engine) -> None:
+    with engine.begin() as conn:
+        for ddl in _DDL:
+            conn.execute(text(ddl))
+
+
+def init_vs_allocator(app) -> None:
+    """Z create_app: vytvoří alokátor a jednou spustí DDL (chyba DB start nezastaví)."""
+    app.extensions["vs_allocator"] = VsAllocator(app.config.get("VS_BLOCK_SIZE", 20))
+    try:
+        with app.app_context():
+            ensure_vs_tables(db.engine)
+    except Exception as exc:
+        app.logger.warning("VS tabulky se nepodařilo vytvořit při startu: %s", exc)
+
+
+def allocate_vs() -> str:
+    """Další volný VS (bez zápisu do vs_registry)."""
+    return current_app.extensions["vs_allocator"].allocate(db.engine)
+
+
+def reserve_vs(vs: str) -> None:
+    """Zarezervuje VS jedním INSERTem v aktuální transakci (IntegrityError = už použitý)."""
+    db.session.execute(text("INSERT INTO vs_registry (vs) VALUES (:vs)"), {"vs": vs})
+
+
+def allocate_and_reserve_vs(max_skips: int = 3) -> str:
+    """
+    Přidělí a zarezervuje nový VS. Kolize nastane jen se starým/klientským VS
+    ve stejném formátu; pak se vezme další číslo (žádné generování naslepo).
+    Volá se na začátku transakce objednávky – rollback tu nic dalšího nezahodí.
+    """
+    for _ in range(max_skips + 1):
+        vs = allocate_vs()
+        for attempt in range(RETRIES + 1):
+            try:
+                reserve_vs(vs)
+                return vs
+            except IntegrityError:
+                db.session.rollback()
+                break
+            except OperationalError:
+                # zámek DB při souběhu – stejný VS znovu (INSERT se neprovedl)
+                db.session.rollback()
+                if attempt == RETRIES:
+                    raise
+                _backoff(attempt)
+    raise RuntimeError("Nepodařilo se zarezervovat VS.")
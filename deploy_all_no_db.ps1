@@ -13,8 +13,8 @@ docker push lakyn80/naramkova-frontend:$TAG
 ssh lucky@89.221.214.140 "sed -i 's/^BACKEND_TAG=.*/BACKEND_TAG=$TAG/' /var/www/naramkova-docker/.env"
 ssh lucky@89.221.214.140 "sed -i 's/^FRONTEND_TAG=.*/FRONTEND_TAG=$TAG/' /var/www/naramkova-docker/.env"
 
-# Pull only FE + BE
-ssh lucky@89.221.214.140 "cd /var/www/naramkova-docker && docker compose pull backend frontend"
+# Pull only FE + BE (+ outbox a IMAP worker ze stejného image)
+ssh lucky@89.221.214.140 "cd /var/www/naramkova-docker && docker compose pull backend outbox-worker imap-worker frontend"
 
-# Restart only FE + BE (DB se nedotkne)
-ssh lucky@89.221.214.140 "cd /var/www/naramkova-docker && docker compose up -d backend frontend"
+# Restart only FE + BE + outbox a IMAP worker (DB se nedotkne)
+ssh lucky@89.221.214.140 "cd /var/www/naramkova-docker && docker compose up -d backend outbox-worker imap-worker frontend"
@@ -33,6 +33,10 @@ export default function Checkout() {
   const [vs, setVs] = useState(null);
   const [qrError, setQrError] = useState("");
   const canvasRef = useRef(null);
+  // jeden klíč na jeden pokus o objednávku – opakované odeslání (retry) nevytvoří druhou objednávku
+  const idempotencyKeyRef = useRef(null);
+  // celková částka spočtená serverem (/api/cart/quote) – ceny v košíku mohou být zastaralé
+  const [serverTotal, setServerTotal] = useState(null);
 
   // ── Výpočty ────────────────────────────────────────────────────────────────
   const subtotal = useMemo(() => {
@@ -47,6 +51,8 @@ export default function Checkout() {
     const shipping = shippingMode === "pickup" ? 0 : SHIPPING_FEE_CZK;
     return toMoney(subtotal + shipping); // ✅ vč. poštovného/pickupu
   }, [subtotal, shippingMode]);
+
+  const payTotal = serverTotal ?? total;
 
   // ── Form ──────────────────────────────────────────────────────────────────
   const handleChange = (e) => {
@@ -59,6 +65,26 @@ export default function Checkout() {
     if (!cartItems.length) return;
     const newVs = Math.floor(100000 + Math.random() * 900000);
     setVs(newVs);
+    idempotencyKeyRef.current =
+      (typeof crypto !== "undefined" && crypto.randomUUID?.()) || `${newVs}-${Date.now()}-${Math.random()}`;
+    setServerTotal(null);
+    fetch("/api/cart/quote", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        shippingMode,
+        items: cartItems.map((item) => ({
+          id: item.id,
+          variantId: item.variantId,
+          quantity: Number(item.quantity) || 0,
+        })),
+      }),
+    })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (data?.ok) setServerTotal(toMoney(data.totalCzk));
+      })
+      .catch(() => {}); // při chybě zůstane částka z košíku
     setPhase("qr");
   };
 
@@ -68,10 +94,10 @@ export default function Checkout() {
     (async () => {
       setQrError("");
       try {
-        if (!MERCHANT_IBAN || !total || total <= 0 || !vs) return;
+        if (!MERCHANT_IBAN || !payTotal || payTotal <= 0 || !vs) return;
         const payload = buildSpdPayload({
           iban: MERCHANT_IBAN,
-          amount: total, // ✅ QR AM = total vč. poštovného
+          amount: payTotal, // ✅ QR AM = total vč. poštovného
           vs,
           msg: `Objednavka ${vs}`,
         });
@@ -80,7 +106,7 @@ export default function Checkout() {
         setQrError(String(e?.message || e));
       }
     })();
-  }, [phase, total, vs]);
+  }, [phase, payTotal, vs]);
 
   // ── Odeslání objednávky ───────────────────────────────────────────────────
   const handleConfirmPaidAndSubmit = async () => {
@@ -91,7 +117,7 @@ export default function Checkout() {
         address: formData.address,
         note: formData.note,
         vs,
-        totalCzk: total,              // ✅ posíláme vč. poštovného
+        totalCzk: payTotal,           // ✅ posíláme vč. poštovného
         shippingCzk: shippingMode === "pickup" ? 0 : SHIPPING_FEE_CZK, // (volitelné) pro přehled v adminu
         shippingMode,
         items: cartItems.map((item) => ({
@@ -107,7 +133,10 @@ export default function Checkout() {
 
       const response = await fetch("/api/orders", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          ...(idempotencyKeyRef.current ? { "Idempotency-Key": idempotencyKeyRef.current } : {}),
+        },
         body: JSON.stringify(orderData),
       });
 
@@ -153,7 +182,7 @@ export default function Checkout() {
           <h2 className="text-2xl sm:text-3xl font-bold mb-4 text-center">Platba objednávky</h2>
           <p className="text-center text-pink-800 mb-6">
             Naskenujte QR kód ve své bankovní aplikaci. <br />
-            Částka: <b>{toMoney(total).toFixed(2)} CZK</b>
+            Částka: <b>{toMoney(payTotal).toFixed(2)} CZK</b>
           </p>
 
           <div className="flex flex-col items-center gap-4 bg-white rounded-2xl shadow p-6">
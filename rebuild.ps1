@@ -2,8 +2,8 @@ $TAG = Get-Date -Format "yyyyMMdd-HHmm"
 Write-Host ">> Použitý TAG: $TAG"
 
 # Stop & remove local containers
-docker stop nmm-backend, nmm-frontend 2>$null
-docker rm nmm-backend, nmm-frontend 2>$null
+docker stop nmm-backend, nmm-outbox-worker, nmm-imap-worker, nmm-frontend 2>$null
+docker rm nmm-backend, nmm-outbox-worker, nmm-imap-worker, nmm-frontend 2>$null
 
 # Clean local images
 docker image prune -f